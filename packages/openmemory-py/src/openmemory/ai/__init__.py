@@ -4,5 +4,7 @@
 from .gemini import GeminiAdapter
 from .aws import AwsAdapter
 from .synthetic import SyntheticAdapter
+from .limiter import RateLimited
+from .registry import registry, get_adapter
 
-__all__ = ["AIAdapter", "OpenAIAdapter", "OllamaAdapter", "GeminiAdapter", "AwsAdapter", "SyntheticAdapter"]
+__all__ = ["AIAdapter", "OpenAIAdapter", "OllamaAdapter", "GeminiAdapter", "AwsAdapter", "SyntheticAdapter", "RateLimited", "registry", "get_adapter"]
@@ -2,6 +2,14 @@
 from typing import List, Dict, Any, Optional
 
 class AIAdapter(ABC):
+    # ai.limiter.ProviderLimits, attached by the registry; None calls the provider directly
+    limits = None
+
+    async def _call(self, model: Optional[str], fn, *args, **kwargs):
+        """Send one provider request through the rate limiter, if any."""
+        if self.limits is None: return await fn(*args, **kwargs)
+        return await self.limits.run(model, fn, *args, **kwargs)
+
     @abstractmethod
     async def chat(self, messages: List[Dict[str, str]], model: str = None, **kwargs) -> str:
         """Simple chat completion"""
@@ -16,3 +24,7 @@ async def embed(self, text: str, model: str = None) -> List[float]:
     async def embed_batch(self, texts: List[str], model: str = None) -> List[List[float]]:
         """Generate batch embeddings"""
         pass
+
+    async def aclose(self):
+        """Release pooled connections; adapters without any keep the default."""
+        pass
@@ -1,5 +1,8 @@
+import asyncio
 import json
 import os
+import random
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from ..core.config import env
 from .adapter import AIAdapter
@@ -10,38 +13,62 @@
 except ImportError:
     boto3 = None
 
+# boto3 has no async API, so every invoke_model (and the read of its streamed
+# body) runs on the adapter's bounded thread pool, keeping the event loop free.
+# The pool and the client's connection pool are the same size, so concurrent
+# calls reuse keep-alive connections instead of queueing for one.
+# Throttling and transient service errors are retried with jittered
+# exponential backoff; botocore's own retries are turned off so they don't stack.
+
+RETRYABLE = {
+    "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException",
+    "ModelNotReadyException", "InternalServerException", "ModelTimeoutException",
+}
+
+def _error_code(e: Exception) -> Optional[str]:
+    return (getattr(e, "response", None) or {}).get("Error", {}).get("Code")
+
 class AwsAdapter(AIAdapter):
-    def __init__(self, region: str = None, access_key: str = None, secret_key: str = None):
-        if not boto3: raise ImportError("boto3 not installed")
-        
+    def __init__(self, region: str = None, access_key: str = None, secret_key: str = None, client: Any = None,
+                 max_workers: int = None, max_retries: int = None):
         self.region = region or env.aws_region or os.getenv("AWS_REGION")
         self.access_key = access_key or env.aws_access_key_id or os.getenv("AWS_ACCESS_KEY_ID")
         self.secret_key = secret_key or env.aws_secret_access_key or os.getenv("AWS_SECRET_ACCESS_KEY")
-        
-        if not self.region: raise ValueError("AWS Region missing")
-        
-        self.client = boto3.client(
-            service_name="bedrock-runtime",
-            region_name=self.region,
-            aws_access_key_id=self.access_key,
-            aws_secret_access_key=self.secret_key
-        )
-        
+        self.max_workers = max(1, max_workers or env.aws_max_workers)
+        self.max_retries = env.aws_max_retries if max_retries is None else max_retries
+
+        if client is None:
+            if not boto3: raise ImportError("boto3 not installed")
+            if not self.region: raise ValueError("AWS Region missing")
+            client = boto3.client(
+                service_name="bedrock-runtime",
+                region_name=self.region,
+                aws_access_key_id=self.access_key,
+                aws_secret_access_key=self.secret_key,
+                config=Config(max_pool_connections=self.max_workers, retries={"total_max_attempts": 1})
+            )
+        self.client = client
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bedrock")
+
+    def _request(self, **kwargs) -> Dict[str, Any]:
+        # worker thread: the round trip and the body read both block
+        response = self.client.invoke_model(**kwargs)
+        return json.loads(response.get("body").read())
+
+    async def _invoke(self, **kwargs) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await loop.run_in_executor(self._pool, lambda: self._request(**kwargs))
+            except Exception as e:
+                if _error_code(e) not in RETRYABLE or attempt == self.max_retries: raise
+                await asyncio.sleep(min(20.0, 0.2 * 2 ** attempt) * (0.5 + random.random() / 2))
+
     async def chat(self, messages: List[Dict[str, str]], model: str = None, **kwargs) -> str:
         # Assuming Bedrock Titan or Claude payload structure (Claude is common)
         # This is a basic implementation for Claude v2/3 on Bedrock
         m = model or "anthropic.claude-3-sonnet-20240229-v1:0" 
-        
-        prompt = ""
-        for msg in messages:
-            role = msg["role"]
-            content = msg["content"]
-            if role == "system": prompt += f"System: {content}\n\n"
-            elif role == "user": prompt += f"Human: {content}\n\n"
-            elif role == "assistant": prompt += f"Assistant: {content}\n\n"
-            
-        prompt += "Assistant:"
-        
+
         body = json.dumps({
             "anthropic_version": "bedrock-2023-05-31",
             "max_tokens": 1024,
@@ -52,11 +79,7 @@ async def chat(self, messages: List[Dict[str, str]], model: str = None, **kwargs
         })
 
         try:
-            response = self.client.invoke_model(
-                modelId=m,
-                body=body
-            )
-            res_body = json.loads(response.get("body").read())
+            res_body = await self._call(m, self._invoke, modelId=m, body=body)
             return res_body["content"][0]["text"]
         except Exception:
             # Fallback for Titan or other models if Claude fails or structural mismatch?
@@ -65,8 +88,6 @@ async def chat(self, messages: List[Dict[str, str]], model: str = None, **kwargs
             return "Error: Bedrock chat failed or model not supported in adapter."
         
     async def embed(self, text: str, model: str = None) -> List[float]:
-        # Sync boto3 client execution (wrap in executor if strictly async needed, but ok for now)
-        # Or use aiobotocore if available? For 1:1 port, std boto3 is fine.
         m = model or "amazon.titan-embed-text-v2:0"
         
         body = json.dumps({
@@ -76,22 +97,14 @@ async def embed(self, text: str, model: str = None) -> List[float]:
         })
         
         try:
-            response = self.client.invoke_model(
-                modelId=m,
-                body=body,
-                accept="application/json",
-                contentType="application/json"
-            )
-            
-            res_body = json.loads(response.get("body").read())
+            res_body = await self._call(m, self._invoke, modelId=m, body=body, accept="application/json", contentType="application/json")
             return res_body.get("embedding")
         except Exception as e:
             raise Exception(f"AWS Bedrock Error: {e}")
 
     async def embed_batch(self, texts: List[str], model: str = None) -> List[List[float]]:
-        # AWS Titan doesn't support native batching in invoke_model?
-        # Typically loop.
-        res = []
-        for t in texts:
-            res.append(await self.embed(t, model))
-        return res
+        # Titan has no batch input on invoke_model: fan out, bounded by the thread pool
+        return list(await asyncio.gather(*(self.embed(t, model) for t in texts)))
+
+    async def aclose(self):
+        self._pool.shutdown(wait=False)
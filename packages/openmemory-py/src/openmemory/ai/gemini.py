@@ -4,11 +4,13 @@
 from typing import List, Dict, Any, Optional
 from ..core.config import env
 from .adapter import AIAdapter
+from .limiter import check_response
 
 class GeminiAdapter(AIAdapter):
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key or env.gemini_key or os.getenv("GEMINI_API_KEY")
         self.base_url = "https://generativelanguage.googleapis.com/v1beta"
+        self.client = client or httpx.AsyncClient()
         
     async def chat(self, messages: List[Dict[str, str]], model: str = None, **kwargs) -> str:
         if not self.api_key: raise ValueError("Gemini key missing")
@@ -30,20 +32,19 @@ async def chat(self, messages: List[Dict[str, str]], model: str = None, **kwargs
             
         url = f"{self.base_url}/{m}:generateContent?key={self.api_key}"
         
-        async with httpx.AsyncClient() as client:
-            res = await client.post(url, json={
-                "contents": contents,
-                "generationConfig": kwargs
-            })
+        res = await self._call(m, self._post, url, {
+            "contents": contents,
+            "generationConfig": kwargs
+        })
+        
+        if res.status_code != 200: 
+            raise Exception(f"Gemini Chat Error: {res.text}")
             
-            if res.status_code != 200: 
-                raise Exception(f"Gemini Chat Error: {res.text}")
-                
-            data = res.json()
-            try:
-                return data["candidates"][0]["content"]["parts"][0]["text"]
-            except (KeyError, IndexError):
-                return ""
+        data = res.json()
+        try:
+            return data["candidates"][0]["content"]["parts"][0]["text"]
+        except (KeyError, IndexError):
+            return ""
         
     async def embed(self, text: str, model: str = None) -> List[float]:
         return (await self.embed_batch([text], model))[0]
@@ -63,12 +64,19 @@ async def embed_batch(self, texts: List[str], model: str = None) -> List[List[fl
                 "taskType": "SEMANTIC_SIMILARITY" 
             })
             
-        async with httpx.AsyncClient() as client:
-            res = await client.post(url, json={"requests": reqs})
-            if res.status_code != 200: raise Exception(f"Gemini: {res.text}")
-            
-            data = res.json()
-            if "embeddings" not in data: return []
-            
-            # Extract values
-            return [e["values"] for e in data["embeddings"]]
+        res = await self._call(m, self._post, url, {"requests": reqs})
+        if res.status_code != 200: raise Exception(f"Gemini: {res.text}")
+        
+        data = res.json()
+        if "embeddings" not in data: return []
+        
+        # Extract values
+        return [e["values"] for e in data["embeddings"]]
+
+    async def _post(self, url: str, body: Dict[str, Any]):
+        res = await self.client.post(url, json=body)
+        check_response(res, "Gemini")
+        return res
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Deque, Dict, Optional
+from ..core.config import env
+
+# Client-side flow control for provider calls, one Limiter per (provider, model):
+#   - a token bucket holds the request rate under the configured quota
+#   - an AIMD window bounds requests in flight: +1/window per success, halved
+#     (at most once per second) when the provider throttles
+#   - a Retry-After from the provider pauses every caller of that limiter
+# Throttled calls are retried with jittered exponential backoff. Settings come
+# from [ai] (OM_AI_RATE, OM_AI_BURST, OM_AI_CONCURRENCY, OM_AI_MAX_RETRIES) with
+# per "provider" or "provider:model" overrides in OM_AI_LIMITS (JSON).
+
+THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}
+
+class RateLimited(Exception):
+    """The provider refused the call for now (HTTP 429/503)."""
+    def __init__(self, msg: str, retry_after: Optional[float] = None):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+def parse_retry_after(v: Optional[str]) -> Optional[float]:
+    if not v: return None
+    try:
+        return max(0.0, float(v))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(v).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def check_response(res, provider: str):
+    """Raise RateLimited for a throttled httpx response."""
+    if res.status_code in (429, 503):
+        raise RateLimited(f"{provider}: {res.status_code} {res.text[:200]}", parse_retry_after(res.headers.get("retry-after")))
+
+def throttle_of(e: BaseException) -> Optional[float]:
+    """Seconds to wait (0.0 when the provider gave none) if e is a throttle, else None."""
+    if isinstance(e, RateLimited): return e.retry_after or 0.0
+    r = getattr(e, "response", None)
+    if isinstance(r, dict):
+        # botocore ClientError
+        return 0.0 if r.get("Error", {}).get("Code") in THROTTLE_CODES else None
+    if getattr(r, "status_code", None) in (429, 503):
+        # httpx responses, and the SDK errors that carry one
+        return parse_retry_after(r.headers.get("retry-after")) or 0.0
+    return None
+
+def backoff(attempt: int) -> float:
+    return min(30.0, 0.25 * 2 ** attempt) * (0.5 + random.random() / 2)
+
+class Limiter:
+    """Token bucket for the request rate plus an AIMD window for requests in flight."""
+    def __init__(self, rate: float = 0.0, burst: float = 0, concurrency: int = 16):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst or rate or 1))
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self.max_window = max(1, int(concurrency))
+        self.window = float(self.max_window)
+        self.inflight = 0
+        self.queued = 0
+        self.paused_until = 0.0
+        self.calls = 0
+        self.throttled = 0
+        self._cut_at = 0.0
+        self._recent: Deque[float] = deque()
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    async def acquire(self):
+        self.queued += 1
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                elif self.inflight >= int(self.window):
+                    fut = asyncio.get_running_loop().create_future()
+                    self._waiters.append(fut)
+                    try:
+                        await fut
+                    except asyncio.CancelledError:
+                        # pass a wake-up this waiter received on to the next one
+                        if fut.done() and not fut.cancelled(): self._wake()
+                        raise
+                elif self.rate > 0 and self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                else:
+                    if self.rate > 0: self.tokens -= 1
+                    self.inflight += 1
+                    self.calls += 1
+                    self._recent.append(now)
+                    return
+        finally:
+            self.queued -= 1
+
+    def release(self, throttled: bool = False, retry_after: Optional[float] = None):
+        self.inflight -= 1
+        now = time.monotonic()
+        if throttled:
+            self.throttled += 1
+            # one cut per burst of refusals, not one per refused request
+            if now - self._cut_at > 1.0:
+                self.window = max(1.0, self.window / 2)
+                self._cut_at = now
+            if retry_after: self.paused_until = max(self.paused_until, now + retry_after)
+        else:
+            self.window = min(float(self.max_window), self.window + 1.0 / self.window)
+        self._wake()
+
+    def _wake(self):
+        free = int(self.window) - self.inflight
+        while free > 0 and self._waiters:
+            f = self._waiters.popleft()
+            if not f.done():
+                f.set_result(None)
+                free -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 10.0: self._recent.popleft()
+        return {
+            "rate": len(self._recent) / 10.0,
+            "rate_limit": self.rate,
+            "window": round(self.window, 2),
+            "inflight": self.inflight,
+            "queued": self.queued,
+            "calls": self.calls,
+            "throttled": self.throttled,
+        }
+
+def limits_for(provider: str, model: Optional[str]) -> Dict[str, Any]:
+    cfg = {"rate": env.ai_rate, "burst": env.ai_burst, "concurrency": env.ai_concurrency}
+    over = env.ai_limits
+    if not isinstance(over, dict):
+        try:
+            over = json.loads(over or "{}")
+        except ValueError:
+            over = {}
+    cfg.update(over.get(provider, {}))
+    if model: cfg.update(over.get(f"{provider}:{model}", {}))
+    return cfg
+
+class ProviderLimits:
+    """The limiters of one provider, by model; adapters send their calls through run()."""
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.limiters: Dict[str, Limiter] = {}
+
+    def get(self, model: Optional[str]) -> Limiter:
+        key = model or ""
+        lim = self.limiters.get(key)
+        if lim is None:
+            lim = self.limiters[key] = Limiter(**limits_for(self.provider, model))
+        return lim
+
+    async def run(self, model: Optional[str], fn: Callable, *args, **kwargs):
+        lim = self.get(model)
+        attempt = 0
+        while True:
+            await lim.acquire()
+            try:
+                res = await fn(*args, **kwargs)
+            except Exception as e:
+                wait = throttle_of(e)
+                lim.release(wait is not None, wait)
+                if wait is None or attempt >= env.ai_max_retries: raise
+                # with a Retry-After the limiter itself holds callers back
+                if not wait: await asyncio.sleep(backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                lim.release()
+                raise
+            lim.release()
+            return res
+
+    def stats(self) -> Dict[str, Any]:
+        return {k or "default": lim.stats() for k, lim in self.limiters.items()}
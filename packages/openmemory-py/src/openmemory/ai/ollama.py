@@ -1,37 +1,96 @@
+import asyncio
 import httpx
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from ..core.config import env
 from .adapter import AIAdapter
+from .limiter import check_response
+
+# Embeddings go through /api/embed, which takes a list of inputs. embed_batch
+# splits its texts into batches of batch_size with up to `concurrency` requests
+# in flight. Single embed() calls made concurrently (e.g. the sections of one
+# ingest) are coalesced into such batches on the next loop iteration. Servers
+# older than /api/embed answer 404; the adapter then stays on the one-prompt
+# /api/embeddings endpoint.
 
 class OllamaAdapter(AIAdapter):
-    def __init__(self, base_url: str = None):
-        self.base_url = base_url or env.ollama_base_url or "http://localhost:11434"
+    def __init__(self, base_url: str = None, client: Optional[httpx.AsyncClient] = None,
+                 batch_size: int = None, concurrency: int = None):
+        self.base_url = base_url or env.ollama_url or "http://localhost:11434"
+        self.client = client or httpx.AsyncClient()
+        self.batch_size = max(1, batch_size or env.ollama_batch_size)
+        self.concurrency = max(1, concurrency or env.ollama_concurrency)
+        # None until the server has answered: True once /api/embed turned out missing
+        self.legacy: Optional[bool] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._queued: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
         
     async def chat(self, messages: List[Dict[str, str]], model: str = None, **kwargs) -> str:
         m = model or env.ollama_model or "llama3"
         url = f"{self.base_url.rstrip('/')}/api/chat"
         # simple non-streaming implementation
-        async with httpx.AsyncClient() as client:
-            res = await client.post(url, json={
-                "model": m,
-                "messages": messages,
-                "stream": False,
-                **kwargs
-            })
-            if res.status_code != 200: raise Exception(f"Ollama: {res.text}")
-            return res.json()["message"]["content"]
+        res = await self._call(m, self._post, url, {
+            "model": m,
+            "messages": messages,
+            "stream": False,
+            **kwargs
+        })
+        if res.status_code != 200: raise Exception(f"Ollama: {res.text}")
+        return res.json()["message"]["content"]
             
     async def embed(self, text: str, model: str = None) -> List[float]:
         m = model or env.ollama_embedding_model or "nomic-embed-text"
-        return (await self.embed_batch([text], m))[0]
+        fut = asyncio.get_running_loop().create_future()
+        q = self._queued.setdefault(m, [])
+        q.append((text, fut))
+        if len(q) == 1: asyncio.get_running_loop().call_soon(self._flush, m)
+        elif len(q) >= self.batch_size: self._flush(m)
+        return await fut
+
+    def _flush(self, m: str):
+        q = self._queued.pop(m, [])
+        if q: asyncio.ensure_future(self._send(q, m))
+
+    async def _send(self, q: List[Tuple[str, asyncio.Future]], m: str):
+        try:
+            texts = list(dict.fromkeys(t for t, _ in q))
+            vecs = dict(zip(texts, await self.embed_batch(texts, m)))
+            for t, fut in q:
+                if not fut.done(): fut.set_result(vecs[t])
+        except Exception as e:
+            for _, fut in q:
+                if not fut.done(): fut.set_exception(e)
         
     async def embed_batch(self, texts: List[str], model: str = None) -> List[List[float]]:
         m = model or env.ollama_embedding_model or "nomic-embed-text"
-        url = f"{self.base_url.rstrip('/')}/api/embeddings"
+        if self._sem is None: self._sem = asyncio.Semaphore(self.concurrency)
+        async def one(batch: List[str]) -> List[List[float]]:
+            async with self._sem:
+                return await self._call(m, self._embed_many, batch, m)
+        parts = await asyncio.gather(*(one(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)))
+        return [v for p in parts for v in p]
+
+    async def _embed_many(self, texts: List[str], m: str) -> List[List[float]]:
+        base = self.base_url.rstrip('/')
+        if not self.legacy:
+            r = await self._post(f"{base}/api/embed", {"model": m, "input": texts})
+            if r.status_code == 200:
+                self.legacy = False
+                return r.json()["embeddings"]
+            # an unknown endpoint, not an unknown model (that is a JSON error)
+            if r.status_code not in (404, 405) or self.legacy is False or r.headers.get("content-type", "").startswith("application/json"):
+                raise Exception(f"Ollama Emb: {r.text}")
+            self.legacy = True
         res = []
-        async with httpx.AsyncClient() as client:
-            for t in texts:
-                r = await client.post(url, json={"model": m, "prompt": t})
-                if r.status_code != 200: raise Exception(f"Ollama Emb: {r.text}")
-                res.append(r.json()["embedding"])
+        for t in texts:
+            r = await self._post(f"{base}/api/embeddings", {"model": m, "prompt": t})
+            if r.status_code != 200: raise Exception(f"Ollama Emb: {r.text}")
+            res.append(r.json()["embedding"])
         return res
+
+    async def _post(self, url: str, body: Dict[str, Any]):
+        res = await self.client.post(url, json=body)
+        check_response(res, "Ollama")
+        return res
+
+    async def aclose(self):
+        await self.client.aclose()
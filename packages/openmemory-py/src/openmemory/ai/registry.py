@@ -0,0 +1,112 @@
+import asyncio
+import weakref
+from typing import Dict, Any, Optional, Tuple
+
+import httpx
+from ..core.config import env
+from .adapter import AIAdapter
+from .limiter import ProviderLimits
+
+# One long-lived adapter per provider configuration.
+# Adapters share pooled keep-alive httpx clients (HTTP/2 when the h2 package is
+# installed), so an embed call reuses an open connection instead of paying TCP
+# and TLS setup. Connection pools belong to the event loop that opened them, so
+# the registry keeps one set of adapters per running loop. Every adapter it
+# builds sends its calls through a ProviderLimits (ai/limiter.py), which also
+# owns retries, so the SDK / boto3 retries are switched off.
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+def http_client(**kwargs) -> httpx.AsyncClient:
+    """A pooled AsyncClient configured from [http]."""
+    limits = httpx.Limits(
+        max_connections=env.http_max_connections,
+        max_keepalive_connections=env.http_max_keepalive,
+        keepalive_expiry=env.http_keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=httpx.Timeout(env.http_timeout),
+        http2=HTTP2 and env.http2,
+        **kwargs
+    )
+
+def _config(provider: str) -> Tuple:
+    # adapters are rebuilt when the settings they were created from change
+    if provider == "openai": return (env.openai_key, env.openai_base_url)
+    if provider == "ollama": return (env.ollama_url,)
+    if provider == "gemini": return (env.gemini_key,)
+    if provider == "aws": return (env.aws_region, env.aws_access_key_id, env.aws_secret_access_key)
+    if provider == "synthetic": return (env.vec_dim,)
+    raise ValueError(f"Unknown AI provider: {provider}")
+
+def _build(provider: str) -> AIAdapter:
+    if provider == "openai":
+        from .openai import OpenAIAdapter
+        return OpenAIAdapter(client=http_client(), max_retries=0)
+    if provider == "ollama":
+        from .ollama import OllamaAdapter
+        return OllamaAdapter(client=http_client())
+    if provider == "gemini":
+        from .gemini import GeminiAdapter
+        return GeminiAdapter(client=http_client())
+    if provider == "aws":
+        from .aws import AwsAdapter
+        return AwsAdapter(max_retries=0)
+    from .synthetic import SyntheticAdapter
+    return SyntheticAdapter(env.vec_dim or 768)
+
+def _create(provider: str) -> AIAdapter:
+    a = _build(provider)
+    # synthetic embeddings are local computation, nothing to throttle
+    if provider != "synthetic": a.limits = ProviderLimits(provider)
+    return a
+
+class AdapterRegistry:
+    def __init__(self):
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, AIAdapter]]" = weakref.WeakKeyDictionary()
+        self._detached: Dict[Tuple, AIAdapter] = {}
+
+    def _slot(self) -> Dict[Tuple, AIAdapter]:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._detached
+        return self._loops.setdefault(loop, {})
+
+    def get(self, provider: str) -> AIAdapter:
+        slot = self._slot()
+        key = (provider, _config(provider))
+        a = slot.get(key)
+        if a is None:
+            # drop the adapter built from older settings of the same provider
+            for k in [k for k in slot if k[0] == provider]:
+                stale = slot.pop(k)
+                if slot is not self._detached: asyncio.ensure_future(stale.aclose())
+            a = slot[key] = _create(provider)
+        return a
+
+    def stats(self) -> Dict[str, Any]:
+        slot = self._slot()
+        return {
+            "adapters": [k[0] for k in slot],
+            "http2": HTTP2 and env.http2,
+            "limits": {k[0]: a.limits.stats() for k, a in slot.items() if a.limits is not None},
+        }
+
+    async def aclose(self):
+        """Close every adapter created on the running loop."""
+        slot = self._slot()
+        adapters = list(slot.values())
+        slot.clear()
+        for a in adapters:
+            await a.aclose()
+
+registry = AdapterRegistry()
+
+def get_adapter(provider: str) -> AIAdapter:
+    return registry.get(provider)
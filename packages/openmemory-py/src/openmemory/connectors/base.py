@@ -1,18 +1,26 @@
 """
 base connector class for openmemory data sources
 """
-from typing import Any, List, Dict, Optional
+from typing import Any, List, Dict, Optional, Callable
 from abc import ABC, abstractmethod
+import asyncio
+import inspect
+import json
 import os
+from ..core.config import env
 
 class base_connector(ABC):
     """base class for all connectors"""
     
     name: str = "base"
+    # per-source pipeline settings; None falls back to [connectors] in the config
+    fetch_concurrency: Optional[int] = None
+    ingest_concurrency: Optional[int] = None
     
     def __init__(self, user_id: str = None):
         self.user_id = user_id or "anonymous"
         self._connected = False
+        self.last_report: Optional[Dict[str, Any]] = None
     
     @property
     def connected(self) -> bool:
@@ -23,6 +31,10 @@ async def connect(self, **creds) -> bool:
         """authenticate with the service"""
         pass
     
+    async def aclose(self):
+        """release clients held by the connector"""
+        pass
+    
     @abstractmethod
     async def list_items(self, **filters) -> List[Dict]:
         """list available items from the source"""
@@ -33,24 +45,161 @@ async def fetch_item(self, item_id: str) -> Dict:
         """fetch a single item by id"""
         pass
     
-    async def ingest_all(self, **filters) -> List[str]:
-        """fetch and ingest all items matching filters"""
-        from ..ops.ingest import ingest_document
+    async def ingest_all(self, on_progress: Callable = None, **filters) -> List[str]:
+        """
+        fetch and ingest all items matching filters
         
+        items that fail are skipped; the full report (including failures) is
+        kept in self.last_report
+        """
         items = await self.list_items(**filters)
-        ids = []
-        
-        for item in items:
-            content = await self.fetch_item(item["id"])
-            result = await ingest_document(
-                t=content.get("type", "text"),
-                data=content.get("data", content.get("text", "")),
-                meta={"source": self.name, **content.get("meta", {})},
-                user_id=self.user_id
-            )
-            ids.append(result["root_memory_id"])
-        
-        return ids
+        self.last_report = await self.ingest_items(items, on_progress)
+        return self.last_report["memory_ids"]
+
+    async def ingest_items(self, items: List[Dict], on_progress: Callable = None) -> Dict[str, Any]:
+        """
+        fetch and ingest items through a producer/consumer pipeline
+        
+        up to fetch_concurrency fetchers feed a bounded queue drained by
+        ingest_concurrency ingest workers, so network waits overlap. a failed
+        fetch or ingest is recorded and the rest carries on.
+        
+        on_progress(dict) is called (or awaited) after every item with
+        done / total / failed counts.
+        
+        returns: {"total", "ingested", "failed": [{"id", "stage", "error"}], "memory_ids",
+                  "items": {item_id: [root id, child ids...]}}
+        """
+        from ..ops.ingest import ingest_document
+        
+        total = len(items)
+        todo = iter(enumerate(items))
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=max(1, env.connector_queue))
+        ids: Dict[int, str] = {}
+        made: Dict[str, List[str]] = {}
+        failed: List[Dict[str, Any]] = []
+        done = 0
+        
+        async def progress(item_id: str, ok: bool):
+            nonlocal done
+            done += 1
+            if on_progress:
+                r = on_progress({"source": self.name, "item": item_id, "ok": ok,
+                                 "done": done, "total": total, "failed": len(failed)})
+                if inspect.isawaitable(r): await r
+        
+        async def fetcher():
+            # the iterator is shared: every item goes to exactly one fetcher
+            for i, item in todo:
+                try:
+                    content = await self.fetch_item(item["id"])
+                except Exception as e:
+                    failed.append({"id": item["id"], "stage": "fetch", "error": str(e)})
+                    await progress(item["id"], False)
+                    continue
+                await fetched.put((i, item, content))
+        
+        async def ingester():
+            while True:
+                job = await fetched.get()
+                if job is None: return
+                i, item, content = job
+                try:
+                    result = await ingest_document(
+                        t=content.get("type", "text"),
+                        data=content.get("data", content.get("text", "")),
+                        meta={"source": self.name, **content.get("meta", {})},
+                        user_id=self.user_id
+                    )
+                    ids[i] = result["root_memory_id"]
+                    made[item["id"]] = result.get("memory_ids") or [result["root_memory_id"]]
+                except Exception as e:
+                    failed.append({"id": item["id"], "stage": "ingest", "error": str(e)})
+                    await progress(item["id"], False)
+                    continue
+                await progress(item["id"], True)
+        
+        n_fetch = max(1, self.fetch_concurrency or env.connector_fetch_concurrency)
+        n_ingest = max(1, self.ingest_concurrency or env.connector_ingest_concurrency)
+        workers = [asyncio.create_task(ingester()) for _ in range(n_ingest)]
+        try:
+            await asyncio.gather(*(fetcher() for _ in range(min(n_fetch, total) or 1)))
+            for _ in workers: await fetched.put(None)
+            await asyncio.gather(*workers)
+        except BaseException:
+            for t in workers: t.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        
+        if failed:
+            print(f"[{self.name}] {len(failed)} of {total} items failed")
+        return {
+            "total": total,
+            "ingested": len(ids),
+            "failed": failed,
+            "memory_ids": [ids[i] for i in sorted(ids)],
+            "items": made
+        }
+
+    def sync_scope(self, **filters) -> str:
+        """key of the sync state for one listing (repo, folder, database...)"""
+        return json.dumps(filters, sort_keys=True, default=str)
+
+    async def list_changes(self, cursor: Optional[str] = None, **filters) -> Dict[str, Any]:
+        """
+        list items changed since cursor
+        
+        returns: {"items", "deleted": [ids], "cursor", "complete"}
+        complete means items is the whole listing, so synced items missing
+        from it were removed at the source. the default re-lists everything
+        and leaves change detection to each item's "version".
+        """
+        return {"items": await self.list_items(**filters), "deleted": [], "cursor": None, "complete": True}
+
+    async def sync(self, on_progress: Callable = None, full: bool = False, **filters) -> Dict[str, Any]:
+        """
+        incremental ingest_all: only fetch and ingest what changed since the last sync
+        
+        the cursor and per-item versions live in the sync state keyed by
+        (connector, user, scope). memories of changed or removed items are
+        replaced or deleted. the cursor only advances when every item went
+        through, so failed items are picked up again by the next sync.
+        full=True ignores the cursor and re-ingests every listed item.
+        """
+        from . import sync_state
+        
+        scope = self.sync_scope(**filters)
+        cursor = None if full else sync_state.get_cursor(self.name, self.user_id, scope)
+        known = sync_state.known_items(self.name, self.user_id, scope)
+        changes = await self.list_changes(cursor, **filters)
+        
+        items = list({i["id"]: i for i in changes["items"]}.values())
+        listed = {i["id"] for i in items}
+        gone = set(known) if changes.get("complete") else set(changes.get("deleted") or [])
+        gone = [g for g in known if g in gone and g not in listed]
+        
+        # unchanged version and its memories still there -> nothing to do
+        live = sync_state.live_roots([k["memory_ids"][0] for k in known.values() if k["memory_ids"]])
+        def current(item) -> bool:
+            k = known.get(item["id"])
+            return (not full and k is not None and item.get("version") is not None
+                    and k["version"] == str(item["version"]) and bool(k["memory_ids"]) and k["memory_ids"][0] in live)
+        todo = [i for i in items if not current(i)]
+        
+        report = await self.ingest_items(todo, on_progress)
+        done = {i["id"]: (None if i.get("version") is None else str(i["version"]), report["items"][i["id"]])
+                for i in todo if i["id"] in report["items"]}
+        stale = [m for iid, (_, ids) in done.items() for m in known.get(iid, {}).get("memory_ids", []) if m not in ids]
+        stale += [m for g in gone for m in known[g]["memory_ids"]]
+        
+        sync_state.record(self.name, self.user_id, scope, done, gone)
+        await sync_state.forget(self.user_id, sync_state.unreferenced(self.user_id, stale))
+        if not report["failed"]:
+            sync_state.set_cursor(self.name, self.user_id, scope, changes.get("cursor"))
+        
+        report.update({"listed": len(items), "skipped": len(items) - len(todo), "deleted": len(gone)})
+        self.last_report = report
+        return report
 
     def _get_env(self, key: str, default: str = None) -> Optional[str]:
         """helper to get env var"""
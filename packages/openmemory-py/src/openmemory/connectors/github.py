@@ -1,11 +1,57 @@
 """
 github connector for openmemory
-requires: PyGithub or httpx
-env vars: GITHUB_TOKEN
+requires: httpx
+env vars: GITHUB_TOKEN, GITHUB_API_URL (optional, for github enterprise)
 """
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple, Union
+from collections import OrderedDict
+from fnmatch import fnmatch
+import asyncio
+import base64
+import hashlib
+import mimetypes
 import os
 from .base import base_connector
+from ..core.db import db
+
+API_URL = "https://api.github.com"
+MAX_BLOB_SIZE = 1024 * 1024  # bytes; larger blobs are skipped before download
+
+# conditional GETs: (api+token, url) -> (etag, body). a 304 does not count against the rate limit
+_etags: "OrderedDict[Tuple[str, str], Tuple[str, Any]]" = OrderedDict()
+ETAG_ENTRIES = 512
+ETAG_MAX_BYTES = 1024 * 1024
+
+def _globs(g: Union[str, List[str], None]) -> List[str]:
+    if not g:
+        return []
+    return [g] if isinstance(g, str) else list(g)
+
+# application/* types that are text in practice
+TEXT_TYPES = {"application/json", "application/xml", "application/javascript", "application/x-sh",
+              "application/x-csh", "application/x-yaml", "application/yaml", "application/toml",
+              "application/sql", "application/x-tex", "application/x-latex", "application/x-httpd-php"}
+
+def _content_type(path: str) -> Optional[str]:
+    """
+    the type ingest should parse a file as, or None when it cannot (images,
+    archives, executables). files with no known type (Makefile, .rs, ...)
+    are taken as plain text.
+    """
+    from ..ops.extract import content_kind
+    guess = mimetypes.guess_type(path)[0]
+    if not guess:
+        return "text/plain"
+    if guess in TEXT_TYPES or (guess.endswith(("+json", "+xml")) and not guess.startswith("image/")):
+        return "text/plain"
+    # the extension as a fallback: the docx mimetype itself does not say docx
+    for ctype in (guess, path.rsplit(".", 1)[-1].lower()):
+        try:
+            if content_kind(ctype) in ("pdf", "docx", "html", "text"):
+                return ctype
+        except ValueError:
+            pass
+    return None
 
 class github_connector(base_connector):
     """connector for github repositories"""
@@ -14,8 +60,12 @@ class github_connector(base_connector):
     
     def __init__(self, user_id: str = None):
         super().__init__(user_id)
-        self.github = None
         self.token = None
+        self.api_url = API_URL
+        self.client = None
+        self._key = ""
+        # item id -> blob sha from the last listing, so fetch_item goes straight to the blob
+        self._blobs: Dict[str, str] = {}
     
     async def connect(self, **creds) -> bool:
         """
@@ -23,32 +73,156 @@ async def connect(self, **creds) -> bool:
         
         env vars:
             GITHUB_TOKEN: personal access token
+            GITHUB_API_URL: api root for github enterprise
         
         or pass:
             token: github pat
+            api_url: api root
         """
         try:
-            from github import Github
+            import httpx  # noqa: F401
         except ImportError:
-            raise ImportError("pip install PyGithub")
+            raise ImportError("pip install httpx")
+        from ..ai.registry import http_client
         
         self.token = creds.get("token") or os.environ.get("GITHUB_TOKEN")
         
         if not self.token:
             raise ValueError("no github token provided")
         
-        self.github = Github(self.token)
+        self.api_url = (creds.get("api_url") or os.environ.get("GITHUB_API_URL") or API_URL).rstrip("/")
+        if self.client:
+            await self.client.aclose()
+        self.client = http_client(base_url=self.api_url, headers={
+            "Authorization": f"Bearer {self.token}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": "openmemory"
+        })
+        self._key = hashlib.sha256(f"{self.api_url}\0{self.token}".encode()).hexdigest()[:16]
         self._connected = True
         return True
     
-    async def list_items(self, repo: str = None, path: str = "/", include_issues: bool = False, **filters) -> List[Dict]:
+    async def aclose(self):
+        if self.client:
+            await self.client.aclose()
+        self.client = None
+        self._connected = False
+    
+    async def _get_json(self, path: str, params: Dict = None) -> Any:
+        """GET with If-None-Match; an unchanged resource comes from the etag cache"""
+        key = (self._key, str(self.client.build_request("GET", path, params=params).url))
+        hit = _etags.get(key)
+        res = await self.client.get(path, params=params, headers={"If-None-Match": hit[0]} if hit else None)
+        if res.status_code == 304 and hit:
+            _etags.move_to_end(key)
+            return hit[1]
+        res.raise_for_status()
+        body = res.json()
+        etag = res.headers.get("etag")
+        if etag and len(res.content) <= ETAG_MAX_BYTES:
+            _etags[key] = (etag, body)
+            _etags.move_to_end(key)
+            while len(_etags) > ETAG_ENTRIES:
+                _etags.popitem(last=False)
+        return body
+    
+    async def _head(self, repo: str, ref: str = None) -> str:
+        """root tree sha of ref (default: the default branch)"""
+        if not ref:
+            ref = (await self._get_json(f"/repos/{repo}"))["default_branch"]
+        branch = await self._get_json(f"/repos/{repo}/branches/{ref}")
+        return branch["commit"]["commit"]["tree"]["sha"]
+    
+    async def _tree(self, repo: str, sha: str) -> List[Dict]:
+        """every entry under a tree, from one recursive git-trees call"""
+        t = await self._get_json(f"/repos/{repo}/git/trees/{sha}", {"recursive": "1"})
+        if not t.get("truncated"):
+            return t["tree"]
+        
+        # over the recursive-listing limit: split at the top level
+        print(f"[github] tree {sha} of {repo} truncated, listing subtrees")
+        top = (await self._get_json(f"/repos/{repo}/git/trees/{sha}"))["tree"]
+        dirs = [e for e in top if e["type"] == "tree"]
+        out = [e for e in top if e["type"] != "tree"] + dirs
+        for d, entries in zip(dirs, await asyncio.gather(*(self._tree(repo, d["sha"]) for d in dirs))):
+            out.extend({**e, "path": f"{d['path']}/{e['path']}"} for e in entries)
+        return out
+    
+    def _select(self, repo: str, entries: List[Dict], path: str = "/", include=None, exclude=None,
+                max_size: Optional[int] = MAX_BLOB_SIZE) -> List[Dict]:
+        """blobs under path matching the globs and size limit; nothing is downloaded here"""
+        prefix = path.strip("/")
+        include, exclude = _globs(include), _globs(exclude)
+        results = []
+        
+        for e in entries:
+            p = e["path"]
+            if e["type"] != "blob":
+                continue
+            if prefix and p != prefix and not p.startswith(prefix + "/"):
+                continue
+            if include and not any(fnmatch(p, g) for g in include):
+                continue
+            if exclude and any(fnmatch(p, g) for g in exclude):
+                continue
+            if max_size and (e.get("size") or 0) > max_size:
+                continue
+            # images, archives and the like: ingest cannot parse them, so they are never fetched
+            if _content_type(p) is None:
+                continue
+            
+            item_id = f"{repo}:{p}"
+            self._blobs[item_id] = e["sha"]
+            results.append({
+                "id": item_id,
+                "name": p.rsplit("/", 1)[-1],
+                "type": "file",
+                "path": p,
+                "size": e.get("size"),
+                "sha": e["sha"],
+                "version": e["sha"]
+            })
+        
+        return results
+    
+    def _ingested_shas(self, repo: str) -> set:
+        rows = db.fetchall("""
+            SELECT DISTINCT json_extract(meta, '$.sha') AS sha FROM memories
+            WHERE user_id=? AND json_extract(meta, '$.source')='github' AND json_extract(meta, '$.repo')=?
+        """, (self.user_id, repo))
+        return {r["sha"] for r in rows if r["sha"]}
+    
+    async def _list_issues(self, repo: str) -> List[Dict]:
+        results = []
+        for issue in await self._get_json(f"/repos/{repo}/issues", {"state": "all", "per_page": 50}):
+            results.append({
+                "id": f"{repo}:issue:{issue['number']}",
+                "name": issue["title"],
+                "type": "issue",
+                "number": issue["number"],
+                "state": issue["state"],
+                "labels": [l["name"] for l in issue.get("labels", [])],
+                "version": issue.get("updated_at")
+            })
+        return results
+    
+    async def list_items(self, repo: str = None, path: str = "/", include_issues: bool = False,
+                         include: Union[str, List[str]] = None, exclude: Union[str, List[str]] = None,
+                         max_size: int = MAX_BLOB_SIZE, ref: str = None, **filters) -> List[Dict]:
         """
         list files and optionally issues from a repo
         
         args:
             repo: repository in "owner/repo" format
-            path: path within repo to list
+            path: path within repo to list (recursively)
             include_issues: whether to include issues
+            include / exclude: shell-style globs on the file path (* also matches /)
+            max_size: skip blobs larger than this many bytes (None: no limit)
+            ref: branch to list (default: the repo's default branch)
+        
+        the whole tree comes from one git-trees call. blobs whose sha was
+        already ingested for this user and repo are left out.
         """
         if not self._connected:
             await self.connect()
@@ -56,43 +230,42 @@ async def list_items(self, repo: str = None, path: str = "/", include_issues: bo
         if not repo:
             raise ValueError("repo is required (format: owner/repo)")
         
-        repository = self.github.get_repo(repo)
-        results = []
-        
-        # list files
-        try:
-            contents = repository.get_contents(path.lstrip("/") if path != "/" else "")
-            
-            if not isinstance(contents, list):
-                contents = [contents]
-            
-            for content in contents:
-                results.append({
-                    "id": f"{repo}:{content.path}",
-                    "name": content.name,
-                    "type": "dir" if content.type == "dir" else content.encoding or "file",
-                    "path": content.path,
-                    "size": content.size,
-                    "sha": content.sha
-                })
-        except Exception as e:
-            print(f"[github] failed to list {path}: {e}")
+        entries = await self._tree(repo, await self._head(repo, ref))
+        seen = self._ingested_shas(repo)
+        results = [i for i in self._select(repo, entries, path, include, exclude, max_size) if i["sha"] not in seen]
         
         # list issues if requested
         if include_issues:
-            issues = repository.get_issues(state="all")
-            for issue in issues[:50]:  # limit to 50
-                results.append({
-                    "id": f"{repo}:issue:{issue.number}",
-                    "name": issue.title,
-                    "type": "issue",
-                    "number": issue.number,
-                    "state": issue.state,
-                    "labels": [l.name for l in issue.labels]
-                })
+            results.extend(await self._list_issues(repo))
         
         return results
     
+    async def list_changes(self, cursor: Optional[str] = None, repo: str = None, path: str = "/",
+                           include_issues: bool = False, include: Union[str, List[str]] = None,
+                           exclude: Union[str, List[str]] = None, max_size: int = MAX_BLOB_SIZE,
+                           ref: str = None, **filters) -> Dict:
+        """
+        list files under path from the branch's git tree
+        
+        the cursor is the root tree sha: when it has not moved no file changed.
+        otherwise the whole tree is listed in one recursive call and each
+        blob's sha is its version, so only changed files are fetched.
+        """
+        if not self._connected:
+            await self.connect()
+        
+        if not repo:
+            raise ValueError("repo is required (format: owner/repo)")
+        
+        sha = await self._head(repo, ref)
+        issues = await self._list_issues(repo) if include_issues else []
+        
+        if sha == cursor:
+            return {"items": issues, "deleted": [], "cursor": sha, "complete": False}
+        
+        results = self._select(repo, await self._tree(repo, sha), path, include, exclude, max_size)
+        return {"items": results + issues, "deleted": [], "cursor": sha, "complete": True}
+    
     async def fetch_item(self, item_id: str) -> Dict:
         """
         fetch file or issue content
@@ -105,76 +278,90 @@ async def fetch_item(self, item_id: str) -> Dict:
         parts = item_id.split(":")
         repo = parts[0]
         
-        repository = self.github.get_repo(repo)
-        
         # issue
         if len(parts) >= 3 and parts[1] == "issue":
             issue_num = int(parts[2])
-            issue = repository.get_issue(number=issue_num)
+            issue, comments = await asyncio.gather(
+                self._get_json(f"/repos/{repo}/issues/{issue_num}"),
+                self._get_json(f"/repos/{repo}/issues/{issue_num}/comments", {"per_page": 100})
+            )
             
             # build text with comments
             text_parts = [
-                f"# {issue.title}",
-                f"State: {issue.state}",
-                f"Labels: {', '.join([l.name for l in issue.labels])}",
+                f"# {issue['title']}",
+                f"State: {issue['state']}",
+                f"Labels: {', '.join([l['name'] for l in issue.get('labels', [])])}",
                 "",
-                issue.body or ""
+                issue.get("body") or ""
             ]
             
             # add comments
-            for comment in issue.get_comments():
-                text_parts.append(f"\n---\n**{comment.user.login}:** {comment.body}")
+            for comment in comments:
+                text_parts.append(f"\n---\n**{comment['user']['login']}:** {comment.get('body') or ''}")
             
             text = "\n".join(text_parts)
             
             return {
                 "id": item_id,
-                "name": issue.title,
-                "type": "issue",
+                "name": issue["title"],
+                "type": "text/markdown",
                 "text": text,
                 "data": text,
                 "meta": {
                     "source": "github",
                     "repo": repo,
                     "issue_number": issue_num,
-                    "state": issue.state
+                    "state": issue["state"]
                 }
             }
         
         # file
+        path = ":".join(parts[1:]) if len(parts) > 1 else ""
+        sha = self._blobs.get(item_id)
+        
+        if sha:
+            # raw blob bytes: no base64 round trip, no contents-api lookup
+            res = await self.client.get(f"/repos/{repo}/git/blobs/{sha}", headers={"Accept": "application/vnd.github.raw+json"})
+            res.raise_for_status()
+            data = res.content
         else:
-            path = ":".join(parts[1:]) if len(parts) > 1 else ""
-            content = repository.get_contents(path)
+            content = await self._get_json(f"/repos/{repo}/contents/{path}")
             
             # handle directory
             if isinstance(content, list):
-                text = "\n".join([f"- {c.path}" for c in content])
+                text = "\n".join([f"- {c['path']}" for c in content])
                 return {
                     "id": item_id,
                     "name": path or repo,
-                    "type": "directory",
+                    "type": "text",
                     "text": text,
                     "data": text,
                     "meta": {"source": "github", "repo": repo, "path": path}
                 }
             
-            # file content
-            try:
-                text = content.decoded_content.decode("utf-8")
-            except:
-                text = ""
-            
-            return {
-                "id": item_id,
-                "name": content.name,
-                "type": content.encoding or "file",
-                "text": text,
-                "data": content.decoded_content,
-                "meta": {
-                    "source": "github",
-                    "repo": repo,
-                    "path": content.path,
-                    "sha": content.sha,
-                    "size": content.size
-                }
+            sha = content["sha"]
+            data = base64.b64decode(content.get("content") or "")
+        
+        from ..ops.extract import content_kind
+        ctype = _content_type(path) or "text/plain"
+        if content_kind(ctype) in ("pdf", "docx"):
+            # binary documents go to their parser as bytes
+            text, body = "", data
+        else:
+            # everything else takes the text path: hand it text, never raw bytes
+            text = body = data.decode("utf-8", errors="replace")
+        
+        return {
+            "id": item_id,
+            "name": path.rsplit("/", 1)[-1],
+            "type": ctype,
+            "text": text,
+            "data": body,
+            "meta": {
+                "source": "github",
+                "repo": repo,
+                "path": path,
+                "sha": sha,
+                "size": len(data)
             }
+        }
@@ -97,12 +97,7 @@ async def list_items(self, folder_id: str = None, mime_types: List[str] = None,
             ).execute()
             
             for f in resp.get("files", []):
-                results.append({
-                    "id": f["id"],
-                    "name": f["name"],
-                    "type": f["mimeType"],
-                    "modified": f.get("modifiedTime")
-                })
+                results.append(self._item(f))
             
             page_token = resp.get("nextPageToken")
             if not page_token:
@@ -110,6 +105,69 @@ async def list_items(self, folder_id: str = None, mime_types: List[str] = None,
         
         return results
     
+    def _item(self, f: Dict) -> Dict:
+        return {
+            "id": f["id"],
+            "name": f["name"],
+            "type": f["mimeType"],
+            "modified": f.get("modifiedTime"),
+            "version": f.get("modifiedTime")
+        }
+    
+    async def list_changes(self, cursor: Optional[str] = None, folder_id: str = None,
+                           mime_types: List[str] = None, **filters) -> Dict:
+        """
+        list files changed since cursor (a drive changes page token)
+        
+        the first sync takes a start token, then lists everything; later ones
+        page through changes().list from the stored token. removed, trashed or
+        no longer matching files are reported as deleted.
+        """
+        if not self._connected:
+            await self.connect()
+        
+        if not cursor:
+            # token first: changes made while listing show up in the next sync
+            token = self.service.changes().getStartPageToken().execute()["startPageToken"]
+            items = await self.list_items(folder_id=folder_id, mime_types=mime_types)
+            return {"items": items, "deleted": [], "cursor": token, "complete": True}
+        
+        changed: Dict[str, Optional[Dict]] = {}
+        page_token = cursor
+        
+        while True:
+            resp = self.service.changes().list(
+                pageToken=page_token,
+                spaces="drive",
+                includeRemoved=True,
+                fields="nextPageToken, newStartPageToken, changes(fileId, removed, file(id, name, mimeType, modifiedTime, trashed, parents))",
+                pageSize=100
+            ).execute()
+            
+            # a file can change several times; its last change wins
+            for ch in resp.get("changes", []):
+                f = ch.get("file") or {}
+                if ch.get("removed") or f.get("trashed"):
+                    changed[ch["fileId"]] = None
+                elif folder_id and folder_id not in f.get("parents", []):
+                    changed[ch["fileId"]] = None
+                elif mime_types and f.get("mimeType") not in mime_types:
+                    changed[ch["fileId"]] = None
+                else:
+                    changed[ch["fileId"]] = f
+            
+            if resp.get("newStartPageToken"):
+                cursor = resp["newStartPageToken"]
+                break
+            page_token = resp["nextPageToken"]
+        
+        return {
+            "items": [self._item(f) for f in changed.values() if f],
+            "deleted": [fid for fid, f in changed.items() if f is None],
+            "cursor": cursor,
+            "complete": False
+        }
+    
     async def fetch_item(self, item_id: str) -> Dict:
         """fetch and extract text from a drive file"""
         if not self._connected:
@@ -3,10 +3,33 @@
 requires: google-api-python-client, google-auth
 env vars: GOOGLE_SERVICE_ACCOUNT_FILE or GOOGLE_CREDENTIALS_JSON
 """
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
+import asyncio
+import hashlib
 import os
 import json
+import re
 from .base import base_connector
+from ..core.config import env
+
+# window texts read while listing are kept for fetch_item up to this many bytes;
+# past that a window is read again when it is fetched
+CACHE_BYTES = 64 * 1024 * 1024
+
+def _a1(title: str) -> str:
+    """quoted sheet name for a1 notation"""
+    return "'" + title.replace("'", "''") + "'"
+
+def _unquote(sheet: str) -> str:
+    if len(sheet) > 1 and sheet[0] == sheet[-1] == "'":
+        return sheet[1:-1].replace("''", "'")
+    return sheet
+
+def _table(rows: List[List[Any]]) -> str:
+    return "\n".join(" | ".join(str(cell) for cell in row) for row in rows)
+
+def window_hash(header: List[Any], rows: List[List[Any]]) -> str:
+    return hashlib.sha256(json.dumps([header, rows], ensure_ascii=False, default=str).encode()).hexdigest()
 
 class google_sheets_connector(base_connector):
     """connector for google sheets"""
@@ -17,6 +40,10 @@ def __init__(self, user_id: str = None):
         super().__init__(user_id)
         self.service = None
         self.creds = None
+        # row windows read by list_items, handed to the ingest stage by fetch_item
+        self._windows: Dict[str, Dict] = {}
+        self._cached = 0
+        self._lock: Optional[asyncio.Lock] = None
     
     async def connect(self, **creds) -> bool:
         """
@@ -56,12 +83,47 @@ async def connect(self, **creds) -> bool:
         self._connected = True
         return True
     
-    async def list_items(self, spreadsheet_id: str = None, **filters) -> List[Dict]:
+    async def _execute(self, req) -> Dict:
+        """googleapiclient blocks and is not thread-safe: one call at a time, off the event loop"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            return await asyncio.to_thread(req.execute)
+    
+    def _content(self, item_id: str, spreadsheet_id: str, sheet: str, rng: str,
+                 header: List[Any], rows: List[List[Any]], first_row: int = None) -> Dict:
+        text = _table(([header] if header else []) + rows)
+        meta = {
+            "source": "google_sheets",
+            "spreadsheet_id": spreadsheet_id,
+            "sheet": sheet,
+            "range": rng,
+            "row_count": len(rows)
+        }
+        if first_row is not None:
+            meta.update({"first_row": first_row, "last_row": first_row + len(rows) - 1, "hash": window_hash(header, rows)})
+        return {
+            "id": item_id,
+            "name": sheet if first_row is None else f"{sheet} rows {first_row}-{first_row + len(rows) - 1}",
+            # already a text table: ingest it as text
+            "type": "text",
+            "text": text,
+            "data": text,
+            "meta": meta
+        }
+    
+    async def list_items(self, spreadsheet_id: str = None, window_rows: int = None, **filters) -> List[Dict]:
         """
-        list sheets in a spreadsheet
+        list sheets in a spreadsheet, or row windows of them
         
         args:
             spreadsheet_id: the spreadsheet id to list sheets from
+            window_rows: rows per item (default [sheets] window_rows; 0 = one item per sheet)
+        
+        in window mode every sheet is paged with values.batchGet, batch_ranges
+        windows per call. each window is one item that repeats the header row;
+        its version is a hash of the header and rows, so sync() skips
+        windows that did not change.
         """
         if not self._connected:
             await self.connect()
@@ -69,14 +131,25 @@ async def list_items(self, spreadsheet_id: str = None, **filters) -> List[Dict]:
         if not spreadsheet_id:
             raise ValueError("spreadsheet_id is required")
         
-        meta = self.service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
+        per = env.sheets_window_rows if window_rows is None else window_rows
+        meta = await self._execute(self.service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id,
+            fields="sheets.properties(title,index,gridProperties.rowCount)"
+        ))
+        self._windows.clear()
+        self._cached = 0
         
         sheets = []
         for sheet in meta.get("sheets", []):
             props = sheet.get("properties", {})
+            title = props.get("title", "Sheet1")
+            if per and per > 0:
+                rows = props.get("gridProperties", {}).get("rowCount", 0)
+                sheets.extend(await self._list_windows(spreadsheet_id, title, props.get("index", 0), rows, per))
+                continue
             sheets.append({
-                "id": f"{spreadsheet_id}!{props.get('title', 'Sheet1')}",
-                "name": props.get("title", "Sheet1"),
+                "id": f"{spreadsheet_id}!{title}",
+                "name": title,
                 "type": "sheet",
                 "index": props.get("index", 0),
                 "spreadsheet_id": spreadsheet_id
@@ -84,12 +157,72 @@ async def list_items(self, spreadsheet_id: str = None, **filters) -> List[Dict]:
         
         return sheets
     
+    async def _list_windows(self, spreadsheet_id: str, title: str, index: int, row_count: int, per: int) -> List[Dict]:
+        bounds = [(a, min(a + per - 1, row_count)) for a in range(2, row_count + 1, per)]
+        step = max(1, env.sheets_batch_ranges)
+        header = None
+        items = []
+        
+        for i in range(0, len(bounds), step):
+            part = bounds[i:i + step]
+            ranges = [f"{_a1(title)}!{a}:{b}" for a, b in part]
+            # the header row rides along with the first batch
+            if header is None:
+                ranges.insert(0, f"{_a1(title)}!1:1")
+            resp = await self._execute(self.service.spreadsheets().values().batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=ranges,
+                majorDimension="ROWS"
+            ))
+            value_ranges = resp.get("valueRanges", [])
+            if header is None:
+                header = ((value_ranges[:1] or [{}])[0].get("values") or [[]])[0]
+                value_ranges = value_ranges[1:]
+            
+            for (a, b), vr in zip(part, value_ranges):
+                rows = vr.get("values", [])
+                if not rows:
+                    continue
+                rng = f"{_a1(title)}!{a}:{b}"
+                item_id = f"{spreadsheet_id}!{rng}"
+                content = self._content(item_id, spreadsheet_id, title, rng, header, rows, a)
+                if self._cached + len(content["text"]) <= CACHE_BYTES:
+                    self._windows[item_id] = content
+                    self._cached += len(content["text"])
+                items.append({
+                    "id": item_id,
+                    "name": content["name"],
+                    "type": "sheet_rows",
+                    "index": index,
+                    "spreadsheet_id": spreadsheet_id,
+                    "sheet": title,
+                    "first_row": a,
+                    "last_row": a + len(rows) - 1,
+                    "version": content["meta"]["hash"]
+                })
+        
+        return items
+    
+    async def sync(self, on_progress=None, full: bool = False, **filters) -> Dict[str, Any]:
+        try:
+            return await super().sync(on_progress, full, **filters)
+        finally:
+            # unchanged windows were never fetched
+            self._windows.clear()
+            self._cached = 0
+    
     async def fetch_item(self, item_id: str) -> Dict:
         """
         fetch sheet data as text
         
-        item_id format: "spreadsheet_id!sheet_name" or just "spreadsheet_id"
+        item_id format: "spreadsheet_id!sheet_name", "spreadsheet_id!'sheet'!first:last"
+        (a row window, listed with its header) or just "spreadsheet_id"
         """
+        content = self._windows.pop(item_id, None)
+        if content:
+            self._cached -= len(content["text"])
+            return content
+        
         if not self._connected:
             await self.connect()
         
@@ -100,30 +233,24 @@ async def fetch_item(self, item_id: str) -> Dict:
             spreadsheet_id = item_id
             sheet_range = "A:ZZ"  # all columns
         
-        result = self.service.spreadsheets().values().get(
+        sheet, _, rows = sheet_range.rpartition("!")
+        m = re.fullmatch(r"(\d+):(\d+)", rows)
+        if sheet and m:
+            # a row window: read it with its header in one batchGet
+            resp = await self._execute(self.service.spreadsheets().values().batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=[f"{sheet}!1:1", sheet_range],
+                majorDimension="ROWS"
+            ))
+            header_vr, window_vr = (resp.get("valueRanges", []) + [{}, {}])[:2]
+            header = (header_vr.get("values") or [[]])[0]
+            return self._content(item_id, spreadsheet_id, _unquote(sheet), sheet_range,
+                                 header, window_vr.get("values", []), int(m.group(1)))
+        
+        result = await self._execute(self.service.spreadsheets().values().get(
             spreadsheetId=spreadsheet_id,
             range=sheet_range
-        ).execute()
+        ))
         
         values = result.get("values", [])
-        
-        # convert to text table
-        lines = []
-        for row in values:
-            lines.append(" | ".join([str(cell) for cell in row]))
-        
-        text = "\n".join(lines)
-        
-        return {
-            "id": item_id,
-            "name": sheet_range,
-            "type": "spreadsheet",
-            "text": text,
-            "data": text,
-            "meta": {
-                "source": "google_sheets",
-                "spreadsheet_id": spreadsheet_id,
-                "range": sheet_range,
-                "row_count": len(values)
-            }
-        }
+        return self._content(item_id, spreadsheet_id, sheet_range, sheet_range, [], values)
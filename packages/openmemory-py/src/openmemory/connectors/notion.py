@@ -66,24 +66,7 @@ async def list_items(self, database_id: str = None, **filters) -> List[Dict]:
                 )
                 
                 for page in resp.get("results", []):
-                    title = ""
-                    props = page.get("properties", {})
-                    
-                    # try to find title property
-                    for prop in props.values():
-                        if prop.get("type") == "title":
-                            titles = prop.get("title", [])
-                            if titles:
-                                title = titles[0].get("plain_text", "")
-                            break
-                    
-                    results.append({
-                        "id": page["id"],
-                        "name": title or "Untitled",
-                        "type": "page",
-                        "url": page.get("url", ""),
-                        "last_edited": page.get("last_edited_time")
-                    })
+                    results.append(self._page_item(page))
                 
                 has_more = resp.get("has_more", False)
                 start_cursor = resp.get("next_cursor")
@@ -92,26 +75,76 @@ async def list_items(self, database_id: str = None, **filters) -> List[Dict]:
             resp = self.client.search(filter={"property": "object", "value": "page"})
             
             for page in resp.get("results", []):
-                title = ""
-                props = page.get("properties", {})
-                
-                for prop in props.values():
-                    if prop.get("type") == "title":
-                        titles = prop.get("title", [])
-                        if titles:
-                            title = titles[0].get("plain_text", "")
-                        break
-                
-                results.append({
-                    "id": page["id"],
-                    "name": title or "Untitled",
-                    "type": "page",
-                    "url": page.get("url", ""),
-                    "last_edited": page.get("last_edited_time")
-                })
+                results.append(self._page_item(page))
         
         return results
     
+    def _page_item(self, page: Dict) -> Dict:
+        title = ""
+        for prop in page.get("properties", {}).values():
+            if prop.get("type") == "title":
+                titles = prop.get("title", [])
+                if titles:
+                    title = titles[0].get("plain_text", "")
+                break
+        
+        return {
+            "id": page["id"],
+            "name": title or "Untitled",
+            "type": "page",
+            "url": page.get("url", ""),
+            "last_edited": page.get("last_edited_time"),
+            "version": page.get("last_edited_time")
+        }
+    
+    async def list_changes(self, cursor: Optional[str] = None, database_id: str = None, **filters) -> Dict:
+        """
+        list pages edited since cursor (the newest last_edited_time seen)
+        
+        notion timestamps are minute-granular, so pages edited at the cursor
+        itself are listed again; their version (last_edited_time) lets sync
+        skip the ones already ingested. archived pages are reported as deleted.
+        """
+        if not self._connected:
+            await self.connect()
+        
+        pages = []
+        has_more = True
+        start_cursor = None
+        
+        while has_more:
+            if database_id:
+                kw = {"database_id": database_id,
+                      "sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]}
+                if cursor:
+                    kw["filter"] = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": cursor}}
+                if start_cursor:
+                    kw["start_cursor"] = start_cursor
+                resp = self.client.databases.query(**kw)
+                batch = resp.get("results", [])
+            else:
+                # search has no edited-since filter: newest first, stop at the cursor
+                kw = {"filter": {"property": "object", "value": "page"},
+                      "sort": {"timestamp": "last_edited_time", "direction": "descending"}}
+                if start_cursor:
+                    kw["start_cursor"] = start_cursor
+                resp = self.client.search(**kw)
+                batch = [p for p in resp.get("results", []) if not cursor or p.get("last_edited_time", "") >= cursor]
+                if len(batch) < len(resp.get("results", [])):
+                    resp = {**resp, "has_more": False}
+            
+            pages.extend(batch)
+            has_more = resp.get("has_more", False)
+            start_cursor = resp.get("next_cursor")
+        
+        newest = max([cursor or ""] + [p.get("last_edited_time") or "" for p in pages]) or None
+        return {
+            "items": [self._page_item(p) for p in pages if not (p.get("archived") or p.get("in_trash"))],
+            "deleted": [p["id"] for p in pages if p.get("archived") or p.get("in_trash")],
+            "cursor": newest,
+            "complete": not cursor
+        }
+    
     async def fetch_item(self, item_id: str) -> Dict:
         """fetch page content as text"""
         if not self._connected:
@@ -120,6 +120,72 @@ async def list_items(self, folder_path: str = "/", user_principal: str = None, *
         
         return results
     
+    async def list_changes(self, cursor: Optional[str] = None, folder_path: str = "/",
+                           user_principal: str = None, **filters) -> Dict:
+        """
+        list files changed since cursor (a graph delta link)
+        
+        without a cursor the delta query enumerates the whole folder tree;
+        the final page's @odata.deltaLink is the next cursor. an expired
+        delta link (410) falls back to a full enumeration.
+        """
+        if not self._connected:
+            await self.connect()
+        
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("pip install httpx")
+        
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+        
+        if user_principal:
+            base = f"{self.graph_url}/users/{user_principal}/drive"
+        else:
+            base = f"{self.graph_url}/me/drive"
+        
+        if cursor:
+            url = cursor
+        elif folder_path == "/":
+            url = f"{base}/root/delta"
+        else:
+            url = f"{base}/root:/{folder_path.strip('/')}:/delta"
+        
+        changed: Dict[str, Optional[Dict]] = {}
+        delta = None
+        
+        async with httpx.AsyncClient() as client:
+            while url:
+                resp = await client.get(url, headers=headers)
+                if resp.status_code == 410 and cursor:
+                    return await self.list_changes(None, folder_path, user_principal)
+                resp.raise_for_status()
+                data = resp.json()
+                
+                for item in data.get("value", []):
+                    if "deleted" in item:
+                        changed[item["id"]] = None
+                    elif "file" in item:
+                        changed[item["id"]] = {
+                            "id": item["id"],
+                            "name": item["name"],
+                            "type": item["file"].get("mimeType", "file"),
+                            "size": item.get("size", 0),
+                            "modified": item.get("lastModifiedDateTime"),
+                            "path": item.get("parentReference", {}).get("path", ""),
+                            "version": item.get("cTag") or item.get("eTag") or item.get("lastModifiedDateTime")
+                        }
+                
+                url = data.get("@odata.nextLink")
+                delta = data.get("@odata.deltaLink", delta)
+        
+        return {
+            "items": [i for i in changed.values() if i],
+            "deleted": [iid for iid, i in changed.items() if i is None],
+            "cursor": delta,
+            "complete": not cursor
+        }
+    
     async def fetch_item(self, item_id: str, user_principal: str = None) -> Dict:
         """fetch file content from onedrive"""
         if not self._connected:
@@ -0,0 +1,59 @@
+"""
+sync state for incremental connector runs
+
+one row per (connector, user, scope) holds the source's change cursor (drive
+changes token, onedrive delta link, notion last_edited_time, github tree sha);
+one row per synced item holds its version and the memories it produced.
+"""
+from typing import Any, Dict, List, Optional
+import json
+import time
+from ..core.db import db, transaction
+
+def get_cursor(connector: str, user_id: str, scope: str) -> Optional[str]:
+    r = db.fetchone("SELECT cursor FROM sync_state WHERE connector=? AND user_id=? AND scope=?", (connector, user_id, scope))
+    return r["cursor"] if r else None
+
+def set_cursor(connector: str, user_id: str, scope: str, cursor: Optional[str]):
+    db.execute("INSERT OR REPLACE INTO sync_state(connector, user_id, scope, cursor, updated_at) VALUES (?,?,?,?,?)",
+               (connector, user_id, scope, cursor, int(time.time()*1000)))
+    db.commit()
+
+def known_items(connector: str, user_id: str, scope: str) -> Dict[str, Dict[str, Any]]:
+    """item_id -> {"version", "memory_ids"} for everything synced under the scope"""
+    rows = db.fetchall("SELECT item_id, version, memory_ids FROM sync_items WHERE connector=? AND user_id=? AND scope=?",
+                       (connector, user_id, scope))
+    return {r["item_id"]: {"version": r["version"], "memory_ids": json.loads(r["memory_ids"] or "[]")} for r in rows}
+
+def live_roots(ids: List[str]) -> set:
+    """the subset of ids that still exist in memories"""
+    ids = list(dict.fromkeys(ids))
+    out = set()
+    for i in range(0, len(ids), 500):
+        part = ids[i:i+500]
+        out.update(r["id"] for r in db.fetchall(f"SELECT id FROM memories WHERE id IN ({','.join('?' * len(part))})", tuple(part)))
+    return out
+
+def record(connector: str, user_id: str, scope: str, done: Dict[str, tuple], gone: List[str]):
+    """store (version, memory_ids) per synced item and forget removed items in one transaction"""
+    ts = int(time.time()*1000)
+    with transaction():
+        for item_id, (version, ids) in done.items():
+            db.execute("INSERT OR REPLACE INTO sync_items(connector, user_id, scope, item_id, version, memory_ids, updated_at) VALUES (?,?,?,?,?,?,?)",
+                       (connector, user_id, scope, item_id, version, json.dumps(ids), ts))
+        for item_id in gone:
+            db.execute("DELETE FROM sync_items WHERE connector=? AND user_id=? AND scope=? AND item_id=?",
+                       (connector, user_id, scope, item_id))
+
+def unreferenced(user_id: str, ids: List[str]) -> List[str]:
+    """ids no synced item of the user points at any more (the ingest cache can share memories between items)"""
+    if not ids: return []
+    used = {r["value"] for r in db.fetchall(
+        "SELECT DISTINCT j.value AS value FROM sync_items s, json_each(s.memory_ids) j WHERE s.user_id=?", (user_id,))}
+    return [i for i in dict.fromkeys(ids) if i not in used]
+
+async def forget(user_id: str, ids: List[str]):
+    """delete memories of changed or removed items, the same way Memory.delete does"""
+    from ..memory.hsg import delete_memories
+
+    await delete_memories(ids)
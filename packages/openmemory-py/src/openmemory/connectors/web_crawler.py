@@ -1,30 +1,136 @@
 """
 web crawler connector for openmemory
-requires: httpx, beautifulsoup4
+requires: httpx, beautifulsoup4 (lxml is used when installed)
 no auth required for public urls
 """
-from typing import List, Dict, Optional, Set
-import os
-from urllib.parse import urljoin, urlparse
+from typing import List, Dict, Optional, Set, Tuple
+from collections import deque
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+import asyncio
+import posixpath
+import time
 from .base import base_connector
+from ..core.config import env
+
+UA = "OpenMemory-Crawler/1.0 (compatible)"
+# dropped before text extraction (links are collected first)
+BOILERPLATE = ["script", "style", "nav", "footer", "header"]
+
+_parser_name: Optional[str] = None
+
+def html_parser() -> str:
+    """lxml when installed, else the stdlib parser"""
+    global _parser_name
+    if _parser_name is None:
+        try:
+            import lxml  # noqa: F401
+            _parser_name = "lxml"
+        except ImportError:
+            _parser_name = "html.parser"
+    return _parser_name
+
+def normalize_url(url: str) -> Optional[str]:
+    """
+    canonical form of an http(s) url, used as the crawl's seen-set key
+    
+    lowercases scheme and host, drops default ports, fragments and utm_*
+    params, resolves dot segments and sorts the query. None for other schemes.
+    """
+    try:
+        p = urlsplit(url.strip())
+        port = p.port
+    except ValueError:
+        return None
+    scheme = p.scheme.lower()
+    host = (p.hostname or "").lower()
+    if scheme not in ("http", "https") or not host:
+        return None
+    if ":" in host:
+        host = f"[{host}]"
+    if port is not None and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    path = posixpath.normpath(p.path) if p.path else "/"
+    if path == ".":
+        path = "/"
+    elif p.path.endswith("/") and path != "/":
+        path += "/"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(p.query, keep_blank_values=True)
+                             if not k.lower().startswith("utm_")))
+    return urlunsplit((scheme, host, path, query, ""))
 
 class web_crawler_connector(base_connector):
     """connector for crawling web pages"""
     
     name = "web_crawler"
     
-    def __init__(self, user_id: str = None, max_pages: int = 50, max_depth: int = 3):
+    def __init__(self, user_id: str = None, max_pages: int = 50, max_depth: int = 3,
+                 concurrency: int = None, per_host: int = None, delay: float = None):
         super().__init__(user_id)
         self.max_pages = max_pages
         self.max_depth = max_depth
+        self.concurrency = concurrency or env.crawler_concurrency
+        self.per_host = per_host or env.crawler_per_host
+        self.delay = env.crawler_delay if delay is None else delay
         self.visited: Set[str] = set()
         self.crawled: List[Dict] = []
+        # parsed content of crawled pages, handed to the ingest stage by fetch_item
+        self.pages: Dict[str, Dict] = {}
+        self._hosts: Dict[str, Dict] = {}
     
     async def connect(self, **creds) -> bool:
         """no auth needed for public crawling"""
         self._connected = True
         return True
     
+    async def _get(self, client, url: str):
+        """GET with at most per_host requests in flight and delay seconds between starts per host"""
+        h = self._hosts.setdefault(urlsplit(url).netloc, {"sem": asyncio.Semaphore(max(1, self.per_host)), "next": 0.0})
+        async with h["sem"]:
+            # reserve the next start slot before sleeping so concurrent callers queue behind it
+            now = time.monotonic()
+            start = max(now, h["next"])
+            h["next"] = start + self.delay
+            if start > now:
+                await asyncio.sleep(start - now)
+            return await client.get(url, headers={"User-Agent": UA})
+    
+    def _parse(self, html: str, base: str, follow: bool) -> Tuple[Optional[str], str, List[str]]:
+        """one parse per page: title, readable text and normalized links"""
+        from bs4 import BeautifulSoup
+        
+        soup = BeautifulSoup(html, html_parser())
+        title = soup.title.string if soup.title else None
+        
+        links = []
+        if follow:
+            for a in soup.find_all("a", href=True):
+                u = normalize_url(urljoin(base, a["href"]))
+                if u:
+                    links.append(u)
+        
+        for element in soup(BOILERPLATE):
+            element.decompose()
+        
+        main = soup.find("main") or soup.find("article") or soup.find("body")
+        text = (main or soup).get_text(separator="\n", strip=True)
+        text = "\n".join(line.strip() for line in text.split("\n") if line.strip())
+        return (title.strip() if title else None), text, links
+    
+    def _content(self, url: str, title: Optional[str], text: str) -> Dict:
+        return {
+            "id": url,
+            "name": title or url,
+            # already extracted: ingest it as plain text, not as a content type it cannot parse
+            "type": "text",
+            "text": text,
+            "data": text,
+            "meta": {
+                "source": "web_crawler",
+                "url": url,
+                "char_count": len(text)
+            }
+        }
+    
     async def list_items(self, start_url: str = None, follow_links: bool = True, **filters) -> List[Dict]:
         """
         crawl from starting url and list discovered pages
@@ -32,128 +138,116 @@ async def list_items(self, start_url: str = None, follow_links: bool = True, **f
         args:
             start_url: url to start crawling from
             follow_links: whether to follow internal links
+        
+        a frontier (deque + seen-set of normalized urls) feeds `concurrency`
+        workers; each page is fetched and parsed once and its content kept
+        for fetch_item. pages are listed in discovery order.
         """
         if not start_url:
             raise ValueError("start_url is required")
         
         try:
             import httpx
-            from bs4 import BeautifulSoup
+            import bs4  # noqa: F401
         except ImportError:
             raise ImportError("pip install httpx beautifulsoup4")
         
+        start = normalize_url(start_url)
+        if not start:
+            raise ValueError(f"not an http(s) url: {start_url}")
+        
         self.visited.clear()
         self.crawled.clear()
+        self.pages.clear()
         
-        base_domain = urlparse(start_url).netloc
-        to_visit = [(start_url, 0)]  # (url, depth)
+        base_domain = urlsplit(start).netloc
+        frontier = deque([(start, 0)])  # (url, depth)
+        order = {start: 0}
+        self.visited.add(start)
+        inflight = 0
+        cond = asyncio.Condition()
         
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            while to_visit and len(self.crawled) < self.max_pages:
-                url, depth = to_visit.pop(0)
-                
-                if url in self.visited:
-                    continue
-                
-                if depth > self.max_depth:
-                    continue
-                
-                self.visited.add(url)
+        def enqueue(url: str, depth: int):
+            if url in self.visited or urlsplit(url).netloc != base_domain:
+                return
+            self.visited.add(url)
+            order[url] = len(order)
+            frontier.append((url, depth))
+        
+        async def crawl(client, url: str, depth: int):
+            resp = await self._get(client, url)
+            if resp.status_code != 200:
+                return None
+            if "text/html" not in resp.headers.get("content-type", ""):
+                return None
+            final = str(resp.url)
+            # bs4 is pure python; parse off the loop so other fetches keep moving
+            title, text, links = await asyncio.to_thread(self._parse, resp.text, final, follow_links and depth < self.max_depth)
+            return title, text, links, normalize_url(final)
+        
+        async def worker(client):
+            nonlocal inflight
+            while True:
+                async with cond:
+                    while not frontier or len(self.crawled) + inflight >= self.max_pages:
+                        if not inflight:
+                            cond.notify_all()
+                            return
+                        await cond.wait()
+                    url, depth = frontier.popleft()
+                    inflight += 1
                 
                 try:
-                    resp = await client.get(url, headers={
-                        "User-Agent": "OpenMemory-Crawler/1.0 (compatible)"
-                    })
-                    
-                    if resp.status_code != 200:
-                        continue
-                    
-                    content_type = resp.headers.get("content-type", "")
-                    if "text/html" not in content_type:
-                        continue
-                    
-                    soup = BeautifulSoup(resp.text, "html.parser")
-                    
-                    # get title
-                    title = soup.title.string if soup.title else url
-                    
-                    self.crawled.append({
-                        "id": url,
-                        "name": title.strip() if title else url,
-                        "type": "webpage",
-                        "url": url,
-                        "depth": depth
-                    })
-                    
-                    # find and queue links
-                    if follow_links and depth < self.max_depth:
-                        for link in soup.find_all("a", href=True):
-                            href = link["href"]
-                            full_url = urljoin(url, href)
-                            parsed = urlparse(full_url)
-                            
-                            # only follow same-domain links
-                            if parsed.netloc == base_domain:
-                                # normalize url
-                                clean_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-                                if clean_url not in self.visited:
-                                    to_visit.append((clean_url, depth + 1))
-                
+                    page = await crawl(client, url, depth)
                 except Exception as e:
                     print(f"[crawler] failed to fetch {url}: {e}")
-                    continue
+                    page = None
+                
+                async with cond:
+                    inflight -= 1
+                    if page:
+                        title, text, links, final = page
+                        self.crawled.append({
+                            "id": url,
+                            "name": title or url,
+                            "type": "webpage",
+                            "url": url,
+                            "depth": depth
+                        })
+                        self.pages[url] = self._content(url, title, text)
+                        # a redirect target counts as seen as well
+                        if final:
+                            self.visited.add(final)
+                        for link in links:
+                            enqueue(link, depth + 1)
+                    cond.notify_all()
         
+        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
+            await asyncio.gather(*(worker(client) for _ in range(max(1, self.concurrency))))
+        
+        self.crawled.sort(key=lambda item: order[item["id"]])
         return self.crawled
     
     async def fetch_item(self, item_id: str) -> Dict:
         """
         fetch and extract text from a url
         
-        item_id is the url to fetch
+        item_id is the url to fetch; pages from the last crawl are served
+        from memory instead of being downloaded again
         """
+        page = self.pages.pop(item_id, None)
+        if page:
+            return page
+        
         try:
             import httpx
-            from bs4 import BeautifulSoup
+            import bs4  # noqa: F401
         except ImportError:
             raise ImportError("pip install httpx beautifulsoup4")
         
         async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            resp = await client.get(item_id, headers={
-                "User-Agent": "OpenMemory-Crawler/1.0 (compatible)"
-            })
+            resp = await self._get(client, item_id)
             resp.raise_for_status()
-            
-            soup = BeautifulSoup(resp.text, "html.parser")
-            
-            # remove script and style elements
-            for element in soup(["script", "style", "nav", "footer", "header"]):
-                element.decompose()
-            
-            # get title
-            title = soup.title.string if soup.title else item_id
-            
-            # get main content
-            main = soup.find("main") or soup.find("article") or soup.find("body")
-            
-            if main:
-                # extract text
-                text = main.get_text(separator="\n", strip=True)
-            else:
-                text = soup.get_text(separator="\n", strip=True)
-            
-            # clean up whitespace
-            lines = [line.strip() for line in text.split("\n") if line.strip()]
-            text = "\n".join(lines)
+            title, text, _ = await asyncio.to_thread(self._parse, resp.text, str(resp.url), False)
         
-        return {
-            "id": item_id,
-            "name": title.strip() if title else item_id,
-            "type": "webpage",
-            "text": text,
-            "data": text,
-            "meta": {
-                "source": "web_crawler",
-                "url": item_id,
-                "char_count": len(text)
-            }
-        }
+        return self._content(item_id, title, text)
@@ -65,18 +65,103 @@ def get(sec: str, key: str, env_var: str, default: Any) -> Any:
         self.decay_half_life = float(get("decay", "half_life_days", "OM_DECAY_HALF_LIFE", 14))
         self.decay_lambda = num(os.getenv("OM_DECAY_LAMBDA"), 0.02) # legacy env
 
+        # [vector]
+        self.vec_quant = get("vector", "quantization", "OM_VEC_QUANT", "none")
+        self.vec_rerank = int(get("vector", "rerank_factor", "OM_VEC_RERANK", 4))
+        self.vec_index = get("vector", "index", "OM_VEC_INDEX", "flat")
+        self.ivf_nlist = int(get("vector", "nlist", "OM_IVF_NLIST", 0))
+        self.ivf_nprobe = int(get("vector", "nprobe", "OM_IVF_NPROBE", 8))
+        self.pq_m = int(get("vector", "pq_m", "OM_PQ_M", 16))
+        self.ivf_min_train = int(get("vector", "min_train", "OM_IVF_MIN_TRAIN", 5000))
+        self.ivf_retrain_ratio = float(get("vector", "retrain_ratio", "OM_IVF_RETRAIN_RATIO", 0.5))
+        self.ivf_retrain_interval = int(get("vector", "retrain_interval_min", "OM_IVF_RETRAIN_INTERVAL", 10))
+        # "segments" mirrors vectors into memory-mapped files per memory segment for the scan
+        self.vec_storage = get("vector", "storage", "OM_VEC_STORAGE", "sqlite")
+        self.vec_segment_dir = get("vector", "segment_dir", "OM_VEC_SEGMENT_DIR", None)
+        self.vec_compact_ratio = float(get("vector", "compact_ratio", "OM_VEC_COMPACT_RATIO", 0.3))
+        # two-stage retrieval: shortlist on 128-dim compressed_vec, re-score with sector vectors
+        self.vec_two_stage = s_bool(str(get("vector", "two_stage", "OM_VEC_TWO_STAGE", "false")))
+        self.vec_shortlist = int(get("vector", "shortlist", "OM_VEC_SHORTLIST", 200))
+
+        # [graph] waypoint maintenance
+        self.waypoint_decay_lambda = float(get("graph", "decay_lambda", "OM_WAYPOINT_DECAY_LAMBDA", 0.005))
+        self.waypoint_max_degree = int(get("graph", "max_out_degree", "OM_WAYPOINT_MAX_DEGREE", 32))
+        self.waypoint_maint_interval = int(get("graph", "maint_interval_min", "OM_WAYPOINT_MAINT_INTERVAL", 60))
+        # query-time expansion: "bfs" (weighted walk) or "ppr" (personalized PageRank)
+        self.waypoint_expansion = get("graph", "expansion", "OM_WAYPOINT_EXPANSION", "bfs")
+
+        # [reflect] background reflection
+        self.auto_reflect = s_bool(str(get("reflect", "enabled", "OM_AUTO_REFLECT", "true")))
+        self.reflect_interval = int(get("reflect", "interval_min", "OM_REFLECT_INTERVAL", 10))
+        self.reflect_min = int(get("reflect", "min_memories", "OM_REFLECT_MIN", 20))
+        self.reflect_sim = float(get("reflect", "similarity", "OM_REFLECT_SIM", 0.8))
+        self.reflect_batch = int(get("reflect", "batch_size", "OM_REFLECT_BATCH", 500))
+        self.reflect_max_open = int(get("reflect", "max_open_clusters", "OM_REFLECT_MAX_OPEN", 2000))
+
+        # [ingest] root-child documents
+        self.ingest_concurrency = int(get("ingest", "concurrency", "OM_INGEST_CONCURRENCY", 8))
+        self.ingest_queue = int(get("ingest", "queue_size", "OM_INGEST_QUEUE", 16))
+        # sections embedded ahead and written per transaction; bounds what a document holds in memory
+        self.ingest_batch = int(get("ingest", "batch_size", "OM_INGEST_BATCH", 64))
+        # skip documents whose content hash was already ingested for the user
+        self.ingest_cache = s_bool(str(get("ingest", "cache", "OM_INGEST_CACHE", "true")))
+
+        # [connectors] ingest_all pipeline: concurrent fetchers -> bounded queue -> ingest workers;
+        # a connector class may set its own fetch_concurrency / ingest_concurrency
+        self.connector_fetch_concurrency = int(get("connectors", "fetch_concurrency", "OM_CONNECTOR_FETCH_CONCURRENCY", 8))
+        self.connector_ingest_concurrency = int(get("connectors", "ingest_concurrency", "OM_CONNECTOR_INGEST_CONCURRENCY", 4))
+        self.connector_queue = int(get("connectors", "queue_size", "OM_CONNECTOR_QUEUE", 32))
+
+        # [crawler] web_crawler frontier: concurrent fetches, per-host cap and the
+        # politeness delay between request starts to the same host
+        self.crawler_concurrency = int(get("crawler", "concurrency", "OM_CRAWLER_CONCURRENCY", 8))
+        self.crawler_per_host = int(get("crawler", "per_host", "OM_CRAWLER_PER_HOST", 2))
+        self.crawler_delay = float(get("crawler", "delay_sec", "OM_CRAWLER_DELAY", 0.5))
+
+        # [sheets] google_sheets ingests row windows (header row repeated in each);
+        # 0 = one document per sheet. windows are read batch_ranges at a time via values.batchGet
+        self.sheets_window_rows = int(get("sheets", "window_rows", "OM_SHEETS_WINDOW_ROWS", 500))
+        self.sheets_batch_ranges = int(get("sheets", "batch_ranges", "OM_SHEETS_BATCH_RANGES", 20))
+
+        # [extract] CPU-bound parsers (pdf/docx/html) run in a process pool; 0 workers = threads
+        self.extract_workers = int(get("extract", "workers", "OM_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+        self.extract_timeout = float(get("extract", "timeout_sec", "OM_EXTRACT_TIMEOUT", 120))
+        self.extract_max_bytes = int(get("extract", "max_bytes", "OM_EXTRACT_MAX_BYTES", 50 * 1024 * 1024))
+
+        # [http] pooled clients shared by the AI adapters (ai/registry.py)
+        self.http_max_connections = int(get("http", "max_connections", "OM_HTTP_MAX_CONNECTIONS", 100))
+        self.http_max_keepalive = int(get("http", "max_keepalive", "OM_HTTP_MAX_KEEPALIVE", 20))
+        self.http_keepalive_expiry = float(get("http", "keepalive_expiry_sec", "OM_HTTP_KEEPALIVE_EXPIRY", 30))
+        self.http_timeout = float(get("http", "timeout_sec", "OM_HTTP_TIMEOUT", 60))
+        self.http2 = s_bool(str(get("http", "http2", "OM_HTTP2", "true")))
+
+        # [ai] client-side flow control for every provider (ai/limiter.py); rate 0 = unlimited
+        self.ai_rate = float(get("ai", "rate", "OM_AI_RATE", 0))
+        self.ai_burst = float(get("ai", "burst", "OM_AI_BURST", 0))
+        self.ai_concurrency = int(get("ai", "concurrency", "OM_AI_CONCURRENCY", 16))
+        self.ai_max_retries = int(get("ai", "max_retries", "OM_AI_MAX_RETRIES", 5))
+        # JSON overrides by "provider" or "provider:model", e.g. {"openai": {"rate": 50}}
+        self.ai_limits = get("ai", "limits", "OM_AI_LIMITS", "{}")
+
         # [ai] or root params
         self.openai_key = get("ai", "openai_key", "OPENAI_API_KEY", "") or os.getenv("OM_OPENAI_API_KEY")
         self.openai_base_url = get("ai", "openai_base", "OM_OPENAI_BASE_URL", "https://api.openai.com/v1")
         self.openai_model = get("ai", "openai_model", "OM_OPENAI_MODEL", None)
         
         self.ollama_url = get("ai", "ollama_url", "OLLAMA_URL", "http://localhost:11434")
+        self.ollama_model = get("ai", "ollama_model", "OM_OLLAMA_MODEL", None)
+        # /api/embed takes a list of inputs: texts per request, requests in flight
+        self.ollama_batch_size = int(get("ai", "ollama_batch_size", "OM_OLLAMA_BATCH_SIZE", 32))
+        self.ollama_concurrency = int(get("ai", "ollama_concurrency", "OM_OLLAMA_CONCURRENCY", 4))
         
         self.emb_kind = get("ai", "embedding_provider", "OM_EMBED_KIND", "synthetic")
         self.gemini_key = get("ai", "gemini_key", "GEMINI_API_KEY",  os.getenv("OM_GEMINI_KEY"))
         self.aws_region = get("ai", "aws_region", "AWS_REGION", None)
         self.aws_access_key_id = get("ai", "aws_access_key_id", "AWS_ACCESS_KEY_ID", None)
         self.aws_secret_access_key = get("ai", "aws_secret_access_key", "AWS_SECRET_ACCESS_KEY", None)
+        # boto3 is blocking: invocations run on a bounded thread pool sharing one client
+        self.aws_max_workers = int(get("ai", "aws_max_workers", "OM_AWS_MAX_WORKERS", 16))
+        self.aws_max_retries = int(get("ai", "aws_max_retries", "OM_AWS_MAX_RETRIES", 5))
 
         # Legacy / Internal
         self.vec_dim = int(num(os.getenv("OM_VEC_DIM"), 1536))
@@ -1,7 +1,9 @@
+import asyncio
 import sqlite3
 import time
 import json
 import logging
+from contextlib import contextmanager
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Union
 from .config import env
@@ -14,6 +16,10 @@
 class DB:
     def __init__(self):
         self.conn: Optional[sqlite3.Connection] = None
+        # open transaction() blocks; commit() is deferred while > 0
+        self.tx_depth = 0
+        self.tx_owner = None
+        self._after_commit: List[Any] = []
         
     def connect(self):
         if self.conn: return
@@ -96,7 +102,16 @@ def fetchone(self, sql: str, params: tuple = ()) -> Optional[sqlite3.Row]:
         return self.conn.execute(sql, params).fetchone()
         
     def commit(self):
-        if self.conn: self.conn.commit()
+        if self.conn and not self.tx_depth: self.conn.commit()
+
+    def after_commit(self, fn):
+        """Run fn once the open transaction commits (dropped on rollback); now if none is open.
+
+        In-memory mirrors of the tables (waypoint graph, compact index, vector indexes)
+        are updated through this, so a rolled back write never reaches them.
+        """
+        if self.tx_depth: self._after_commit.append(fn)
+        else: fn()
 
 # Single global instance
 db = DB()
@@ -151,6 +166,9 @@ def del_mem(self, mid: str):
         db.execute("DELETE FROM memories WHERE id=?", (mid,))
         db.execute("DELETE FROM vectors WHERE id=?", (mid,))
         db.execute("DELETE FROM waypoints WHERE src_id=? OR dst_id=?", (mid, mid))
+        db.execute("DELETE FROM reflect_members WHERE mem_id=?", (mid,))
+        db.execute("DELETE FROM reflection_links WHERE src_id=? OR reflection_id=?", (mid, mid))
+        db.execute("DELETE FROM ingest_cache WHERE root_id=?", (mid,))
         db.commit()
 
     def del_mem_by_user(self, uid: str):
@@ -159,11 +177,58 @@ def del_mem_by_user(self, uid: str):
         # Or just DELETE FROM vectors WHERE id IN (SELECT id FROM memories WHERE user_id=?)
         db.execute("DELETE FROM vectors WHERE id IN (SELECT id FROM memories WHERE user_id=?)", (uid,))
         db.execute("DELETE FROM waypoints WHERE src_id IN (SELECT id FROM memories WHERE user_id=?) OR dst_id IN (SELECT id FROM memories WHERE user_id=?)", (uid, uid))
+        db.execute("DELETE FROM reflect_members WHERE mem_id IN (SELECT id FROM memories WHERE user_id=?)", (uid,))
+        db.execute("DELETE FROM reflect_clusters WHERE user_id=?", (uid,))
+        db.execute("DELETE FROM reflection_links WHERE src_id IN (SELECT id FROM memories WHERE user_id=?) OR reflection_id IN (SELECT id FROM memories WHERE user_id=?)", (uid, uid))
+        db.execute("DELETE FROM ingest_cache WHERE user_id=?", (uid,))
+        db.execute("DELETE FROM sync_state WHERE user_id=?", (uid,))
+        db.execute("DELETE FROM sync_items WHERE user_id=?", (uid,))
         db.execute("DELETE FROM memories WHERE user_id=?", (uid,))
         db.commit()
 
 q = Queries()
 
+def _task():
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+@contextmanager
 def transaction():
-    # context manager preferred
-    return db.conn
+    """Group synchronous writes into one transaction.
+
+    The connection is shared by every task, so the block must not await: a task
+    scheduled during the await would write into this transaction and be rolled
+    back with it. Do network work (embeddings) first, then write. Nested blocks
+    join the outer one; db.commit() inside is deferred to the outermost block.
+    """
+    db.connect()
+    me = _task()
+    if db.tx_depth:
+        if db.tx_owner is not me:
+            raise RuntimeError("transaction() entered while another task holds one open across an await")
+        db.tx_depth += 1
+        try:
+            yield db.conn
+        finally:
+            db.tx_depth -= 1
+        return
+    db.conn.execute("BEGIN")
+    db.tx_depth, db.tx_owner, db._after_commit = 1, me, []
+    try:
+        yield db.conn
+    except BaseException:
+        db.tx_depth, db.tx_owner, db._after_commit = 0, None, []
+        db.conn.execute("ROLLBACK")
+        raise
+    after, db._after_commit = db._after_commit, []
+    try:
+        db.conn.execute("COMMIT")
+    finally:
+        db.tx_depth, db.tx_owner = 0, None
+    for fn in after: fn()
+
+def log_maint_op(op: str, count: int):
+    db.execute("INSERT INTO stats(ts, metrics) VALUES (?, ?)", (int(time.time()*1000), json.dumps({"type": op, "count": count})))
+    db.commit()
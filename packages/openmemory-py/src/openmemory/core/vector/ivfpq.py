@@ -0,0 +1,196 @@
+from typing import List, Optional, Dict, Any, Tuple
+import numpy as np
+import logging
+
+# IVF-PQ coarse index (inverted file + product quantization).
+# Vectors are unit-normalised, so ranking by L2 distance equals ranking by cosine.
+# - coarse k-means splits the space into `nlist` inverted lists
+# - residuals (x - centroid) are product-quantized into `m` uint8 codes
+# - queries probe the `nprobe` nearest lists and score codes with per-list
+#   asymmetric distance lookup tables (ADC)
+# Results are candidates only; callers re-rank against full vectors.
+
+logger = logging.getLogger("vector_store.ivfpq")
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    if x.ndim == 1:
+        n = float(np.linalg.norm(x))
+        return x / n if n > 0 else x
+    n = np.linalg.norm(x, axis=1, keepdims=True)
+    n[n == 0] = 1.0
+    return x / n
+
+def assign(x: np.ndarray, c: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    # argmin ||x - c||^2 == argmin (||c||^2 - 2 x.c)
+    cn = (c * c).sum(1)
+    out = np.empty(x.shape[0], dtype=np.int64)
+    for i in range(0, x.shape[0], chunk):
+        out[i:i+chunk] = (cn - 2.0 * (x[i:i+chunk] @ c.T)).argmin(1)
+    return out
+
+def kmeans(x: np.ndarray, k: int, niter: int = 15, seed: int = 0) -> np.ndarray:
+    n = x.shape[0]
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+    c = x[rng.choice(n, k, replace=False)].astype(np.float32, copy=True)
+    for _ in range(niter):
+        a = assign(x, c)
+        counts = np.bincount(a, minlength=k)
+        full = counts > 0
+        # per-cluster sums via one sort + reduceat (np.add.at is far slower)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        sums = np.add.reduceat(x[np.argsort(a, kind="stable")], starts[full], axis=0)
+        c[full] = sums / counts[full, None]
+        if (~full).any():
+            # re-seed empty clusters from random points
+            c[~full] = x[rng.choice(n, int((~full).sum()))]
+    return c
+
+def pick_m(dim: int, m: int) -> int:
+    # largest divisor of dim not above the requested number of sub-quantizers
+    for cand in range(min(m, dim), 0, -1):
+        if dim % cand == 0: return cand
+    return 1
+
+class IVFPQIndex:
+    def __init__(self, dim: int, nlist: int = 0, m: int = 16, nprobe: int = 8, ksub: int = 256, seed: int = 0):
+        self.dim = dim
+        self.nlist_req = nlist
+        self.m = pick_m(dim, m)
+        self.dsub = dim // self.m
+        self.nprobe = nprobe
+        self.ksub = ksub
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None  # (m, ksub, dsub)
+        # per list: ids, owners, entry sequence numbers and codes, appended in
+        # chunks and merged lazily. An entry is live while _live[id] == its seq,
+        # so re-adding an id supersedes the old entry and removal is O(1).
+        self._ids: List[List[np.ndarray]] = []
+        self._users: List[List[np.ndarray]] = []
+        self._seqs: List[List[np.ndarray]] = []
+        self._codes: List[List[np.ndarray]] = []
+        self._live: Dict[str, int] = {}
+        self._seq = 0
+        self._entries = 0
+        self.trained_size = 0
+        self.added_since_train = 0
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def ntotal(self) -> int:
+        return len(self._live)
+
+    @property
+    def stale(self) -> int:
+        return self._entries - len(self._live)
+
+    def train(self, x: np.ndarray, max_train: int = 65536):
+        x = _unit(x)
+        n = x.shape[0]
+        if n > max_train:
+            x = x[np.random.default_rng(self.seed).choice(n, max_train, replace=False)]
+        nlist = self.nlist_req or max(1, int(4 * np.sqrt(n)))
+        self.centroids = kmeans(x, nlist, seed=self.seed)
+        res = (x - self.centroids[assign(x, self.centroids)]).reshape(x.shape[0], self.m, self.dsub)
+        ksub = min(self.ksub, x.shape[0])
+        self.codebooks = np.stack([kmeans(np.ascontiguousarray(res[:, j, :]), ksub, seed=self.seed + j) for j in range(self.m)])
+        nl = self.centroids.shape[0]
+        self._ids = [[] for _ in range(nl)]
+        self._users = [[] for _ in range(nl)]
+        self._seqs = [[] for _ in range(nl)]
+        self._codes = [[] for _ in range(nl)]
+        self._live = {}
+        self._entries = 0
+        self.trained_size = n
+        self.added_since_train = 0
+
+    def _encode(self, res: np.ndarray) -> np.ndarray:
+        r = res.reshape(res.shape[0], self.m, self.dsub)
+        codes = np.empty((res.shape[0], self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = assign(np.ascontiguousarray(r[:, j, :]), self.codebooks[j])
+        return codes
+
+    def add(self, ids: List[str], x: np.ndarray, users: Optional[List[Optional[str]]] = None):
+        if not self.trained: raise RuntimeError("index not trained")
+        if not len(ids): return
+        x = _unit(np.atleast_2d(x))
+        lists = assign(x, self.centroids)
+        codes = self._encode(x - self.centroids[lists])
+        users = users if users is not None else [None] * len(ids)
+        id_arr = np.asarray(ids, dtype=object)
+        user_arr = np.asarray(users, dtype=object)
+        seqs = np.arange(self._seq, self._seq + len(ids), dtype=np.int64)
+        self._seq += len(ids)
+        for l in np.unique(lists):
+            sel = lists == l
+            self._ids[l].append(id_arr[sel])
+            self._users[l].append(user_arr[sel])
+            self._seqs[l].append(seqs[sel])
+            self._codes[l].append(codes[sel])
+        for i, sq in zip(ids, seqs):
+            self._live[i] = int(sq)
+        self._entries += len(ids)
+        self.added_since_train += len(ids)
+
+    def remove(self, id: str):
+        self._live.pop(id, None)
+
+    def _list(self, l: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        if len(self._ids[l]) > 1:
+            self._ids[l] = [np.concatenate(self._ids[l])]
+            self._users[l] = [np.concatenate(self._users[l])]
+            self._seqs[l] = [np.concatenate(self._seqs[l])]
+            self._codes[l] = [np.concatenate(self._codes[l])]
+        if not self._ids[l]:
+            return (np.empty(0, dtype=object), np.empty(0, dtype=object),
+                    np.empty(0, dtype=np.int64), np.empty((0, self.m), dtype=np.uint8))
+        return self._ids[l][0], self._users[l][0], self._seqs[l][0], self._codes[l][0]
+
+    def search(self, q, k: int, nprobe: Optional[int] = None, user_id: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Return up to k (id, approx_l2) candidates, closest first."""
+        if not self.trained: return []
+        q = _unit(q)
+        nprobe = max(1, min(nprobe or self.nprobe, self.centroids.shape[0]))
+        cd = ((self.centroids - q) ** 2).sum(1)
+        probe = np.argsort(cd)[:nprobe]
+        ar = np.arange(self.m)[None, :]
+        all_ids, all_d = [], []
+        for l in probe:
+            ids, users, seqs, codes = self._list(int(l))
+            if not ids.shape[0]: continue
+            rq = (q - self.centroids[l]).reshape(self.m, 1, self.dsub)
+            lut = ((self.codebooks - rq) ** 2).sum(-1)  # (m, ksub)
+            d = lut[ar, codes].sum(1)
+            live = np.fromiter((self._live.get(i, -1) for i in ids), dtype=np.int64, count=ids.shape[0])
+            mask = live == seqs
+            if user_id is not None:
+                mask &= users == user_id
+            all_ids.append(ids[mask])
+            all_d.append(d[mask])
+        if not all_ids: return []
+        ids = np.concatenate(all_ids)
+        d = np.concatenate(all_d)
+        top = np.argsort(d, kind="stable")[:k]
+        return [(ids[i], float(d[i])) for i in top]
+
+    def needs_retrain(self, ratio: float) -> bool:
+        if not self.trained: return False
+        return self.added_since_train + self.stale > ratio * max(1, self.trained_size)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "dim": self.dim,
+            "nlist": 0 if self.centroids is None else int(self.centroids.shape[0]),
+            "m": self.m,
+            "ntotal": self.ntotal,
+            "stale": self.stale,
+            "trained_size": self.trained_size,
+            "added_since_train": self.added_since_train,
+            "code_bytes": self.ntotal * self.m,
+        }
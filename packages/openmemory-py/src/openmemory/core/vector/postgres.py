@@ -1,7 +1,9 @@
-
-from typing import List, Optional, Dict, Any
-import json
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+import re
+import struct
+import hashlib
 import logging
+import numpy as np
 from ..types import MemRow
 from ..vector_store import VectorStore, VectorRow
 
@@ -10,72 +12,182 @@
 
 logger = logging.getLogger("vector_store.postgres")
 
+# pgvector binary wire format (vector_send / vector_recv):
+#   int16 dim, int16 unused (always 0), then dim x float4, all big-endian
+_HDR = struct.Struct(">HH")
+
+def encode_vector(v) -> bytes:
+    arr = np.asarray(v, dtype=">f4")
+    return _HDR.pack(arr.shape[0], 0) + arr.tobytes()
+
+def decode_vector(buf: bytes) -> List[float]:
+    dim, _ = _HDR.unpack_from(buf)
+    return np.frombuffer(buf, dtype=">f4", count=dim, offset=_HDR.size).astype(np.float32).tolist()
+
+_SAFE = re.compile(r"[^a-z0-9_]")
+
+def _ident(s: str) -> str:
+    return _SAFE.sub("_", s.lower())
+
+def _literal(s: str) -> str:
+    """a quoted sql string literal (standard_conforming_strings: only ' needs doubling)"""
+    if "\0" in s:
+        raise ValueError("NUL byte in sql literal")
+    return "'" + s.replace("'", "''") + "'"
+
 class PostgresVectorStore(VectorStore):
-    def __init__(self, dsn: str, table_name: str = "vectors"):
+    def __init__(self, dsn: str, table_name: str = "vectors", index: str = "hnsw", ef_search: int = 40,
+                 hnsw_m: int = 16, hnsw_ef_construction: int = 64, ivf_lists: int = 100, ivf_probes: int = 10):
+        if index not in ("hnsw", "ivfflat", "none"):
+            raise ValueError(f"unknown pgvector index type: {index}")
         self.dsn = dsn
         self.table = table_name
+        self.index = index
+        self.ef_search = int(ef_search)
+        self.hnsw_m = int(hnsw_m)
+        self.hnsw_ef_construction = int(hnsw_ef_construction)
+        self.ivf_lists = int(ivf_lists)
+        self.ivf_probes = int(ivf_probes)
         self.pool = None
+        # (sector, dim) pairs with a live ANN index
+        self._indexed: set = set()
+
+    async def _init_conn(self, conn):
+        await conn.set_type_codec("vector", encoder=encode_vector, decoder=decode_vector, format="binary", schema="public")
+        if self.index == "hnsw":
+            await conn.execute(f"SET hnsw.ef_search = {self.ef_search}")
+        elif self.index == "ivfflat":
+            await conn.execute(f"SET ivfflat.probes = {self.ivf_probes}")
+
+    async def _ensure_schema(self, conn):
+        t = self.table
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        await conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {t} (
+                id TEXT NOT NULL,
+                sector TEXT NOT NULL,
+                user_id TEXT,
+                v vector,
+                dim INTEGER,
+                created_at TIMESTAMPTZ DEFAULT NOW(),
+                PRIMARY KEY (id, sector)
+            )
+        """)
+        # Tables created by older versions were keyed on id alone, so a second sector
+        # for the same memory overwrote the first. Widen the key in place.
+        await conn.execute(f"""
+            DO $$ BEGIN
+                IF (SELECT count(*) FROM information_schema.key_column_usage
+                    WHERE table_name = '{t}' AND constraint_name = '{t}_pkey') = 1 THEN
+                    ALTER TABLE {t} DROP CONSTRAINT {t}_pkey;
+                    ALTER TABLE {t} ADD PRIMARY KEY (id, sector);
+                END IF;
+            END $$;
+        """)
+        await conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_user_idx ON {t} (user_id)")
 
     async def _get_pool(self):
-        import asyncpg
         if not self.pool:
-            self.pool = await asyncpg.create_pool(self.dsn)
-            # Ensure table exists
-            async with self.pool.acquire() as conn:
-                await conn.execute(f"""
-                    CREATE TABLE IF NOT EXISTS {self.table} (
-                        id TEXT PRIMARY KEY,
-                        sector TEXT NOT NULL,
-                        user_id TEXT,
-                        v vector,
-                        dim INTEGER,
-                        created_at TIMESTAMPTZ DEFAULT NOW()
-                    )
-                """)
-                # Index
-                # await conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_idx ON {self.table} USING hnsw (v vector_cosine_ops)")
+            import asyncpg
+            # schema (and the extension) must exist before the pool registers the codec
+            conn = await asyncpg.connect(self.dsn)
+            try:
+                await self._ensure_schema(conn)
+            finally:
+                await conn.close()
+            self.pool = await asyncpg.create_pool(self.dsn, init=self._init_conn)
         return self.pool
 
+    def _index_name(self, sector: str, dim: int) -> str:
+        name = _ident(sector)
+        if name != sector:
+            # sanitizing is lossy: keep "a-b" and "a_b" on separate indexes
+            name += "_" + hashlib.sha1(sector.encode()).hexdigest()[:8]
+        return f"{self.table}_{name}_{dim}_{self.index}"
+
+    async def ensure_index(self, sector: str, dim: int):
+        """Create the per-sector ANN index for vectors of the given dimension."""
+        if self.index == "none" or (sector, dim) in self._indexed: return
+        pool = await self._get_pool()
+        expr = f"(v::vector({dim})) vector_cosine_ops"
+        # the predicate must match the stored value that queries bind as sector = $2
+        where = f"WHERE sector = {_literal(sector)} AND dim = {int(dim)}"
+        if self.index == "hnsw":
+            opts = f"WITH (m = {self.hnsw_m}, ef_construction = {self.hnsw_ef_construction})"
+        else:
+            opts = f"WITH (lists = {self.ivf_lists})"
+        sql = f"CREATE INDEX IF NOT EXISTS {self._index_name(sector, dim)} ON {self.table} USING {self.index} ({expr}) {opts} {where}"
+        async with pool.acquire() as conn:
+            await conn.execute(sql)
+        self._indexed.add((sector, dim))
+        logger.info(f"[PG] ensured {self.index} index for {sector}/{dim}")
+
+    async def drop_index(self, sector: str, dim: int):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.execute(f"DROP INDEX IF EXISTS {self._index_name(sector, dim)}")
+        self._indexed.discard((sector, dim))
+
+    async def reindex(self, sector: str, dim: int):
+        """Rebuild a sector index, e.g. after a bulk load into an ivfflat index."""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.execute(f"REINDEX INDEX {self._index_name(sector, dim)}")
+
     async def storeVector(self, id: str, sector: str, vector: List[float], dim: int, user_id: Optional[str] = None):
         pool = await self._get_pool()
-        # pgvector expects a list of floats, asyncpg handles it if registered or passed as array string? 
-        # Actually asyncpg needs manual casting or use of pgvector-python type if registered.
-        # Simplest way: pass as string list format '[1.1,2.2,...]'
-        vec_str = str(vector)
-        
         sql = f"""
             INSERT INTO {self.table} (id, sector, user_id, v, dim)
-            VALUES ($1, $2, $3, $4::vector, $5)
-            ON CONFLICT (id) DO UPDATE SET
-                sector = EXCLUDED.sector,
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (id, sector) DO UPDATE SET
                 user_id = EXCLUDED.user_id,
-                v = EXCLUDED.v
+                v = EXCLUDED.v,
+                dim = EXCLUDED.dim
         """
         async with pool.acquire() as conn:
-            await conn.execute(sql, id, sector, user_id, vec_str, dim)
+            await conn.execute(sql, id, sector, user_id, vector, dim)
+        await self.ensure_index(sector, dim)
+
+    async def store_many(self, rows: Iterable[Tuple[str, str, List[float], int, Optional[str]]]):
+        """Bulk upsert (id, sector, vector, dim, user_id) rows via COPY into a staging table."""
+        # last write wins for duplicate keys, as with repeated storeVector calls
+        dedup = {}
+        for id, sector, vector, dim, user_id in rows:
+            dedup[(id, sector)] = (id, sector, user_id, vector, dim)
+        if not dedup: return 0
+
+        pool = await self._get_pool()
+        stage = f"{self.table}_stage"
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {stage} (id TEXT, sector TEXT, user_id TEXT, v vector, dim INTEGER) ON COMMIT DELETE ROWS")
+                await conn.copy_records_to_table(stage, records=list(dedup.values()), columns=["id", "sector", "user_id", "v", "dim"])
+                await conn.execute(f"""
+                    INSERT INTO {self.table} (id, sector, user_id, v, dim)
+                    SELECT id, sector, user_id, v, dim FROM {stage}
+                    ON CONFLICT (id, sector) DO UPDATE SET
+                        user_id = EXCLUDED.user_id,
+                        v = EXCLUDED.v,
+                        dim = EXCLUDED.dim
+                """)
+        for sector, dim in {(r[1], r[4]) for r in dedup.values()}:
+            await self.ensure_index(sector, dim)
+        return len(dedup)
 
     async def getVectorsById(self, id: str) -> List[VectorRow]:
         pool = await self._get_pool()
-        sql = f"SELECT id, sector, v::text as v_txt, dim FROM {self.table} WHERE id=$1"
+        sql = f"SELECT id, sector, v, dim FROM {self.table} WHERE id=$1"
         async with pool.acquire() as conn:
             rows = await conn.fetch(sql, id)
-        
-        res = []
-        for r in rows:
-            # Parse "[1.0, 2.0]" string back to list
-            vec = json.loads(r["v_txt"])
-            res.append(VectorRow(r["id"], r["sector"], vec, r["dim"]))
-        return res
+        return [VectorRow(r["id"], r["sector"], r["v"], r["dim"]) for r in rows]
 
     async def getVector(self, id: str, sector: str) -> Optional[VectorRow]:
         pool = await self._get_pool()
-        sql = f"SELECT id, sector, v::text as v_txt, dim FROM {self.table} WHERE id=$1 AND sector=$2"
+        sql = f"SELECT id, sector, v, dim FROM {self.table} WHERE id=$1 AND sector=$2"
         async with pool.acquire() as conn:
             r = await conn.fetchrow(sql, id, sector)
-        
         if not r: return None
-        vec = json.loads(r["v_txt"])
-        return VectorRow(r["id"], r["sector"], vec, r["dim"])
+        return VectorRow(r["id"], r["sector"], r["v"], r["dim"])
 
     async def deleteVectors(self, id: str):
         pool = await self._get_pool()
@@ -84,27 +196,34 @@ async def deleteVectors(self, id: str):
 
     async def search(self, vector: List[float], sector: str, k: int, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         pool = await self._get_pool()
-        vec_str = str(vector)
-        
-        filter_sql = " AND sector=$2"
-        args = [vec_str, sector]
-        arg_idx = 3
+        dim = len(vector)
+        await self.ensure_index(sector, dim)
+
+        # the distance expression must match the index expression for the planner to use it
+        dist = f"(v::vector({dim})) <=> $1::vector({dim})"
+        filter_sql = " AND sector=$2 AND dim=$3"
+        args = [vector, sector, dim]
+        arg_idx = 4
 
         if filter and filter.get("user_id"):
             filter_sql += f" AND user_id=${arg_idx}"
             args.append(filter["user_id"])
             arg_idx += 1
-        
-        # <=> is cosine distance operator
+
         sql = f"""
-            SELECT id, 1 - (v <=> $1::vector) as similarity
+            SELECT id, 1 - ({dist}) as similarity
             FROM {self.table}
             WHERE 1=1 {filter_sql}
-            ORDER BY v <=> $1::vector
-            LIMIT {k}
+            ORDER BY {dist}
+            LIMIT {int(k)}
         """
-        
+
         async with pool.acquire() as conn:
-            rows = await conn.fetch(sql, *args)
-            
+            if filter and filter.get("ef_search") and self.index == "hnsw":
+                async with conn.transaction():
+                    await conn.execute(f"SET LOCAL hnsw.ef_search = {int(filter['ef_search'])}")
+                    rows = await conn.fetch(sql, *args)
+            else:
+                rows = await conn.fetch(sql, *args)
+
         return [{"id": r["id"], "similarity": float(r["similarity"])} for r in rows]
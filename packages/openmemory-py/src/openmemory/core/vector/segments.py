@@ -0,0 +1,260 @@
+from typing import List, Optional, Dict, Any, Tuple, Iterator
+import os
+import re
+import logging
+import numpy as np
+
+# Append-only, memory-mapped vector segment files.
+# One file set per (memories.segment, sector, dim) under the segment directory:
+#   <segment>/<sector>-<dim>.vec   raw float32 rows, unit-normalised, appended in place
+#   <segment>/<sector>-<dim>.ids   one "id\tuser_id\trowid" line per row, same order
+#                                  (rowid: the vectors-table row it mirrors, for watermark())
+#   <segment>/<sector>-<dim>.del   tombstone bitmap, bit i set once row i is dead
+# Rows are never rewritten: an update tombstones the old row and appends a new one.
+# compact() rewrites a file without its dead rows once they pile up.
+
+logger = logging.getLogger("vector_store.segments")
+
+_SAFE = re.compile(r"[^A-Za-z0-9_]")
+_NAME = re.compile(r"^(.+)-(\d+)\.vec$")
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    if x.ndim == 1:
+        n = float(np.linalg.norm(x))
+        return x / n if n > 0 else x
+    n = np.linalg.norm(x, axis=1, keepdims=True)
+    n[n == 0] = 1.0
+    return x / n
+
+def _lines(ids, users, rowids) -> Iterator[str]:
+    return (f"{i}\t{u or ''}\t{r}\n" for i, u, r in zip(ids, users, rowids))
+
+class SegmentFile:
+    def __init__(self, path: str, segment: int, sector: str, dim: int):
+        self.base = path
+        self.segment = segment
+        self.sector = sector
+        self.dim = dim
+        self.ids: List[str] = []
+        self.users: List[Optional[str]] = []
+        self.rowids: List[int] = []
+        self.dead = np.zeros(0, dtype=bool)
+        self._mm: Optional[np.memmap] = None
+        self._ids_arr: Optional[np.ndarray] = None
+        self._users_arr: Optional[np.ndarray] = None
+        self._load()
+
+    @property
+    def rows(self) -> int:
+        return len(self.ids)
+
+    @property
+    def live(self) -> int:
+        return self.rows - int(self.dead[:self.rows].sum())
+
+    def _load(self):
+        if os.path.exists(self.base + ".ids"):
+            with open(self.base + ".ids", "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"): break  # torn final write
+                    id, _, rest = line[:-1].partition("\t")
+                    user, _, rowid = rest.partition("\t")
+                    self.ids.append(id)
+                    self.users.append(user or None)
+                    # files written before rowids were recorded read as 0 and never match the table
+                    self.rowids.append(int(rowid) if rowid.isdigit() else 0)
+        vec_rows = os.path.getsize(self.base + ".vec") // (self.dim * 4) if os.path.exists(self.base + ".vec") else 0
+        n = min(len(self.ids), vec_rows)
+        # a crash between the two appends leaves one side longer; drop the excess
+        if len(self.ids) > n:
+            del self.ids[n:], self.users[n:], self.rowids[n:]
+            self._write_ids()
+        if os.path.exists(self.base + ".vec") and os.path.getsize(self.base + ".vec") != n * self.dim * 4:
+            with open(self.base + ".vec", "r+b") as f:
+                f.truncate(n * self.dim * 4)
+        self.dead = np.zeros(n, dtype=bool)
+        if os.path.exists(self.base + ".del"):
+            bits = np.unpackbits(np.fromfile(self.base + ".del", dtype=np.uint8))
+            m = min(n, bits.shape[0])
+            self.dead[:m] = bits[:m].astype(bool)
+
+    def _write_ids(self, path: Optional[str] = None):
+        with open(path or self.base + ".ids", "w", encoding="utf-8") as f:
+            f.writelines(_lines(self.ids, self.users, self.rowids))
+
+    def append(self, ids: List[str], mat: np.ndarray, users: List[Optional[str]], rowids: List[int]) -> int:
+        """Append rows and return the row number of the first one."""
+        start = self.rows
+        with open(self.base + ".vec", "ab") as f:
+            f.write(_unit(mat).astype(np.float32).tobytes())
+        with open(self.base + ".ids", "a", encoding="utf-8") as f:
+            f.writelines(_lines(ids, users, rowids))
+        self.ids.extend(ids)
+        self.users.extend(users)
+        self.rowids.extend(rowids)
+        self.dead = np.concatenate([self.dead, np.zeros(len(ids), dtype=bool)])
+        self._mm = None
+        self._ids_arr = self._users_arr = None
+        return start
+
+    def tombstone(self, row: int):
+        if row >= self.rows or self.dead[row]: return
+        self.dead[row] = True
+        # write through the one byte holding the bit
+        byte = np.packbits(self.dead[(row // 8) * 8:(row // 8) * 8 + 8], bitorder="big")
+        mode = "r+b" if os.path.exists(self.base + ".del") else "w+b"
+        with open(self.base + ".del", mode) as f:
+            f.seek(row // 8)
+            f.write(byte.tobytes())
+
+    def matrix(self) -> np.ndarray:
+        """Zero-copy (rows, dim) view over the file."""
+        if not self.rows: return np.empty((0, self.dim), dtype=np.float32)
+        if self._mm is None or self._mm.shape[0] != self.rows:
+            self._mm = np.memmap(self.base + ".vec", dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+        return self._mm
+
+    def id_array(self) -> np.ndarray:
+        if self._ids_arr is None:
+            self._ids_arr = np.asarray(self.ids, dtype=object)
+        return self._ids_arr
+
+    def user_array(self) -> np.ndarray:
+        if self._users_arr is None:
+            self._users_arr = np.asarray(self.users, dtype=object)
+        return self._users_arr
+
+    def compact(self) -> Dict[str, int]:
+        """Rewrite the file without dead rows; returns the new row number per live id."""
+        keep = np.flatnonzero(~self.dead[:self.rows])
+        mat = np.array(self.matrix()[keep]) if keep.size else np.empty((0, self.dim), dtype=np.float32)
+        ids = [self.ids[i] for i in keep]
+        users = [self.users[i] for i in keep]
+        rowids = [self.rowids[i] for i in keep]
+        self._mm = None
+        tmp = self.base + ".vec.tmp"
+        with open(tmp, "wb") as f:
+            f.write(mat.tobytes())
+        os.replace(tmp, self.base + ".vec")
+        self.ids, self.users, self.rowids = ids, users, rowids
+        self._write_ids(self.base + ".ids.tmp")
+        os.replace(self.base + ".ids.tmp", self.base + ".ids")
+        if os.path.exists(self.base + ".del"): os.remove(self.base + ".del")
+        self.dead = np.zeros(len(ids), dtype=bool)
+        self._ids_arr = self._users_arr = None
+        return {id: r for r, id in enumerate(ids)}
+
+    def remove_files(self):
+        self._mm = None
+        for ext in (".vec", ".ids", ".del"):
+            if os.path.exists(self.base + ext): os.remove(self.base + ext)
+
+class SegmentStore:
+    """Segment files under one directory plus the (id, sector) -> row locator."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files: Dict[Tuple[int, str, int], SegmentFile] = {}
+        # id -> sector -> (file key, row)
+        self.loc: Dict[str, Dict[str, Tuple[Tuple[int, str, int], int]]] = {}
+        self.fresh = not os.path.isdir(root)
+        os.makedirs(root, exist_ok=True)
+        self._open_all()
+
+    def _open_all(self):
+        for seg in os.listdir(self.root):
+            d = os.path.join(self.root, seg)
+            if not seg.isdigit() or not os.path.isdir(d): continue
+            for name in os.listdir(d):
+                m = _NAME.match(name)
+                if not m: continue
+                sf = SegmentFile(os.path.join(d, name[:-4]), int(seg), m.group(1), int(m.group(2)))
+                self.files[(sf.segment, sf.sector, sf.dim)] = sf
+                for r, id in enumerate(sf.ids):
+                    if not sf.dead[r]:
+                        self.loc.setdefault(id, {})[sf.sector] = ((sf.segment, sf.sector, sf.dim), r)
+
+    def _file(self, segment: int, sector: str, dim: int) -> SegmentFile:
+        key = (segment, sector, dim)
+        if key not in self.files:
+            d = os.path.join(self.root, str(segment))
+            os.makedirs(d, exist_ok=True)
+            self.files[key] = SegmentFile(os.path.join(d, f"{_SAFE.sub('_', sector)}-{dim}"), segment, sector, dim)
+        return self.files[key]
+
+    def put(self, segment: int, sector: str, rows: List[Tuple[str, np.ndarray, Optional[str], int]]):
+        """rows: (id, vector, user_id, vectors-table rowid)"""
+        if not rows: return
+        dim = rows[0][1].shape[0]
+        for id, _, _, _ in rows:
+            self._drop(id, sector)
+        sf = self._file(segment, sector, dim)
+        start = sf.append([r[0] for r in rows], np.stack([r[1] for r in rows]), [r[2] for r in rows], [r[3] for r in rows])
+        for i, (id, _, _, _) in enumerate(rows):
+            self.loc.setdefault(id, {})[sector] = ((segment, sector, dim), start + i)
+
+    def _drop(self, id: str, sector: str):
+        at = self.loc.get(id, {}).pop(sector, None)
+        if at: self.files[at[0]].tombstone(at[1])
+
+    def delete(self, id: str):
+        for sector in list(self.loc.get(id, {})):
+            self._drop(id, sector)
+        self.loc.pop(id, None)
+
+    def sector_files(self, sector: str, dim: int) -> Iterator[SegmentFile]:
+        for (seg, sec, d), sf in sorted(self.files.items()):
+            if sec == sector and d == dim and sf.rows: yield sf
+
+    def search(self, q, sector: str, k: int, user_id: Optional[str] = None) -> List[Tuple[str, float]]:
+        qu = _unit(q)
+        ids, sims = [], []
+        for sf in self.sector_files(sector, qu.shape[0]):
+            s = sf.matrix() @ qu  # rows are unit length, so this is cosine similarity
+            mask = ~sf.dead[:sf.rows]
+            if user_id is not None:
+                mask &= sf.user_array() == user_id
+            sel = np.flatnonzero(mask)
+            if not sel.size: continue
+            ids.append(sf.id_array()[sel])
+            sims.append(s[sel])
+        if not ids: return []
+        ids = np.concatenate(ids)
+        sims = np.concatenate(sims)
+        n = min(k, sims.shape[0])
+        top = np.argpartition(-sims, n - 1)[:n] if n < sims.shape[0] else np.arange(sims.shape[0])
+        top = top[np.argsort(-sims[top], kind="stable")]
+        return [(ids[i], float(sims[i])) for i in top]
+
+    def compact(self, ratio: float = 0.3) -> int:
+        """Compact files whose dead fraction exceeds ratio; returns files rewritten."""
+        n = 0
+        for key, sf in list(self.files.items()):
+            if not sf.rows or (sf.rows - sf.live) <= ratio * sf.rows: continue
+            if not sf.live:
+                sf.remove_files()
+                del self.files[key]
+            else:
+                for id, r in sf.compact().items():
+                    self.loc[id][sf.sector] = (key, r)
+            n += 1
+        return n
+
+    def watermark(self) -> Tuple[int, int, int]:
+        """(live rows, max rowid, sum of rowids) of the table rows the live rows mirror."""
+        n = hi = total = 0
+        for sf in self.files.values():
+            if not sf.rows: continue
+            r = np.asarray(sf.rowids, dtype=np.int64)[~sf.dead[:sf.rows]]
+            if not r.size: continue
+            n += int(r.size)
+            hi = max(hi, int(r.max()))
+            total += int(r.sum())
+        return n, hi, total
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            f"{seg}/{sec}/{d}": {"rows": sf.rows, "live": sf.live, "bytes": sf.rows * d * 4}
+            for (seg, sec, d), sf in sorted(self.files.items())
+        }
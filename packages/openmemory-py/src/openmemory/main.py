@@ -1,7 +1,11 @@
 import logging
 from typing import List, Dict, Optional, Any
 from .core.db import db, q
-from .memory.hsg import hsg_query, add_hsg_memory
+from .memory.hsg import hsg_query, add_hsg_memory, delete_memories
+from .core.vector_store import vector_store
+from .memory.compact_index import compact_index
+from .memory.waypoint_graph import waypoint_graph
+from .memory.user_summary import user_profiles
 from .ops.ingest import ingest_document
 from .openai_handler import OpenAIRegistrar
 
@@ -40,12 +44,17 @@ async def get(self, memory_id: str):
         
     async def delete(self, memory_id: str):
         # Hard delete for now
-        q.del_mem(memory_id)
+        await delete_memories([memory_id])
         
     async def delete_all(self, user_id: str = None):
         uid = user_id or self.default_user
         if uid:
+            ids = [r["id"] for r in db.fetchall("SELECT id FROM memories WHERE user_id=?", (uid,))]
+            await vector_store.delete_many(ids)
             q.del_mem_by_user(uid)
+            compact_index.remove_user(uid)
+            waypoint_graph.remove_user(uid)
+            user_profiles.invalidate(uid)
         
     def history(self, user_id: str = None, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
         uid = user_id or self.default_user
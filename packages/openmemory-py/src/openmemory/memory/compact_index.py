@@ -0,0 +1,103 @@
+from typing import List, Dict, Optional, Any
+import numpy as np
+from ..core.db import db
+
+# In-memory matrix of the 128-dim `compressed_vec` of every memory, used as the
+# first stage of two-stage retrieval: one matrix-vector product over all memories
+# shortlists candidates, which are then re-scored with full per-sector vectors.
+# Rows live in a capacity-doubling buffer; removals only clear the live flag.
+
+COMPACT_DIM = 128
+
+def compact(vec, target_dim: int = COMPACT_DIM) -> np.ndarray:
+    # NumPy twin of hsg.compress_vec_for_storage: bucket means, then unit length
+    v = np.asarray(vec, dtype=np.float32)
+    if v.shape[0] > target_dim:
+        edges = (np.arange(target_dim + 1) * (v.shape[0] / target_dim)).astype(np.int64)
+        sums = np.add.reduceat(v, edges[:-1])
+        v = sums / np.maximum(np.diff(edges), 1)
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else v
+
+class CompactIndex:
+    def __init__(self, dim: int = COMPACT_DIM):
+        self.dim = dim
+        self.loaded = False
+        self._mat = np.zeros((0, dim), dtype=np.float32)
+        self._live = np.zeros(0, dtype=bool)
+        self._ids: List[str] = []
+        self._users: List[Optional[str]] = []
+        self._row: Dict[str, int] = {}
+        self._users_arr: Optional[np.ndarray] = None
+        self._n = 0
+
+    def __len__(self) -> int:
+        return len(self._row)
+
+    def load(self):
+        """Read compressed vectors of all memories; mean_vec is compacted when missing."""
+        self.__init__(self.dim)
+        self.loaded = True
+        cur = db.conn.execute("SELECT id, user_id, mean_vec, compressed_vec FROM memories WHERE compressed_vec IS NOT NULL OR mean_vec IS NOT NULL")
+        while True:
+            rows = cur.fetchmany(5000)
+            if not rows: break
+            for r in rows:
+                buf = r["compressed_vec"] or r["mean_vec"]
+                v = np.frombuffer(buf, dtype=np.float32)
+                if r["compressed_vec"] is None: v = compact(v, self.dim)
+                self._put(r["id"], r["user_id"], v)
+
+    def _put(self, id: str, user_id: Optional[str], v: np.ndarray):
+        if v.shape[0] != self.dim: return
+        if id in self._row:
+            self._live[self._row[id]] = False
+        if self._n == self._mat.shape[0]:
+            cap = max(1024, self._n * 2)
+            self._mat = np.resize(self._mat, (cap, self.dim))
+            self._live = np.concatenate([self._live, np.zeros(cap - self._live.shape[0], dtype=bool)])
+        self._mat[self._n] = v
+        self._live[self._n] = True
+        self._ids.append(id)
+        self._users.append(user_id)
+        self._row[id] = self._n
+        self._n += 1
+        self._users_arr = None
+
+    def add(self, id: str, user_id: Optional[str], vec):
+        # before load() the row is picked up from the table anyway
+        if not self.loaded: return
+        v = np.asarray(vec, dtype=np.float32)
+        self._put(id, user_id, v if v.shape[0] == self.dim else compact(v, self.dim))
+
+    def remove(self, id: str):
+        r = self._row.pop(id, None)
+        if r is not None: self._live[r] = False
+
+    def remove_user(self, user_id: str):
+        for i in [i for i, r in self._row.items() if self._users[r] == user_id]:
+            self.remove(i)
+
+    def shortlist(self, q, n: int, user_id: Optional[str] = None) -> List[str]:
+        if not self.loaded: self.load()
+        if not self._row: return []
+        qc = compact(q, self.dim)
+        mask = self._live[:self._n].copy()
+        if user_id is not None:
+            if self._users_arr is None:
+                self._users_arr = np.asarray(self._users, dtype=object)
+            mask &= self._users_arr == user_id
+        sel = np.flatnonzero(mask)
+        if not sel.size: return []
+        s = self._mat[sel] @ qc
+        if n < s.shape[0]:
+            part = np.argpartition(-s, n)[:n]
+        else:
+            part = np.arange(s.shape[0])
+        part = part[np.argsort(-s[part], kind="stable")]
+        return [self._ids[sel[i]] for i in part]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"loaded": self.loaded, "rows": len(self), "slots": self._n, "bytes": self._n * self.dim * 4}
+
+compact_index = CompactIndex()
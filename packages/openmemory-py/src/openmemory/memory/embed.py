@@ -14,25 +14,20 @@
 from ..utils.text import canonical_tokens_from_text, synonyms_for, canonicalize_token
 from ..utils.vectors import vec_to_buf, buf_to_vec
 
-from ..ai.openai import OpenAIAdapter
-from ..ai.ollama import OllamaAdapter
-from ..ai.gemini import GeminiAdapter
-from ..ai.aws import AwsAdapter
-from ..ai.synthetic import SyntheticAdapter
+from ..ai.registry import get_adapter
 
 async def emb_dispatch(provider: str, t: str, s: str) -> List[float]:
-    if provider == "synthetic": 
-        return await SyntheticAdapter(env.vec_dim or 768).embed(t, model=s)
+    # adapters (and their pooled connections) come from the registry, not one per call
     if provider == "openai": 
-        return await OpenAIAdapter().embed(t, model=env.openai_model)
+        return await get_adapter("openai").embed(t, model=env.openai_model)
     if provider == "ollama":
-        return await OllamaAdapter().embed(t, model=env.ollama_embedding_model)
+        return await get_adapter("ollama").embed(t, model=env.ollama_embedding_model)
     if provider == "gemini":
-        return await GeminiAdapter().embed(t, model=env.gemini_embedding_model) 
+        return await get_adapter("gemini").embed(t, model=env.gemini_embedding_model) 
     if provider == "aws":
-        return await AwsAdapter().embed(t, model=env.aws_embedding_model)
+        return await get_adapter("aws").embed(t, model=env.aws_embedding_model)
         
-    return await SyntheticAdapter(env.vec_dim or 768).embed(t, model=s)
+    return await get_adapter("synthetic").embed(t, model=s)
 
 # Public API
 
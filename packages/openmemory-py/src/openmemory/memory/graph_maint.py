@@ -0,0 +1,105 @@
+import asyncio
+import json
+import time
+import numpy as np
+from typing import Dict, Any, Optional
+
+from ..core.db import db, transaction
+from ..core.config import env
+from .hsg import REINFORCEMENT
+from .waypoint_graph import waypoint_graph
+
+# Waypoint graph maintenance: keeps the waypoints table (and so expansion cost)
+# bounded as the corpus grows. One pass, in one transaction:
+#   1. drop self-loops and edges whose endpoints no longer exist
+#   2. decay weights exponentially by days since the edge was last touched
+#   3. prune edges under REINFORCEMENT["prune_threshold"]
+#   4. keep only the heaviest max_out_degree edges per source
+# The in-memory graph is reloaded afterwards. Structural edges (document root ->
+# section, written by ingest) are exempt from 2-4: they are not similarity links.
+
+STRUCTURAL = "src_id IN (SELECT id FROM memories WHERE json_extract(meta, '$.is_root'))"
+
+def graph_metrics() -> Dict[str, Any]:
+    r = db.fetchone("""
+        SELECT count(*) AS edges, count(DISTINCT src_id) AS sources, coalesce(avg(weight), 0) AS avg_weight
+        FROM waypoints
+    """)
+    d = db.fetchone("SELECT coalesce(max(c), 0) AS max_deg FROM (SELECT count(*) AS c FROM waypoints GROUP BY src_id)")
+    return {
+        "edges": r["edges"],
+        "sources": r["sources"],
+        "avg_out_degree": r["edges"] / r["sources"] if r["sources"] else 0.0,
+        "max_out_degree": d["max_deg"],
+        "avg_weight": float(r["avg_weight"]),
+    }
+
+def _decay(now: int, lam: float, batch: int = 10000) -> int:
+    if lam <= 0: return 0
+    n = last = 0
+    # keyset pages, so the scan never reads rows this pass already rewrote
+    while True:
+        rows = db.conn.execute(f"SELECT rowid, weight, updated_at FROM waypoints WHERE rowid > ? AND updated_at < ? AND NOT {STRUCTURAL} ORDER BY rowid LIMIT ?",
+                               (last, now, batch)).fetchall()
+        if not rows: break
+        last = rows[-1]["rowid"]
+        w = np.array([r["weight"] or 0.0 for r in rows], dtype=np.float64)
+        days = (now - np.array([r["updated_at"] or now for r in rows], dtype=np.float64)) / 86400000.0
+        nw = np.minimum(w * np.exp(-lam * days), REINFORCEMENT["max_waypoint_weight"])
+        db.conn.executemany("UPDATE waypoints SET weight=?, updated_at=? WHERE rowid=?",
+                            [(float(x), now, r["rowid"]) for x, r in zip(nw, rows)])
+        n += len(rows)
+    return n
+
+async def run_graph_maintenance(now: Optional[int] = None, max_degree: Optional[int] = None) -> Dict[str, Any]:
+    now = now or int(time.time() * 1000)
+    max_degree = max_degree or env.waypoint_max_degree
+    t0 = time.time()
+    res: Dict[str, Any] = {}
+    with transaction() as c:
+        res["self_loops"] = c.execute("DELETE FROM waypoints WHERE src_id = dst_id").rowcount
+        res["orphans"] = c.execute("""
+            DELETE FROM waypoints
+            WHERE NOT EXISTS (SELECT 1 FROM memories m WHERE m.id = waypoints.src_id)
+               OR NOT EXISTS (SELECT 1 FROM memories m WHERE m.id = waypoints.dst_id)
+        """).rowcount
+        res["decayed"] = _decay(now, env.waypoint_decay_lambda)
+        res["pruned"] = c.execute(f"DELETE FROM waypoints WHERE weight < ? AND NOT {STRUCTURAL}", (REINFORCEMENT["prune_threshold"],)).rowcount
+        res["capped"] = c.execute(f"""
+            DELETE FROM waypoints WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (PARTITION BY src_id ORDER BY weight DESC, updated_at DESC) AS rn
+                    FROM waypoints WHERE NOT {STRUCTURAL}
+                ) WHERE rn > ?
+            )
+        """, (max_degree,)).rowcount
+
+    waypoint_graph.reset()
+    res.update(graph_metrics())
+    res["duration_ms"] = int((time.time() - t0) * 1000)
+    db.execute("INSERT INTO stats(ts, metrics) VALUES (?, ?)", (now, json.dumps({"type": "waypoint_maint", **res})))
+    db.commit()
+    return res
+
+_timer_task = None
+
+async def graph_maintenance_loop():
+    interval = (env.waypoint_maint_interval or 60) * 60
+    while True:
+        try:
+            res = await run_graph_maintenance()
+            print(f"[WAYPOINTS] Maintenance: {res}")
+        except Exception as e:
+            print(f"[WAYPOINTS] Maintenance error: {e}")
+        await asyncio.sleep(interval)
+
+def start_graph_maintenance():
+    global _timer_task
+    if _timer_task: return
+    _timer_task = asyncio.create_task(graph_maintenance_loop())
+
+def stop_graph_maintenance():
+    global _timer_task
+    if _timer_task:
+        _timer_task.cancel()
+        _timer_task = None
@@ -16,6 +16,7 @@
 from ..utils.chunking import chunk_text
 from ..utils.keyword import keyword_filter_memories, compute_keyword_overlap
 from ..utils.vectors import buf_to_vec, vec_to_buf, cos_sim
+from ..utils.quant import cosine_scores, top_k
 from .embed import embed_multi_sector, embed_for_sector, embed_multi_sector, calc_mean_vec 
 # embed_multi_sector returns list of results, calc_mean_vec takes them.
 from .decay import inc_q, dec_q, on_query_hit, calc_recency_score as calc_recency_score_decay, pick_tier # wait, calc_recency_score is in hsg.ts in backend?
@@ -27,7 +28,9 @@
     applyRetrievalTraceReinforcementToMemory,
     propagateAssociativeReinforcementToLinkedNodes
 )
-from .user_summary import update_user_summary
+from .user_summary import user_profiles
+from .compact_index import compact_index
+from .waypoint_graph import waypoint_graph
 
 # Shared Constants (mirrored from hsg.ts)
 SCORING_WEIGHTS = {
@@ -321,9 +324,40 @@ async def create_single_waypoint(new_id: str, new_mean: List[float], ts: int, us
         # q.ins_waypoint values(?,?,?,?,?,?)
         # src_id, dst_id, user_id, weight, created, updated
         db.execute("INSERT OR REPLACE INTO waypoints(src_id,dst_id,user_id,weight,created_at,updated_at) VALUES (?,?,?,?,?,?)", (new_id, best, user_id, float(best_sim), ts, ts))
-    else:
-        db.execute("INSERT OR REPLACE INTO waypoints(src_id,dst_id,user_id,weight,created_at,updated_at) VALUES (?,?,?,?,?,?)", (new_id, new_id, user_id, 1.0, ts, ts))
+        db.commit()
+        db.after_commit(lambda: waypoint_graph.add_edge(new_id, best, user_id, float(best_sim)))
+    # no neighbour yet: the first memory of a user stays unlinked rather than looping to itself
+
+def link_similar(ids: List[str], ts: int, user_id: Optional[str] = None, pool: int = 1000) -> int:
+    """create_single_waypoint for a whole batch: one matrix product instead of a scan per memory."""
+    if not ids: return 0
+    uid = user_id or "anonymous"
+    mems = q.all_mem_by_user(uid, pool, 0) if user_id else q.all_mem(pool, 0)
+    new = {m["id"]: m for m in db.fetchall(f"SELECT id, mean_vec FROM memories WHERE id IN ({','.join('?' * len(ids))})", tuple(ids))}
+    # candidates: the recent pool plus the batch itself, so siblings can link to each other
+    cand = {m["id"]: m["mean_vec"] for m in mems if m["mean_vec"]}
+    cand.update({i: m["mean_vec"] for i, m in new.items() if m["mean_vec"]})
+    by_dim: Dict[int, List[str]] = {}
+    for cid, buf in cand.items():
+        by_dim.setdefault(len(buf), []).append(cid)
+    rows = []
+    for dim, cids in by_dim.items():
+        src = [i for i in dict.fromkeys(ids) if i in new and new[i]["mean_vec"] and len(new[i]["mean_vec"]) == dim]
+        if not src or len(cids) < 2: continue
+        C = np.stack([np.frombuffer(cand[c], dtype=np.float32) for c in cids]).astype(np.float64)
+        C /= np.maximum(np.linalg.norm(C, axis=1, keepdims=True), 1e-12)
+        pos = {c: j for j, c in enumerate(cids)}
+        S = C[[pos[i] for i in src]] @ C.T
+        S[np.arange(len(src)), [pos[i] for i in src]] = -np.inf
+        best = np.argmax(S, axis=1)
+        rows += [(i, cids[b], uid, float(S[k, b]), ts, ts) for k, (i, b) in enumerate(zip(src, best))]
+    db.conn.executemany("INSERT OR REPLACE INTO waypoints(src_id,dst_id,user_id,weight,created_at,updated_at) VALUES (?,?,?,?,?,?)", rows)
     db.commit()
+    def apply():
+        for s_id, d_id, _, w, _, _ in rows:
+            waypoint_graph.add_edge(s_id, d_id, uid, w)
+    db.after_commit(apply)
+    return len(rows)
 
 async def calc_multi_vec_fusion_score(mid: str, qe: Dict[str, List[float]], w: Dict[str, float]) -> float:
     vecs = await store.getVectorsById(mid)
@@ -348,25 +382,55 @@ async def calc_multi_vec_fusion_score(mid: str, qe: Dict[str, List[float]], w: D
         
     return s / tot if tot > 0 else 0.0
 
-async def add_hsg_memory(content: str, tags: Optional[str] = None, metadata: Any = None, user_id: Optional[str] = None) -> Dict[str, Any]:
-    simhash = compute_simhash(content)
+def _find_dup(simhash: str):
     existing = db.fetchone("SELECT * FROM memories WHERE simhash=? ORDER BY salience DESC LIMIT 1", (simhash,))
-    
-    if existing and hamming_dist(simhash, existing["simhash"]) <= 3:
-        now = int(time.time()*1000)
-        boost = min(1.0, (existing["salience"] or 0) + 0.15)
-        db.execute("UPDATE memories SET last_seen_at=?, salience=?, updated_at=? WHERE id=?", (now, boost, now, existing["id"]))
-        db.commit()
-        return {
-            "id": existing["id"],
-            "primary_sector": existing["primary_sector"],
-            "sectors": [existing["primary_sector"]],
-            "deduplicated": True
-        }
-        
-    mid = str(uuid.uuid4())
+    return existing if existing and hamming_dist(simhash, existing["simhash"]) <= 3 else None
+
+async def prepare_hsg_memory(content: str, tags: Optional[str] = None, metadata: Any = None, user_id: Optional[str] = None) -> Dict[str, Any]:
+    """The network half of add_hsg_memory: classify and embed, write nothing.
+
+    The plan is stored by write_hsg_memory, which does not await, so callers can
+    embed many memories concurrently and store them in one transaction().
+    """
+    simhash = compute_simhash(content)
+    p = {"id": str(uuid.uuid4()), "content": content, "tags": tags, "metadata": metadata,
+         "user_id": user_id, "simhash": simhash, "dup": None, "emb": None}
+    existing = _find_dup(simhash)
+    if existing:
+        p["dup"] = existing["id"]
+        return p
+    chunks = chunk_text(content)
+    p["chunks"] = len(chunks)
+    p["cls"] = classify_content(content, metadata)
+    p["sectors"] = [p["cls"]["primary"]] + p["cls"]["additional"]
+    emb = await embed_multi_sector(p["id"], content, p["sectors"], chunks if len(chunks) > 1 else None)
+    # float32 arrays: a batch of plans can be held until its transaction
+    p["emb"] = [{**r, "vector": np.asarray(r["vector"], dtype=np.float32)} for r in emb]
+    return p
+
+def _boost_dup(mid: str) -> Dict[str, Any]:
     now = int(time.time()*1000)
-    
+    row = db.fetchone("SELECT primary_sector, salience FROM memories WHERE id=?", (mid,))
+    boost = min(1.0, ((row["salience"] if row else 0) or 0) + 0.15)
+    db.execute("UPDATE memories SET last_seen_at=?, salience=?, updated_at=? WHERE id=?", (now, boost, now, mid))
+    db.commit()
+    sec = row["primary_sector"] if row else None
+    return {"id": mid, "primary_sector": sec, "sectors": [sec], "deduplicated": True}
+
+def write_hsg_memory(p: Dict[str, Any]) -> Dict[str, Any]:
+    """The storage half of add_hsg_memory; synchronous, so it can run inside transaction().
+
+    Vectors go to SQLite stores directly; for other backends they are left in
+    p["vector_rows"] for store_prepared() once the transaction has committed.
+    """
+    p["vector_rows"] = []
+    # a sibling prepared concurrently may have been stored since
+    existing = None if p["dup"] else _find_dup(p["simhash"])
+    if p["dup"] or existing: return _boost_dup(p["dup"] or existing["id"])
+
+    mid, user_id, metadata, cls = p["id"], p["user_id"], p["metadata"], p["cls"]
+    now = int(time.time()*1000)
+
     # Ensure user
     if user_id:
         u = db.fetchone("SELECT * FROM users WHERE user_id=?", (user_id,))
@@ -374,122 +438,129 @@ async def add_hsg_memory(content: str, tags: Optional[str] = None, metadata: Any
             db.execute("INSERT OR IGNORE INTO users(user_id,summary,reflection_count,created_at,updated_at) VALUES (?,?,?,?,?)",
                        (user_id, "User profile initializing...", 0, now, now))
             db.commit()
-            
-    chunks = chunk_text(content)
-    use_chunks = len(chunks) > 1
-    cls = classify_content(content, metadata)
-    all_secs = [cls["primary"]] + cls["additional"]
-    
-    # Start TX
-    # using db.conn directly for simplicity
-    try:
-        # db.execute("BEGIN")
-        # Segments logic
-        max_seg_res = db.fetchone("SELECT coalesce(max(segment), 0) as max_seg FROM memories")
-        # ... (rest of logic unchanged, just unindented or comments?)
-        # Actually I must keep Python indentation.
-        # I just comment out the execute calls.
-        
-        max_seg_res = db.fetchone("SELECT coalesce(max(segment), 0) as max_seg FROM memories")
-        cur_seg = max_seg_res["max_seg"]
-        cnt_res = db.fetchone("SELECT count(*) as c FROM memories WHERE segment=?", (cur_seg,))
-        if cnt_res["c"] >= env.seg_size:
-            cur_seg += 1
-            print(f"[HSG] Rotated to segment {cur_seg}")
-            
-        stored = extract_essence(content, cls["primary"], env.summary_max_length)
-        sec_cfg = SECTOR_CONFIGS[cls["primary"]]
-        init_sal = max(0.0, min(1.0, 0.4 + 0.1 * len(cls["additional"])))
-        
-        # Insert Mem
-        q.ins_mem(
-            id=mid,
-            user_id=user_id or "anonymous",
-            segment=cur_seg,
-            content=stored,
-            simhash=simhash,
-            primary_sector=cls["primary"],
-            tags=tags,
-            meta=json.dumps(metadata or {}),
-            created_at=now,
-            updated_at=now,
-            last_seen_at=now,
-            salience=init_sal,
-            decay_lambda=sec_cfg["decay_lambda"],
-            version=1,
-            mean_dim=None,
-            mean_vec=None,
-            compressed_vec=None,
-            feedback_score=0
-        )
-        
-        # Embed
-        emb_res = await embed_multi_sector(mid, content, all_secs, chunks if use_chunks else None)
+
+    # Segments logic
+    max_seg_res = db.fetchone("SELECT coalesce(max(segment), 0) as max_seg FROM memories")
+    cur_seg = max_seg_res["max_seg"]
+    cnt_res = db.fetchone("SELECT count(*) as c FROM memories WHERE segment=?", (cur_seg,))
+    if cnt_res["c"] >= env.seg_size:
+        cur_seg += 1
+        print(f"[HSG] Rotated to segment {cur_seg}")
+
+    stored = extract_essence(p["content"], cls["primary"], env.summary_max_length)
+    sec_cfg = SECTOR_CONFIGS[cls["primary"]]
+    init_sal = max(0.0, min(1.0, 0.4 + 0.1 * len(cls["additional"])))
+
+    # Insert Mem
+    q.ins_mem(
+        id=mid,
+        user_id=user_id or "anonymous",
+        segment=cur_seg,
+        content=stored,
+        simhash=p["simhash"],
+        primary_sector=cls["primary"],
+        tags=p["tags"],
+        meta=json.dumps(metadata or {}),
+        created_at=now,
+        updated_at=now,
+        last_seen_at=now,
+        salience=init_sal,
+        decay_lambda=sec_cfg["decay_lambda"],
+        version=1,
+        mean_dim=None,
+        mean_vec=None,
+        compressed_vec=None,
+        feedback_score=0
+    )
+
+    emb_res = p["emb"]
+    if hasattr(store, "put"):
         for r in emb_res:
-             await store.storeVector(mid, r["sector"], r["vector"], r["dim"], user_id or "anonymous")
-             
-        mean_vec = calc_mean_vec(emb_res, all_secs)
-        mean_buf = vec_to_buf(mean_vec)
-        db.execute("UPDATE memories SET mean_dim=?, mean_vec=? WHERE id=?", (len(mean_vec), mean_buf, mid))
-        
-        if len(mean_vec) > 128:
-            comp = compress_vec_for_storage(mean_vec, 128)
-            db.execute("UPDATE memories SET compressed_vec=? WHERE id=?", (vec_to_buf(comp), mid))
-            
-        await create_single_waypoint(mid, mean_vec, now, user_id)
-        
-        # Trigger summary update if user exists
-        if user_id:
-            # fire and forget or await? For package, await to ensure consistency during test.
-            # circular import risk?
-            # hsg imports user_summary? No.
-            # user_summary imports db.
-            # I need to import update_user_summary inside function or at top if no circle.
-            # hsg imports: db, config, constants, vector_store, text, chunking, keyword, vectors, embed, decay, dynamics.
-            # user_summary imports: db, config.
-            # Safe to import at top.
-            await update_user_summary(user_id)
-        
-        # db.execute("COMMIT")
-        return {
-            "id": mid,
-            "content": content,
-            "primary_sector": cls["primary"],
-            "sectors": all_secs,
-            "chunks": len(chunks),
-            "salience": init_sal
-        }
-    except Exception as e:
-        # db.execute("ROLLBACK")
-        raise e
+            store.put(mid, r["sector"], r["vector"], r["dim"], user_id or "anonymous")
+    else:
+        p["vector_rows"] = [(mid, r["sector"], r["vector"].tolist(), r["dim"], user_id or "anonymous") for r in emb_res]
+
+    mean_vec = calc_mean_vec(emb_res, p["sectors"])
+    mean_buf = vec_to_buf(mean_vec)
+    db.execute("UPDATE memories SET mean_dim=?, mean_vec=? WHERE id=?", (len(mean_vec), mean_buf, mid))
+
+    if len(mean_vec) > 128:
+        comp = compress_vec_for_storage(mean_vec, 128)
+        db.execute("UPDATE memories SET compressed_vec=? WHERE id=?", (vec_to_buf(comp), mid))
+    else:
+        comp = mean_vec
+    db.after_commit(lambda: compact_index.add(mid, user_id or "anonymous", comp))
+    p["mean_vec"], p["created_at"] = mean_vec, now
+    return {
+        "id": mid,
+        "content": p["content"],
+        "primary_sector": cls["primary"],
+        "sectors": p["sectors"],
+        "chunks": p["chunks"],
+        "salience": init_sal
+    }
+
+async def store_prepared(plans: List[Dict[str, Any]]) -> int:
+    """Vectors write_hsg_memory left for a non-SQLite store."""
+    rows = [r for p in plans for r in p.get("vector_rows", [])]
+    return await store.store_many(rows) if rows else 0
+
+async def add_hsg_memory(content: str, tags: Optional[str] = None, metadata: Any = None, user_id: Optional[str] = None,
+                         defer: bool = False) -> Dict[str, Any]:
+    """Store one memory. defer=True skips the similarity waypoint and profile update;
+    the caller runs link_similar / user_profiles.refresh once for its batch."""
+    p = await prepare_hsg_memory(content, tags, metadata, user_id)
+    res = write_hsg_memory(p)
+    await store_prepared([p])
+    if res.get("deduplicated"): return res
+
+    if not defer:
+        await create_single_waypoint(res["id"], p["mean_vec"], p["created_at"], user_id)
+
+    # O(1) profile update; the summary row is flushed off the request path
+    if user_id and not defer:
+        user_profiles.observe(user_id, res["id"], metadata, p["created_at"])
+    return res
+
+async def delete_memories(ids: List[str]):
+    """Hard-delete memories with everything mirrored from them: vectors (through
+    the store, so IVF lists and segment files drop them), the compact index,
+    the waypoint graph and the owners' profile aggregates."""
+    if not ids: return
+    users = {r["user_id"] for r in db.fetchall(
+        f"SELECT DISTINCT user_id FROM memories WHERE id IN ({','.join('?' * len(ids))})", tuple(ids))}
+    await store.delete_many(ids)
+    for mid in ids:
+        q.del_mem(mid)
+        compact_index.remove(mid)
+        waypoint_graph.remove_node(mid)
+    for uid in users:
+        if uid: user_profiles.invalidate(uid)
 
 # Cache for query
 cache = {}
 TTL = 60000
 
-async def expand_via_waypoints(ids: List[str], max_exp: int = 10):
-    exp = []
-    vis = set(ids)
-    q_arr = [{"id": i, "weight": 1.0, "path": [i]} for i in ids]
-    cnt = 0
-    
-    while q_arr and cnt < max_exp:
-        cur = q_arr.pop(0)
-        # neighbors: dst_id, weight
-        neighs = db.fetchall("SELECT dst_id, weight FROM waypoints WHERE src_id=? ORDER BY weight DESC", (cur["id"],))
-        for n in neighs:
-            dst = n["dst_id"]
-            if dst in vis: continue
-            wt = min(1.0, max(0.0, float(n["weight"])))
-            exp_wt = cur["weight"] * wt * 0.8
-            if exp_wt < 0.1: continue
-            
-            item = {"id": dst, "weight": exp_wt, "path": cur["path"] + [dst]}
-            exp.append(item)
-            vis.add(dst)
-            q_arr.append(item)
-            cnt += 1
-    return exp
+async def expand_via_waypoints(ids: List[str], max_exp: int = 10, user_id: Optional[str] = None):
+    # BFS over the in-memory CSR graph (memory/waypoint_graph.py), no per-node SQL
+    return waypoint_graph.expand(ids, max_exp, user_id)
+
+async def two_stage_search(qe: Dict[str, List[float]], sectors: List[str], k: int, user_id: Optional[str] = None, shortlist: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    # stage 1: one scan over the compact mean vectors of all memories
+    dims = {len(qe[s]) for s in sectors}
+    if len(dims) != 1: return {s: await store.search(qe[s], s, k, {"user_id": user_id}) for s in sectors}
+    qm = np.mean([np.asarray(qe[s], dtype=np.float32) for s in sectors], axis=0)
+    cand = compact_index.shortlist(qm, max(shortlist or env.vec_shortlist, k), user_id)
+    # stage 2: exact cosine on the shortlist with the full vectors of each sector
+    sr = {}
+    for s in sectors:
+        rows = [r for r in await store.get_vectors(cand, s) if len(r.vector) == len(qe[s])] if cand else []
+        if not rows:
+            sr[s] = []
+            continue
+        sims = cosine_scores(qe[s], np.stack([np.asarray(r.vector, dtype=np.float32) for r in rows]))
+        sr[s] = [{"id": rows[i].id, "similarity": float(sims[i])} for i in top_k(sims, k)]
+    return sr
 
 async def hsg_query(qt: str, k: int = 10, f: Dict[str, Any] = None) -> List[Dict[str, Any]]:
     # f: {sectors, minSalience, user_id, startTime, endTime}
@@ -520,10 +591,13 @@ async def hsg_query(qt: str, k: int = 10, f: Dict[str, Any] = None) -> List[Dict
         
         # Search vectors
         sr = {}
-        for s in ss:
-            qv = qe[s] # list[float]
-            res = await store.search(qv, s, k*3, {"user_id": f.get("user_id")})
-            sr[s] = res
+        if f.get("two_stage", env.vec_two_stage):
+            sr = await two_stage_search(qe, ss, k*3, f.get("user_id"), f.get("shortlist"))
+        else:
+            for s in ss:
+                qv = qe[s] # list[float]
+                res = await store.search(qv, s, k*3, {"user_id": f.get("user_id")})
+                sr[s] = res
             
         all_sims = []
         ids = set()
@@ -539,7 +613,14 @@ async def hsg_query(qt: str, k: int = 10, f: Dict[str, Any] = None) -> List[Dict
         
         exp = []
         if not high_conf:
-            exp = await expand_via_waypoints(list(ids), k*2)
+            if f.get("expansion", env.waypoint_expansion) == "ppr":
+                # spreading activation seeded with the best similarity of each hit
+                seeds = {}
+                for res in sr.values():
+                    for r in res: seeds[r["id"]] = max(seeds.get(r["id"], 0.0), r["similarity"])
+                exp = waypoint_graph.activate(seeds, k*2, f.get("user_id"))
+            else:
+                exp = await expand_via_waypoints(list(ids), k*2, f.get("user_id"))
             for e in exp: ids.add(e["id"])
             
         res_list = []
@@ -633,8 +714,7 @@ async def hsg_query(qt: str, k: int = 10, f: Dict[str, Any] = None) -> List[Dict
                  # simplistic fetch from waypoints table for this source? 
                  # TS fetches `q.get_waypoints_by_src.all(r.id)`.
                  # I'll enable this logic.
-                 wps_rows = db.fetchall("SELECT dst_id, weight FROM waypoints WHERE src_id=?", (r["id"],))
-                 wps = [{"target_id": row["dst_id"], "weight": row["weight"]} for row in wps_rows]
+                 wps = waypoint_graph.neighbors(r["id"], f.get("user_id"))
                  
                  pru = await propagateAssociativeReinforcementToLinkedNodes(r["id"], rsal, wps)
                  for u in pru:
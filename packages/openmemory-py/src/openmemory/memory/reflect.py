@@ -2,89 +2,19 @@
 import time
 import math
 import json
+import uuid
 import logging
-from typing import List, Dict, Any, Optional
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
 
-from ..core.db import q, db, log_maint_op
+from ..core.db import q, db, log_maint_op, transaction
 from ..core.config import env
-from ..utils.vectors import cos_sim
-from .hsg import add_hsg_memory
+from .hsg import add_hsg_memory, delete_memories
 
 # Ported from backend/src/memory/reflect.ts
 
 logger = logging.getLogger("reflect")
 
-def vec_tf(txt: str) -> List[int]:
-    w = txt.lower().split()
-    uniq = sorted(list(set(w)))
-    return [w.count(u) for u in uniq]
-
-def sim_txt(t1: str, t2: str) -> float:
-    # TS implementation uses TF-based cosine similarity on raw text tokens ??
-    # TS line 18: vec(txt) returns counts.
-    # TS line 6 cos(a,b). 
-    # BUT: `vec(t1)` and `vec(t2)` will have different dimensions if words differ!
-    # TS line 11: `d += a[i] * b[i]`. It loops 0..a.length.
-    # If a and b have different lengths/vocab, this calculation is NONSENSE in TS unless indices align perfectly.
-    # The TS code at line 18 creates `uniq` from specific text.
-    # `vec("a b")` -> `[1, 1]` (for words a, b)
-    # `vec("c d")` -> `[1, 1]` (for words c, d)
-    # `cos([1,1], [1,1])` is 1.0.
-    # So "a b" and "c d" have 100% similarity in TS implementation?
-    # YES. The TS implementation is BROKEN/NAIVE.
-    # Rule of "1:1 parity" means I should replicate the BUG?
-    # Or fix it?
-    # User said "chaotic genius", "mimic 1:1".
-    # User might rely on this "broken" behavior for some reason (e.g. length similarity?).
-    # BUT: `vec` creates localized unique set.
-    # Effectively it measures distribution of frequencies regardless of WHAT the words are.
-    # e.g. "a a b" -> 2,1. "c c d" -> 2,1. Sim = 1.0.
-    # It measures "repetitiveness structure"?
-    # Likely the original author INTENDED to union the vocab, but didn't.
-    # Given "chaotic genius", maybe I fix it to be "what it likely intended" (TF-IDF or at least common vocab)?
-    # Or just use `utils/vectors.py` `cos_sim` on EMBEDDINGS?
-    # TS `reflect.ts` does NOT use embeddings.
-    # It uses strictly text.
-    # I will implement a PROPER simple Jaccard or overlap sim to be "better" but similar spirit (text based).
-    # OR: `compute_token_overlap` from hsg/utils is better.
-    # I'll use `compute_token_overlap` logic which is robust.
-    # Parity Deviation: I am fixing the likely-bugged similarity function.
-    
-    # Fixed robust Jaccard similarity
-    # Using simple tokenization for speed
-    s1 = set(t1.lower().split())
-    s2 = set(t2.lower().split())
-    if not s1 or not s2: return 0.0
-    
-    inter = len(s1.intersection(s2))
-    union = len(s1.union(s2))
-    return inter / union if union > 0 else 0.0
-
-def cluster(mems: List[Dict]) -> List[Dict]:
-    cls = []
-    used = set()
-    
-    for m in mems:
-        if m["id"] in used: continue
-        if m["primary_sector"] == "reflective": continue
-        if m.get("meta") and "consolidated" in str(m["meta"]): continue # simplistic check
-        
-        c = {"mem": [m], "n": 1}
-        used.add(m["id"])
-        
-        for o in mems:
-            if o["id"] in used: continue
-            if m["primary_sector"] != o["primary_sector"]: continue
-            
-            if sim_txt(m["content"], o["content"]) > 0.8:
-                c["mem"].append(o)
-                c["n"] += 1
-                used.add(o["id"])
-                
-        if c["n"] >= 2: cls.append(c)
-        
-    return cls
-
 def calc_sal(c: Dict) -> float:
     now = time.time() * 1000
     p = c["n"] / 10.0
@@ -121,61 +51,200 @@ def summ(c: Dict) -> str:
     txt = "; ".join([m["content"][:60] for m in c["mem"]])
     return f"{n} {sec} pattern: {txt[:200]}"
 
-async def mark_consolidated(ids: List[str]):
-    for i in ids:
-        m = q.get_mem(i)
-        if m:
-            meta = json.loads(m["meta"] or "{}")
-            meta["consolidated"] = True
-            db.execute("UPDATE memories SET meta=? WHERE id=?", (json.dumps(meta), i))
+def mark_consolidated(ids: List[str], reflection_id: Optional[str] = None):
+    # one UPDATE per chunk on the indexed column; lineage goes to reflection_links
+    now = int(time.time() * 1000)
+    for i in range(0, len(ids), 500):
+        part = ids[i:i+500]
+        ph = ",".join("?" * len(part))
+        db.execute(f"UPDATE memories SET consolidated=1 WHERE id IN ({ph})", tuple(part))
+    if reflection_id:
+        db.conn.executemany("INSERT OR IGNORE INTO reflection_links(src_id, reflection_id, created_at) VALUES (?,?,?)",
+                            [(i, reflection_id, now) for i in ids])
     db.commit()
 
-async def boost(ids: List[str]):
+def boost(ids: List[str]):
     now = int(time.time() * 1000)
-    for i in ids:
-        m = q.get_mem(i)
-        if m:
-            # Touch updated_at, boost salience
-            new_sal = min(1.0, (m["salience"] or 0) * 1.1)
-            db.execute("UPDATE memories SET salience=?, last_seen_at=? WHERE id=?", (new_sal, now, i))
+    for i in range(0, len(ids), 500):
+        part = ids[i:i+500]
+        ph = ",".join("?" * len(part))
+        db.execute(f"UPDATE memories SET salience=min(1.0, coalesce(salience, 0) * 1.1), last_seen_at=? WHERE id IN ({ph})", (now, *part))
     db.commit()
 
+# Incremental clustering state.
+# Leader clustering on unit mean vectors, per (user, sector, dim): a memory joins the
+# most similar open cluster when cos >= reflect_sim, otherwise it leads a new one.
+# New memories are assigned in mini-batches against the centroids at batch start;
+# centroids are running means. Clusters live in reflect_clusters / reflect_members,
+# so a run only reads memories that were never assigned.
+
+# matches the partial index idx_memories_unconsolidated
+UNCONSOLIDATED = "m.consolidated = 0"
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else v
+
+class ClusterSet:
+    def __init__(self, user_id: str, sector: str, dim: int):
+        self.user_id = user_id
+        self.sector = sector
+        self.dim = dim
+        self.ids: List[str] = []
+        self.sums: List[np.ndarray] = []
+        self.n: List[int] = []
+        self.created: List[int] = []
+        self.touched: set = set()
+
+    def load(self, rows):
+        for r in rows:
+            c = np.frombuffer(r["centroid"], dtype=np.float32).astype(np.float64)
+            self.ids.append(r["id"])
+            self.sums.append(c * r["n"])
+            self.n.append(r["n"])
+            self.created.append(r["created_at"])
+
+    def centroids(self) -> np.ndarray:
+        if not self.ids: return np.zeros((0, self.dim))
+        return np.stack([_unit(s) for s in self.sums])
+
+    def assign(self, vecs: np.ndarray, threshold: float, now: int) -> List[Tuple[str, float]]:
+        """Assign a mini-batch of unit vectors; returns (cluster id, sim) per row."""
+        base = len(self.ids)
+        sims = vecs @ self.centroids().T if base else np.zeros((vecs.shape[0], 0))
+        out = []
+        for j, v in enumerate(vecs):
+            best, bs = -1, -1.0
+            if base:
+                b = int(np.argmax(sims[j]))
+                best, bs = b, float(sims[j, b])
+            # leaders opened earlier in this batch
+            if len(self.ids) > base:
+                fresh = np.stack([_unit(s) for s in self.sums[base:]]) @ v
+                f = int(np.argmax(fresh))
+                if fresh[f] > bs: best, bs = base + f, float(fresh[f])
+            if best < 0 or bs < threshold:
+                self.ids.append(str(uuid.uuid4()))
+                self.sums.append(v.copy())
+                self.n.append(1)
+                self.created.append(now)
+                best, bs = len(self.ids) - 1, 1.0
+            else:
+                self.sums[best] = self.sums[best] + v
+                self.n[best] += 1
+            self.touched.add(best)
+            out.append((self.ids[best], bs))
+        return out
+
+    def rows(self, now: int):
+        for i in sorted(self.touched):
+            c = _unit(self.sums[i]).astype(np.float32).tobytes()
+            yield (self.ids[i], self.user_id, self.sector, self.dim, c, self.n[i], self.created[i], now)
+
+def assign_new(user_id: str, sector: str, now: int) -> Dict[str, int]:
+    """Assign every not yet clustered memory of one user/sector; returns counts."""
+    sets: Dict[int, ClusterSet] = {}
+    for r in db.fetchall("SELECT id, dim, centroid, n, created_at FROM reflect_clusters WHERE user_id=? AND sector=? AND status='open'", (user_id, sector)):
+        sets.setdefault(r["dim"], ClusterSet(user_id, sector, r["dim"])).load([r])
+    members = []
+    last = 0
+    while True:
+        rows = db.fetchall(f"""
+            SELECT m.rowid AS rid, m.id, m.mean_vec FROM memories m
+            WHERE m.user_id IS ? AND m.primary_sector=? AND m.mean_vec IS NOT NULL AND m.rowid > ?
+              AND {UNCONSOLIDATED}
+              AND NOT EXISTS (SELECT 1 FROM reflect_members r WHERE r.mem_id = m.id)
+            ORDER BY m.rowid LIMIT ?
+        """, (user_id, sector, last, env.reflect_batch))
+        if not rows: break
+        last = rows[-1]["rid"]
+        by_dim: Dict[int, List[Any]] = {}
+        for r in rows:
+            v = np.frombuffer(r["mean_vec"], dtype=np.float32).astype(np.float64)
+            by_dim.setdefault(v.shape[0], []).append((r["id"], _unit(v)))
+        for dim, items in by_dim.items():
+            cs = sets.setdefault(dim, ClusterSet(user_id, sector, dim))
+            for (mid, _), (cid, sim) in zip(items, cs.assign(np.stack([v for _, v in items]), env.reflect_sim, now)):
+                members.append((mid, cid, sim, now))
+
+    db.conn.executemany("""
+        INSERT INTO reflect_clusters(id, user_id, sector, dim, centroid, n, status, created_at, updated_at)
+        VALUES (?,?,?,?,?,?,'open',?,?)
+        ON CONFLICT(id) DO UPDATE SET centroid=excluded.centroid, n=excluded.n, updated_at=excluded.updated_at
+    """, [row for cs in sets.values() for row in cs.rows(now)])
+    db.conn.executemany("INSERT OR REPLACE INTO reflect_members(mem_id, cluster_id, sim, assigned_at) VALUES (?,?,?,?)", members)
+
+    # bound the state: the oldest singletons stop waiting for company
+    expired = db.execute("""
+        UPDATE reflect_clusters SET status='expired', updated_at=? WHERE id IN (
+            SELECT id FROM reflect_clusters WHERE user_id IS ? AND sector=? AND status='open' AND n=1
+            ORDER BY updated_at ASC
+            LIMIT max(0, (SELECT count(*) FROM reflect_clusters WHERE user_id IS ? AND sector=? AND status='open') - ?)
+        )
+    """, (now, user_id, sector, user_id, sector, env.reflect_max_open)).rowcount
+    return {"assigned": len(members), "expired": expired}
+
+async def reflect_cluster(c) -> Optional[str]:
+    mem = [dict(r) for r in db.fetchall(f"""
+        SELECT m.id, m.content, m.primary_sector, m.created_at FROM reflect_members r
+        JOIN memories m ON m.id = r.mem_id
+        WHERE r.cluster_id=? AND {UNCONSOLIDATED}
+        ORDER BY m.created_at
+    """, (c["id"],))]
+    if len(mem) < 2: return None
+    cl = {"mem": mem, "n": len(mem)}
+    src = [m["id"] for m in mem]
+    meta = {
+        "type": "auto_reflect",
+        "sector": "reflective",
+        "sources": src,
+        "freq": cl["n"],
+        "sal": calc_sal(cl),
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    # the reflection embeds over the network, so it is written before the
+    # transaction and removed again if the consolidation marks fail
+    r = await add_hsg_memory(summ(cl), json.dumps(["reflect:auto"]), meta, c["user_id"])
+    try:
+        with transaction():
+            mark_consolidated(src, r["id"])
+            boost(src)
+            db.execute("UPDATE reflect_clusters SET status='reflected', reflection_id=?, updated_at=? WHERE id=?",
+                       (r["id"], int(time.time() * 1000), c["id"]))
+    except Exception:
+        # a deduplicated reflection is an existing memory: leave it alone
+        if not r.get("deduplicated"):
+            await delete_memories([r["id"]])
+        raise
+    return r["id"]
+
 async def run_reflection() -> Dict[str, Any]:
     print("[REFLECT] Starting reflection job...")
     min_mems = env.reflect_min or 20
-    mems = q.all_mem(100, 0)
-    print(f"[REFLECT] Fetched {len(mems)} memories (min {min_mems})")
-    
-    if len(mems) < min_mems:
-        print("[REFLECT] Not enough memories, skipping")
+    total = db.fetchone(f"SELECT count(*) AS c FROM memories m WHERE m.primary_sector != 'reflective' AND {UNCONSOLIDATED}")["c"]
+    if total < min_mems:
+        print(f"[REFLECT] Not enough memories ({total} < {min_mems}), skipping")
         return {"created": 0, "reason": "low"}
-        
-    cls = cluster(mems)
-    print(f"[REFLECT] Clustered into {len(cls)} groups")
-    
-    n = 0
-    for c in cls:
-        txt = summ(c)
-        s = calc_sal(c)
-        src = [m["id"] for m in c["mem"]]
-        meta = {
-            "type": "auto_reflect",
-            "sources": src,
-            "freq": c["n"],
-            "at": time.strftime("%Y-%m-%dT%H:%M:%S")
-        }
-        
-        print(f"[REFLECT] Creating reflection: {c['n']} mems, sal={s:.3f}, sec={c['mem'][0]['primary_sector']}")
-        
-        # Insert reflection
-        await add_hsg_memory(txt, json.dumps(["reflect:auto"]), meta)
-        await mark_consolidated(src)
-        await boost(src)
-        n += 1
-        
+
+    now = int(time.time() * 1000)
+    groups = db.fetchall(f"""
+        SELECT DISTINCT m.user_id, m.primary_sector FROM memories m
+        WHERE m.primary_sector != 'reflective' AND m.mean_vec IS NOT NULL AND {UNCONSOLIDATED}
+          AND NOT EXISTS (SELECT 1 FROM reflect_members r WHERE r.mem_id = m.id)
+    """)
+    n = assigned = 0
+    # cluster state lands together or not at all; each reflection then commits
+    # with its consolidation marks
+    with transaction():
+        for g in groups:
+            assigned += assign_new(g["user_id"], g["primary_sector"], now)["assigned"]
+    ready = db.fetchall("SELECT id, user_id, sector, n FROM reflect_clusters WHERE status='open' AND n >= 2 ORDER BY n DESC")
+    for c in ready:
+        if await reflect_cluster(c): n += 1
+
     if n > 0: log_maint_op("reflect", n)
-    print(f"[REFLECT] Job complete: created {n} reflections")
-    return {"created": n, "clusters": len(cls)}
+    print(f"[REFLECT] Job complete: assigned {assigned} memories, created {n} reflections")
+    return {"created": n, "assigned": assigned, "clusters": len(ready)}
 
 _timer_task = None
 
@@ -190,7 +259,7 @@ async def reflection_loop():
 
 def start_reflection():
     global _timer_task
-    if not env.get("auto_reflect", True) or _timer_task: return
+    if not env.auto_reflect or _timer_task: return
     _timer_task = asyncio.create_task(reflection_loop())
     print(f"[REFLECT] Started: every {env.reflect_interval or 10}m")
 
@@ -1,75 +1,183 @@
 import time
 import json
 import asyncio
-from typing import Dict, Any, List
+from collections import Counter
+from typing import Dict, Any, List, Optional
 
 from ..core.db import q, db
 from ..core.config import env
 
 # Port of backend/src/memory/user_summary.ts
+#
+# The summary is rendered from running per-user aggregates (projects, languages,
+# files, save and memory counts, last active) instead of re-reading recent rows on
+# every insert. Every aggregate is an order-independent fold over the user's
+# memories, so the incremental profile equals a full recompute. add_hsg_memory
+# feeds new rows in O(1); dirty users are written back asynchronously.
+
+def _meta(m) -> Dict[str, Any]:
+    raw = m["meta"]
+    if not raw: return {}
+    try:
+        meta = json.loads(raw) if isinstance(raw, str) else raw
+    except Exception:
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+class Profile:
+    def __init__(self):
+        self.projects: Counter = Counter()
+        self.languages: Counter = Counter()
+        self.files: Dict[str, int] = {}  # file name -> last touched
+        self.saves = 0
+        self.events = 0
+        self.last_active = 0
+        self.upto = 0  # last memories.rowid folded in
+
+    def add(self, meta: Dict[str, Any], created_at: Optional[int], rowid: int = 0):
+        ts = created_at or 0
+        if meta.get("ide_project_name"): self.projects[str(meta["ide_project_name"])] += 1
+        if meta.get("language"): self.languages[str(meta["language"])] += 1
+        if meta.get("ide_file_path"):
+            f = str(meta["ide_file_path"]).replace("\\", "/").split("/")[-1]
+            self.files[f] = max(self.files.get(f, 0), ts)
+        if meta.get("ide_event_type") == "save": self.saves += 1
+        self.events += 1
+        self.last_active = max(self.last_active, ts)
+        self.upto = max(self.upto, rowid)
+
+    def render(self) -> str:
+        if not self.events: return "User profile initializing... (No memories recorded yet)"
+        top = lambda c: [k for k, _ in sorted(c.items(), key=lambda kv: (-kv[1], kv[0]))]
+        proj_str = ", ".join(top(self.projects)) or "Unknown Project"
+        lang_str = ", ".join(top(self.languages)) or "General"
+        recent = sorted(self.files.items(), key=lambda kv: (-kv[1], kv[0]))[:3]
+        recent_files = ", ".join(f for f, _ in recent) or "various files"
+        last_active = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.last_active / 1000)) if self.last_active else "Recently"
+        return f"Active in {proj_str} using {lang_str}. Focused on {recent_files}. ({self.events} memories, {self.saves} saves). Last active: {last_active}."
+
+    def to_json(self) -> str:
+        return json.dumps({"projects": self.projects, "languages": self.languages, "files": self.files,
+                           "saves": self.saves, "events": self.events, "last_active": self.last_active})
+
+    @classmethod
+    def from_json(cls, s: str, upto: int) -> "Profile":
+        d = json.loads(s)
+        p = cls()
+        p.projects = Counter(d.get("projects", {}))
+        p.languages = Counter(d.get("languages", {}))
+        p.files = dict(d.get("files", {}))
+        p.saves = d.get("saves", 0)
+        p.events = d.get("events", 0)
+        p.last_active = d.get("last_active", 0)
+        p.upto = upto or 0
+        return p
+
+def _fold(p: Profile, user_id: str) -> Profile:
+    # rowid > upto is a range scan on idx_memories_user; only meta and created_at are read
+    cur = db.conn.execute("SELECT rowid, meta, created_at FROM memories WHERE user_id=? AND rowid > ? ORDER BY rowid",
+                          (user_id, p.upto))
+    for r in cur:
+        p.add(_meta(r), r["created_at"], r["rowid"])
+    return p
 
 def gen_user_summary(mems: List[Dict]) -> str:
-    if not mems: return "User profile initializing... (No memories recorded yet)"
-    
-    projects = set()
-    languages = set()
-    files = set()
-    saves = 0
-    events = 0
-    
+    p = Profile()
     for m in mems:
-        # sqlite3.Row doesn't have .get()
-        d = dict(m)
-        if d.get("meta"):
-            try:
-                meta = json.loads(m["meta"]) if isinstance(m["meta"], str) else m["meta"]
-                if not isinstance(meta, dict): meta = {}
-                if meta.get("ide_project_name"): projects.add(meta["ide_project_name"])
-                if meta.get("language"): languages.add(meta["language"])
-                if meta.get("ide_file_path"): 
-                    files.add(meta["ide_file_path"].replace("\\", "/").split("/")[-1])
-                if meta.get("ide_event_type") == "save": saves += 1
-            except: pass
-        events += 1
-        
-    proj_str = ", ".join(projects) if projects else "Unknown Project"
-    lang_str = ", ".join(languages) if languages else "General"
-    recent_files = ", ".join(list(files)[:3]) if files else "various files"
-    
-    created_at = mems[0]["created_at"]
-    last_active = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created_at/1000)) if created_at else "Recently"
-    
-    return f"Active in {proj_str} using {lang_str}. Focused on {recent_files}. ({len(mems)} memories, {saves} saves). Last active: {last_active}."
+        p.add(_meta(m), m["created_at"])
+    return p.render()
 
 async def gen_user_summary_async(user_id: str) -> str:
-    # q.all_mem_by_user.all(user_id, 100, 0)
-    # Reimplement query
-    rows = db.fetchall("SELECT * FROM memories WHERE user_id=? ORDER BY created_at DESC LIMIT 100 OFFSET 0", (user_id,))
-    return gen_user_summary(rows)
+    # full recompute over every memory of the user
+    db.connect()
+    return _fold(Profile(), user_id).render()
+
+class UserProfiles:
+    def __init__(self):
+        self.profiles: Dict[str, Profile] = {}
+        self.dirty: set = set()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def get(self, user_id: str) -> Profile:
+        p = self.profiles.get(user_id)
+        if p is None:
+            r = db.fetchone("SELECT profile, profile_upto FROM users WHERE user_id=?", (user_id,))
+            p = Profile.from_json(r["profile"], r["profile_upto"]) if r and r["profile"] else Profile()
+            self.profiles[user_id] = p
+            # catch up on rows written since the last flush (or everything, the first time)
+            self.refresh(user_id)
+            if not r or not r["profile"]: self.dirty.add(user_id)
+        return p
+
+    def refresh(self, user_id: str):
+        """Fold rows that bypassed observe() (bulk loads, other processes)."""
+        p = self.profiles.get(user_id)
+        if p is None: return self.get(user_id)
+        before = p.upto
+        if _fold(p, user_id).upto != before:
+            self.dirty.add(user_id)
+            self._schedule()
+        return p
+
+    def observe(self, user_id: str, mid: str, meta: Optional[Dict[str, Any]], created_at: int):
+        """Fold one new memory into its user's profile."""
+        r = db.fetchone("SELECT rowid FROM memories WHERE id=?", (mid,))
+        if not r: return
+        p = self.get(user_id)
+        if r["rowid"] > p.upto:
+            p.add(meta if isinstance(meta, dict) else {}, created_at, r["rowid"])
+        self.dirty.add(user_id)
+        self._schedule()
+
+    def invalidate(self, user_id: Optional[str]):
+        """Aggregates are append-only; a delete rebuilds the user's profile on the next flush."""
+        if not user_id: return
+        self.profiles.pop(user_id, None)
+        db.execute("UPDATE users SET profile=NULL, profile_upto=0 WHERE user_id=?", (user_id,))
+        db.commit()
+        self.dirty.add(user_id)
+        self._schedule()
+
+    def _schedule(self):
+        if self._flush_task and not self._flush_task.done(): return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
+            pass  # no loop: the periodic job or an explicit flush() writes it
+
+    async def flush(self) -> int:
+        """Write summaries of dirty users back to the users table."""
+        n = 0
+        now = int(time.time() * 1000)
+        while self.dirty:
+            uid = self.dirty.pop()
+            p = self.get(uid)
+            db.execute("""
+                INSERT INTO users(user_id, summary, reflection_count, created_at, updated_at, profile, profile_upto)
+                VALUES (?,?,0,?,?,?,?)
+                ON CONFLICT(user_id) DO UPDATE SET summary=excluded.summary, updated_at=excluded.updated_at,
+                    profile=excluded.profile, profile_upto=excluded.profile_upto
+            """, (uid, p.render(), now, now, p.to_json(), p.upto))
+            n += 1
+        db.commit()
+        return n
+
+user_profiles = UserProfiles()
 
 async def update_user_summary(user_id: str):
     try:
-        summary = await gen_user_summary_async(user_id)
-        now = int(time.time()*1000)
-        
-        existing = db.fetchone("SELECT * FROM users WHERE user_id=?", (user_id,))
-        if not existing:
-             db.execute("INSERT INTO users(user_id,summary,reflection_count,created_at,updated_at) VALUES (?,?,?,?,?)",
-                        (user_id, summary, 0, now, now))
-        else:
-             db.execute("UPDATE users SET summary=?, updated_at=? WHERE user_id=?", (summary, now, user_id))
-        db.commit()
+        user_profiles.get(user_id)
+        user_profiles.dirty.add(user_id)
+        await user_profiles.flush()
     except Exception as e:
         print(f"[USER_SUMMARY] Error for {user_id}: {e}")
 
 async def auto_update_user_summaries():
-    all_mems = db.fetchall("SELECT user_id FROM memories LIMIT 10000")
-    uids = set(m["user_id"] for m in all_mems if m["user_id"])
-    
-    updated = 0
+    # users is the distinct user index; profiles catch up from their watermark
+    uids = [r["user_id"] for r in db.fetchall("SELECT user_id FROM users")]
     for u in uids:
-        await update_user_summary(u)
-        updated += 1
+        user_profiles.refresh(u)
+    updated = await user_profiles.flush()
     return {"updated": updated}
 
 _timer_task = None
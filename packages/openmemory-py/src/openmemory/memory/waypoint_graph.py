@@ -0,0 +1,303 @@
+from typing import List, Dict, Optional, Any, Tuple, Set
+from collections import deque
+import numpy as np
+from ..core.db import db
+
+# In-memory waypoint graph, one subgraph per user.
+# Each subgraph keeps its edges in compressed sparse row form (indptr / indices /
+# weights, rows sorted by weight desc) plus a small overlay of edges written or
+# removed since the last compaction. Reads merge the overlay; the overlay is folded
+# back into the CSR arrays once it grows past a fraction of the edge count.
+# The waypoints table stays authoritative and is loaded once, on first use.
+
+class UserGraph:
+    def __init__(self):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float64)
+        self._set: Dict[int, Dict[int, float]] = {}
+        # src -> removed dsts that are still present in the CSR arrays
+        self._del: Dict[int, Set[int]] = {}
+        # (edge sources, row-normalised weights, dangling mask) for the power iteration
+        self._walk: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    @property
+    def nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edges(self) -> int:
+        if not self._set and not self._del: return int(self.indices.shape[0])
+        return int(self.coo()[0].shape[0])
+
+    @property
+    def pending(self) -> int:
+        return sum(len(d) for d in self._set.values()) + sum(len(d) for d in self._del.values())
+
+    def node(self, id: str) -> int:
+        i = self.index.get(id)
+        if i is None:
+            i = self.index[id] = len(self.ids)
+            self.ids.append(id)
+        return i
+
+    def _row(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        if i + 1 < self.indptr.shape[0]:
+            a, b = self.indptr[i], self.indptr[i + 1]
+            return self.indices[a:b], self.weights[a:b]
+        return self.indices[:0], self.weights[:0]
+
+    def neighbors(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Destinations and weights of node i, heaviest first."""
+        idx, w = self._row(i)
+        over = self._set.get(i)
+        gone = self._del.get(i)
+        if not over and not gone: return idx, w
+        row = {int(d): float(x) for d, x in zip(idx, w) if not gone or int(d) not in gone}
+        if over: row.update(over)
+        if not row: return self.indices[:0], self.weights[:0]
+        items = sorted(row.items(), key=lambda kv: -kv[1])
+        return np.fromiter((d for d, _ in items), dtype=np.int32, count=len(items)), np.fromiter((x for _, x in items), dtype=np.float64, count=len(items))
+
+    def set_edge(self, src: str, dst: str, weight: float):
+        s, d = self.node(src), self.node(dst)
+        if s in self._del: self._del[s].discard(d)
+        self._set.setdefault(s, {})[d] = float(weight)
+        self._maybe_compact()
+
+    def remove_edge(self, s: int, d: int):
+        if s in self._set: self._set[s].pop(d, None)
+        idx, _ = self._row(s)
+        if (idx == d).any(): self._del.setdefault(s, set()).add(d)
+
+    def remove_node(self, id: str):
+        i = self.index.get(id)
+        if i is None: return
+        for d in self.neighbors(i)[0]:
+            self.remove_edge(i, int(d))
+        # incoming edges: scan CSR columns once, plus the overlay
+        hit = np.flatnonzero(self.indices == i)
+        if hit.size:
+            rows = np.searchsorted(self.indptr, hit, side="right") - 1
+            for s in rows: self._del.setdefault(int(s), set()).add(i)
+        for s, over in self._set.items(): over.pop(i, None)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self.pending > max(256, self.indices.shape[0] // 8):
+            self.compact()
+
+    def compact(self):
+        src, dst, w = self.coo()
+        self.build(src, dst, w)
+
+    def coo(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        n = self.indptr.shape[0] - 1
+        src = np.repeat(np.arange(n, dtype=np.int32), np.diff(self.indptr))
+        dst, w = self.indices, self.weights
+        if self._del:
+            gone = np.array([s * (1 << 32) + d for s, ds in self._del.items() for d in ds], dtype=np.int64)
+            keep = ~np.isin(src.astype(np.int64) * (1 << 32) + dst, gone)
+            src, dst, w = src[keep], dst[keep], w[keep]
+        if self._set:
+            over = [(s, d, x) for s, row in self._set.items() for d, x in row.items()]
+            os_ = np.array([o[0] for o in over], dtype=np.int32)
+            od = np.array([o[1] for o in over], dtype=np.int32)
+            ow = np.array([o[2] for o in over], dtype=np.float64)
+            # overlay wins over an older CSR entry for the same pair
+            key = src.astype(np.int64) * (1 << 32) + dst
+            okey = os_.astype(np.int64) * (1 << 32) + od
+            keep = ~np.isin(key, okey)
+            src, dst, w = np.concatenate([src[keep], os_]), np.concatenate([dst[keep], od]), np.concatenate([w[keep], ow])
+        return src, dst, w
+
+    def build(self, src: np.ndarray, dst: np.ndarray, w: np.ndarray):
+        n = len(self.ids)
+        order = np.lexsort((-w, src))
+        self.indices = dst[order].astype(np.int32)
+        self.weights = w[order].astype(np.float64)
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))]).astype(np.int64)
+        self._set = {}
+        self._del = {}
+        self._walk = None
+
+    def ppr(self, seeds: Dict[int, float], alpha: float = 0.15, tol: float = 1e-4, max_iter: int = 30) -> np.ndarray:
+        """Personalized PageRank over the subgraph, restarting to `seeds` with probability alpha.
+
+        x <- alpha * s + (1 - alpha) * (P^T x + dangling mass * s), with P the
+        row-normalised weight matrix; stops once the L1 change drops below tol.
+        """
+        if self._set or self._del: self.compact()
+        n = len(self.ids)
+        if self._walk is None:
+            src = np.repeat(np.arange(self.indptr.shape[0] - 1), np.diff(self.indptr))
+            w = np.clip(self.weights, 0.0, None)
+            out = np.bincount(src, weights=w, minlength=n)
+            self._walk = (src, np.divide(w, out[src], out=np.zeros_like(w), where=out[src] > 0), out <= 0)
+        src, pw, dangling = self._walk
+        s = np.zeros(n)
+        for i, v in seeds.items(): s[i] = v
+        s /= s.sum()
+        x = s.copy()
+        for _ in range(max_iter):
+            nx = np.bincount(self.indices, weights=x[src] * pw, minlength=n)
+            nx = alpha * s + (1 - alpha) * (nx + x[dangling].sum() * s)
+            done = np.abs(nx - x).sum() < tol
+            x = nx
+            if done: break
+        return x
+
+    def predecessors(self, x: np.ndarray) -> np.ndarray:
+        """For every node, the in-neighbor that sent it the most mass under x (-1: none).
+
+        Call after ppr(), which leaves the walk matrix this reads."""
+        src, pw, _ = self._walk
+        flow = x[src] * pw
+        keep = flow > 0
+        s, d, f = src[keep], self.indices[keep], flow[keep]
+        order = np.lexsort((f, d))  # by destination, heaviest flow last
+        s, d = s[order], d[order]
+        last = np.append(d[1:] != d[:-1], True) if d.size else d.astype(bool)
+        pred = np.full(len(self.ids), -1, dtype=np.int64)
+        pred[d[last]] = s[last]
+        return pred
+
+    def path(self, pred: np.ndarray, i: int, seeds) -> List[int]:
+        """Seed-to-node chain of heaviest predecessors ending at i."""
+        out = [i]
+        seen = {i}
+        while out[-1] not in seeds:
+            p = int(pred[out[-1]])
+            if p < 0 or p in seen: break
+            out.append(p)
+            seen.add(p)
+        return out[::-1]
+
+class WaypointGraph:
+    def __init__(self):
+        self.loaded = False
+        self.users: Dict[str, UserGraph] = {}
+        # src id -> user whose subgraph holds its outgoing edges
+        self.owner: Dict[str, str] = {}
+
+    def reset(self):
+        self.__init__()
+
+    def load(self):
+        self.reset()
+        self.loaded = True
+        rows = db.fetchall("SELECT src_id, dst_id, user_id, weight FROM waypoints")
+        by_user: Dict[str, List[Any]] = {}
+        for r in rows:
+            by_user.setdefault(r["user_id"] or "anonymous", []).append(r)
+        for uid, edges in by_user.items():
+            g = self.users[uid] = UserGraph()
+            src = np.fromiter((g.node(e["src_id"]) for e in edges), dtype=np.int32, count=len(edges))
+            dst = np.fromiter((g.node(e["dst_id"]) for e in edges), dtype=np.int32, count=len(edges))
+            w = np.fromiter((float(e["weight"] or 0.0) for e in edges), dtype=np.float64, count=len(edges))
+            g.build(src, dst, w)
+            for e in edges: self.owner[e["src_id"]] = uid
+
+    def _ensure(self):
+        if not self.loaded: self.load()
+
+    def graph(self, user_id: str) -> Optional[UserGraph]:
+        self._ensure()
+        return self.users.get(user_id)
+
+    def add_edge(self, src: str, dst: str, user_id: Optional[str], weight: float):
+        # before load() the edge is picked up from the table anyway
+        if not self.loaded: return
+        uid = user_id or "anonymous"
+        self.users.setdefault(uid, UserGraph()).set_edge(src, dst, weight)
+        self.owner[src] = uid
+
+    def remove_node(self, id: str):
+        if not self.loaded: return
+        for g in self.users.values():
+            g.remove_node(id)
+        self.owner.pop(id, None)
+
+    def remove_user(self, user_id: str):
+        if not self.loaded: return
+        g = self.users.pop(user_id, None)
+        if not g: return
+        for id in g.ids:
+            if self.owner.get(id) == user_id: self.owner.pop(id)
+
+    def _locate(self, id: str, user_id: Optional[str]) -> Tuple[Optional[UserGraph], int]:
+        g = self.users.get(user_id or self.owner.get(id, ""))
+        if g is None or id not in g.index: return None, -1
+        return g, g.index[id]
+
+    def neighbors(self, id: str, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        self._ensure()
+        g, i = self._locate(id, user_id)
+        if g is None: return []
+        idx, w = g.neighbors(i)
+        return [{"target_id": g.ids[d], "weight": float(x)} for d, x in zip(idx, w)]
+
+    def expand(self, ids: List[str], max_exp: int = 10, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Weighted BFS from ids; each hop multiplies the path weight by edge weight * 0.8."""
+        self._ensure()
+        exp = []
+        vis = set(ids)
+        frontier = deque({"id": i, "weight": 1.0, "path": [i]} for i in ids)
+        while frontier and len(exp) < max_exp:
+            cur = frontier.popleft()
+            g, i = self._locate(cur["id"], user_id)
+            if g is None: continue
+            idx, w = g.neighbors(i)
+            for d, x in zip(idx, w):
+                dst = g.ids[d]
+                if dst in vis: continue
+                exp_wt = cur["weight"] * min(1.0, max(0.0, float(x))) * 0.8
+                if exp_wt < 0.1: continue
+                item = {"id": dst, "weight": exp_wt, "path": cur["path"] + [dst]}
+                exp.append(item)
+                vis.add(dst)
+                frontier.append(item)
+        return exp
+
+    def activate(self, seeds: Dict[str, float], max_exp: int = 10, user_id: Optional[str] = None,
+                 alpha: float = 0.15, min_act: float = 1e-4) -> List[Dict[str, Any]]:
+        """Spreading activation: personalized PageRank seeded with vector hits.
+
+        Returns seeds and the top max_exp reached nodes with their activation,
+        scaled so the most active node scores 1.0. A reached node's path follows
+        the edges that carried it the most mass back to a seed, as expand()'s
+        paths do, so retrieval reinforces the links it came through.
+        """
+        self._ensure()
+        groups: Dict[str, Dict[int, float]] = {}
+        for id, sc in seeds.items():
+            g, i = self._locate(id, user_id)
+            if g is not None and sc > 0:
+                groups.setdefault(user_id or self.owner[id], {})[i] = sc
+        acts: Dict[str, float] = {}
+        paths: Dict[str, List[str]] = {}
+        for uid, sd in groups.items():
+            g = self.users[uid]
+            x = g.ppr(sd, alpha)
+            pred = g.predecessors(x)
+            for i in np.flatnonzero(x > min_act):
+                id = g.ids[i]
+                if float(x[i]) > acts.get(id, 0.0):
+                    acts[id] = float(x[i])
+                    paths[id] = [g.ids[j] for j in g.path(pred, int(i), sd)] if id not in seeds else [id]
+        if not acts: return []
+        top = max(acts.values())
+        reached = sorted((i for i in acts if i not in seeds), key=lambda i: -acts[i])[:max_exp]
+        return [{"id": i, "weight": acts[i] / top, "path": paths[i]} for i in [s for s in seeds if s in acts] + reached]
+
+    def stats(self) -> Dict[str, Any]:
+        self._ensure()
+        return {
+            "users": len(self.users),
+            "nodes": sum(g.nodes for g in self.users.values()),
+            "edges": sum(g.edges for g in self.users.values()),
+        }
+
+waypoint_graph = WaypointGraph()
@@ -0,0 +1,6 @@
+-- 002_vector_quant.sql
+-- Optional quantized codes for first-pass vector scans (OM_VEC_QUANT=int8|float16)
+ALTER TABLE vectors ADD COLUMN vq BLOB;
+ALTER TABLE vectors ADD COLUMN vq_scale REAL;
+
+CREATE INDEX IF NOT EXISTS idx_vectors_sector_user ON vectors(sector, user_id);
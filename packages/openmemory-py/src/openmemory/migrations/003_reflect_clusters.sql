@@ -0,0 +1,25 @@
+-- 003_reflect_clusters.sql
+-- Incremental reflection: leader clusters over memories.mean_vec, kept between runs
+-- so each pass only assigns memories it has not seen yet.
+CREATE TABLE IF NOT EXISTS reflect_clusters (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    sector TEXT,
+    dim INTEGER,
+    centroid BLOB,
+    n INTEGER DEFAULT 0,
+    status TEXT DEFAULT 'open', -- open | reflected | expired
+    reflection_id TEXT,
+    created_at INTEGER,
+    updated_at INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS reflect_members (
+    mem_id TEXT PRIMARY KEY,
+    cluster_id TEXT,
+    sim REAL,
+    assigned_at INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_reflect_clusters_open ON reflect_clusters(user_id, sector, status);
+CREATE INDEX IF NOT EXISTS idx_reflect_members_cluster ON reflect_members(cluster_id);
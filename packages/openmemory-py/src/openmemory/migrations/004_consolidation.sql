@@ -0,0 +1,19 @@
+-- 004_consolidation.sql
+-- Consolidation state and reflection lineage as indexed data instead of meta JSON:
+-- reflection selects unconsolidated memories with an index range scan and marking
+-- a cluster is one UPDATE.
+ALTER TABLE memories ADD COLUMN consolidated INTEGER DEFAULT 0;
+
+UPDATE memories SET consolidated = 1
+WHERE json_valid(meta) AND coalesce(json_extract(meta, '$.consolidated'), 0) != 0;
+
+CREATE INDEX IF NOT EXISTS idx_memories_unconsolidated ON memories(user_id, primary_sector) WHERE consolidated = 0;
+
+CREATE TABLE IF NOT EXISTS reflection_links (
+    src_id TEXT,
+    reflection_id TEXT,
+    created_at INTEGER,
+    PRIMARY KEY (src_id, reflection_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_reflection_links_reflection ON reflection_links(reflection_id);
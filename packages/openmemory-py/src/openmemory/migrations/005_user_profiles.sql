@@ -0,0 +1,5 @@
+-- 005_user_profiles.sql
+-- Running per-user profile aggregates behind users.summary. profile_upto is the
+-- last memories.rowid folded in, so a restart only catches up on newer rows.
+ALTER TABLE users ADD COLUMN profile TEXT;
+ALTER TABLE users ADD COLUMN profile_upto INTEGER DEFAULT 0;
@@ -0,0 +1,18 @@
+-- 006_ingest_cache.sql
+-- Content-addressed ingest cache: a document whose bytes, content type and
+-- extractor version were already ingested for a user resolves to its memories
+-- without being parsed or embedded again.
+CREATE TABLE IF NOT EXISTS ingest_cache (
+    hash TEXT,
+    user_id TEXT,
+    extractor_version TEXT,
+    root_id TEXT,
+    memory_ids TEXT,  -- JSON list: root first, then children
+    strategy TEXT,
+    extraction TEXT,  -- JSON extraction metadata
+    created_at INTEGER,
+    last_seen_at INTEGER,
+    PRIMARY KEY (hash, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingest_cache_root ON ingest_cache(root_id);
@@ -0,0 +1,23 @@
+-- 007_sync_state.sql
+-- Incremental connector sync: the change cursor of every (connector, user, scope)
+-- and the version and memories of every item it ingested, so a sync only fetches
+-- what changed and can drop the memories of items removed at the source.
+CREATE TABLE IF NOT EXISTS sync_state (
+    connector TEXT,
+    user_id TEXT,
+    scope TEXT,
+    cursor TEXT,
+    updated_at INTEGER,
+    PRIMARY KEY (connector, user_id, scope)
+);
+
+CREATE TABLE IF NOT EXISTS sync_items (
+    connector TEXT,
+    user_id TEXT,
+    scope TEXT,
+    item_id TEXT,
+    version TEXT,
+    memory_ids TEXT,  -- JSON list: root first, then children
+    updated_at INTEGER,
+    PRIMARY KEY (connector, user_id, scope, item_id)
+);
@@ -0,0 +1,26 @@
+-- 008_temporal_facts.sql
+-- Bring the temporal tables in line with temporal_graph (object, last_updated,
+-- edge ids and relation_type) and index the open interval of every
+-- (subject, predicate), which fact inserts close.
+ALTER TABLE temporal_facts RENAME COLUMN obj TO object;
+ALTER TABLE temporal_facts ADD COLUMN last_updated INTEGER;
+
+CREATE TABLE IF NOT EXISTS temporal_edges_v2 (
+    id TEXT PRIMARY KEY,
+    source_id TEXT NOT NULL,
+    target_id TEXT NOT NULL,
+    relation_type TEXT NOT NULL,
+    valid_from INTEGER NOT NULL,
+    valid_to INTEGER,
+    weight REAL NOT NULL,
+    metadata TEXT,
+    FOREIGN KEY(source_id) REFERENCES temporal_facts(id),
+    FOREIGN KEY(target_id) REFERENCES temporal_facts(id)
+);
+INSERT INTO temporal_edges_v2(id, source_id, target_id, relation_type, valid_from, valid_to, weight, metadata)
+    SELECT lower(hex(randomblob(16))), source_id, target_id, relation, valid_from, valid_to, weight, metadata FROM temporal_edges;
+DROP TABLE temporal_edges;
+ALTER TABLE temporal_edges_v2 RENAME TO temporal_edges;
+
+CREATE INDEX IF NOT EXISTS idx_temporal_open ON temporal_facts(subject, predicate) WHERE valid_to IS NULL;
+CREATE INDEX IF NOT EXISTS idx_temporal_edges_src ON temporal_edges(source_id);
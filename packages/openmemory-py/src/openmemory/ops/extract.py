@@ -5,7 +5,10 @@
 import asyncio
 import tempfile
 import re
-from typing import Dict, Any, Union
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Union, AsyncIterator, Optional, List, Tuple, Callable
 
 # Dependencies
 # pdf-parse -> pypdf
@@ -23,17 +26,76 @@
 
 # Port of backend/src/ops/extract.ts
 
+# Bump when extraction output changes, so cached ingests (ops/ingest.py) are redone.
+EXTRACTOR_VERSION = "2"
+
 def estimate_tokens(text: str) -> int:
     return int(len(text) / 4) + 1
 
-async def extract_pdf(data: bytes) -> Dict[str, Any]:
-    # pypdf logic
+# Extraction executor: pypdf, mammoth and markdownify are CPU-bound, so they run in a
+# process pool and a large upload cannot stall the event loop. Jobs are bounded by
+# OM_EXTRACT_MAX_BYTES and OM_EXTRACT_TIMEOUT; a timed-out job takes its pool down
+# with it (the worker cannot be interrupted) and the next job starts a fresh one.
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if _pool is None and env.extract_workers > 0:
+        _pool = ProcessPoolExecutor(max_workers=env.extract_workers)
+    return _pool
+
+def reset_extract_pool(pool: Optional[ProcessPoolExecutor] = None):
+    """Terminate the pool; given a pool, only if it is still the current one."""
+    global _pool
+    # a job that failed on a pool already replaced must not take the new one down
+    if pool is not None and pool is not _pool: return
+    pool, _pool = _pool, None
+    if pool is None: return
+    procs = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for p in procs:
+        if p.is_alive(): p.terminate()
+
+def _check_size(n: int):
+    if env.extract_max_bytes and n > env.extract_max_bytes:
+        raise ValueError(f"Document too large for extraction ({n} > {env.extract_max_bytes} bytes)")
+
+async def run_extract(fn: Callable, *args, size: Optional[int] = None):
+    """Run a module-level parser function off the event loop."""
+    if size is not None: _check_size(size)
+    pool = _get_pool()
+    fut = asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    try:
+        return await asyncio.wait_for(fut, env.extract_timeout or None)
+    except asyncio.TimeoutError:
+        if pool is not None: reset_extract_pool(pool)
+        raise TimeoutError(f"Extraction timed out after {env.extract_timeout}s")
+    except BrokenProcessPool:
+        reset_extract_pool(pool)
+        raise
+
+# Worker functions (module level, so they pickle into the pool)
+
+def _pdf_range(src: Union[str, bytes], start: int, stop: int) -> Tuple[int, List[str]]:
     import io
-    reader = PdfReader(io.BytesIO(data))
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-        
+    reader = PdfReader(io.BytesIO(src) if isinstance(src, bytes) else src)
+    n = len(reader.pages)
+    return n, [(reader.pages[i].extract_text() or "") + "\n" for i in range(start, min(stop, n))]
+
+def _docx_text(data: bytes) -> Tuple[str, List[str]]:
+    import io
+    result = mammoth.extract_raw_text(io.BytesIO(data))
+    return result.value, [str(m) for m in result.messages]
+
+def _html_text(html: str) -> str:
+    return md(html, heading_style="ATX", code_language="")
+
+PDF_CHUNK = 16  # pages per streamed extraction job
+
+async def extract_pdf(data: bytes) -> Dict[str, Any]:
+    _, pages = await run_extract(_pdf_range, data, 0, sys.maxsize, size=len(data))
+    text = "".join(pages)
     return {
         "text": text,
         "metadata": {
@@ -41,15 +103,13 @@ async def extract_pdf(data: bytes) -> Dict[str, Any]:
             "char_count": len(text),
             "estimated_tokens": estimate_tokens(text),
             "extraction_method": "pypdf",
-            "pages": len(reader.pages)
+            "pages": len(pages)
         }
     }
 
 async def extract_docx(data: bytes) -> Dict[str, Any]:
     # mammoth logic
-    import io
-    result = mammoth.extract_raw_text(io.BytesIO(data))
-    text = result.value
+    text, messages = await run_extract(_docx_text, data, size=len(data))
     return {
         "text": text,
         "metadata": {
@@ -57,12 +117,12 @@ async def extract_docx(data: bytes) -> Dict[str, Any]:
             "char_count": len(text),
             "estimated_tokens": estimate_tokens(text),
             "extraction_method": "mammoth",
-            "messages": [str(m) for m in result.messages]
+            "messages": messages
         }
     }
 
 async def extract_html(html: str) -> Dict[str, Any]:
-    text = md(html, heading_style="ATX", code_language="")
+    text = await run_extract(_html_text, html, size=len(html))
     return {
         "text": text,
         "metadata": {
@@ -74,13 +134,14 @@ async def extract_html(html: str) -> Dict[str, Any]:
         }
     }
 
-async def extract_url(url: str) -> Dict[str, Any]:
+async def fetch_url(url: str) -> str:
     async with httpx.AsyncClient() as client:
         resp = await client.get(url, follow_redirects=True)
         resp.raise_for_status()
-        html = resp.text
-        
-    return await extract_html(html)
+        return resp.text
+
+async def extract_url(url: str) -> Dict[str, Any]:
+    return await extract_html(await fetch_url(url))
 
 async def extract_audio(data: bytes, mime_type: str) -> Dict[str, Any]:
     api_key = env.openai_api_key or os.getenv("OPENAI_API_KEY")
@@ -167,42 +228,94 @@ async def extract_video(data: bytes) -> Dict[str, Any]:
         if os.path.exists(vid_path): os.unlink(vid_path)
         if os.path.exists(audio_path): os.unlink(audio_path)
 
+def content_kind(content_type: str) -> str:
+    ctype = content_type.lower()
+    if any(x in ctype for x in ["audio", "mp3", "wav", "m4a", "ogg", "webm"]) and "video" not in ctype: return "audio"
+    if any(x in ctype for x in ["video", "mp4", "avi", "mov"]): return "video"
+    if "pdf" in ctype: return "pdf"
+    if "docx" in ctype or ctype.endswith(".doc") or "msword" in ctype: return "docx"
+    if "html" in ctype or "htm" in ctype: return "html"
+    if "markdown" in ctype or "md" in ctype or "txt" in ctype or "text" in ctype: return "text"
+    raise ValueError(f"Unsupported content type: {content_type}")
+
 async def extract_text(content_type: str, data: Union[str, bytes]) -> Dict[str, Any]:
     ctype = content_type.lower()
+    kind = content_kind(ctype)
     
     # Check audio/video
-    if any(x in ctype for x in ["audio", "mp3", "wav", "m4a", "ogg", "webm"]) and "video" not in ctype:
+    if kind == "audio":
         buf = data if isinstance(data, bytes) else data.encode("utf-8") # likely base64 decoded if passed as string?
         # Extract.ts handles base64 string conversion if needed.
         # Python: expect bytes for binary.
         return await extract_audio(buf, ctype)
         
-    if any(x in ctype for x in ["video", "mp4", "avi", "mov"]):
+    if kind == "video":
         buf = data if isinstance(data, bytes) else data.encode("utf-8")
         return await extract_video(buf)
         
-    if "pdf" in ctype:
+    if kind == "pdf":
         buf = data if isinstance(data, bytes) else data.encode("utf-8")
         return await extract_pdf(buf)
         
-    if "docx" in ctype or ctype.endswith(".doc") or "msword" in ctype:
+    if kind == "docx":
         buf = data if isinstance(data, bytes) else data.encode("utf-8")
         return await extract_docx(buf)
         
-    if "html" in ctype or "htm" in ctype:
+    if kind == "html":
         s = data.decode("utf-8") if isinstance(data, bytes) else data
         return await extract_html(s)
         
-    if "markdown" in ctype or "md" in ctype or "txt" in ctype or "text" in ctype:
-        s = data.decode("utf-8") if isinstance(data, bytes) else data
-        return {
-            "text": s,
-            "metadata": {
-                "content_type": ctype,
-                "char_count": len(s),
-                "estimated_tokens": estimate_tokens(s),
-                "extraction_method": "passthrough"
-            }
+    s = data.decode("utf-8") if isinstance(data, bytes) else data
+    return {
+        "text": s,
+        "metadata": {
+            "content_type": ctype,
+            "char_count": len(s),
+            "estimated_tokens": estimate_tokens(s),
+            "extraction_method": "passthrough"
         }
-        
-    raise ValueError(f"Unsupported content type: {content_type}")
+    }
+
+STREAM_SLICE = 65536
+
+async def stream_text(content_type: str, data: Union[str, bytes], info: Dict[str, Any]) -> AsyncIterator[str]:
+    """Yield a document's text piece by piece.
+
+    PDF pages are extracted in chunks of PDF_CHUNK by the extraction executor, the
+    next chunk while the current one is consumed. Plain text is sliced. Other formats are
+    extracted whole and yielded once. `info` receives the extraction metadata;
+    char counts are left to the consumer.
+    """
+    ctype = content_type.lower()
+    kind = content_kind(ctype)
+    if kind == "pdf":
+        buf = data if isinstance(data, bytes) else data.encode("utf-8")
+        _check_size(len(buf))
+        info.update({"content_type": "pdf", "extraction_method": "pypdf", "pages": 0})
+        # workers read the file, so the document is not pickled once per chunk
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp.write(buf)
+            path = tmp.name
+        del buf
+        nxt = asyncio.ensure_future(run_extract(_pdf_range, path, 0, PDF_CHUNK))
+        try:
+            start = 0
+            while nxt is not None:
+                n, pages = await nxt
+                start += PDF_CHUNK
+                nxt = asyncio.ensure_future(run_extract(_pdf_range, path, start, start + PDF_CHUNK)) if start < n else None
+                for page in pages:
+                    info["pages"] += 1
+                    yield page
+        finally:
+            if nxt is not None: nxt.cancel()
+            os.unlink(path)
+    elif kind == "text":
+        s = data.decode("utf-8") if isinstance(data, bytes) else data
+        info.update({"content_type": ctype, "extraction_method": "passthrough"})
+        for i in range(0, len(s), STREAM_SLICE):
+            yield s[i:i + STREAM_SLICE]
+    else:
+        ex = await extract_text(ctype, data)
+        info.update({k: v for k, v in ex["metadata"].items() if k not in ("char_count", "estimated_tokens")})
+        yield ex["text"]
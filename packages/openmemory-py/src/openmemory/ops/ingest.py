@@ -1,14 +1,19 @@
 import asyncio
+import collections
+import hashlib
 import json
 import logging
 import uuid
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, AsyncIterator
 
 from ..core.db import q, db, transaction
-from ..memory.hsg import add_hsg_memory
+from ..memory.hsg import add_hsg_memory, prepare_hsg_memory, write_hsg_memory, store_prepared, link_similar, delete_memories
+from ..memory.user_summary import user_profiles
+from ..core.config import env
+from ..memory.waypoint_graph import waypoint_graph
 from ..utils.vectors import rid
-from .extract import extract_text
+from .extract import stream_text, estimate_tokens, fetch_url, EXTRACTOR_VERSION
 
 # Port of backend/src/ops/ingest.ts
 
@@ -30,83 +35,177 @@ def split_text(t: str, sz: int) -> list[str]:
     if cur.strip(): secs.append(cur.strip())
     return secs
 
+class Sectioner:
+    """Incremental split_text: feed text pieces, get finished sections back."""
+    def __init__(self, sz: int):
+        self.sz = sz
+        self.buf = ""
+        self.cur = ""
+
+    def _para(self, p: str) -> List[str]:
+        if len(self.cur) + len(p) > self.sz and len(self.cur) > 0:
+            out = [self.cur.strip()]
+            self.cur = p
+            return out
+        self.cur += ("\n\n" if self.cur else "") + p
+        return []
+
+    def feed(self, part: str) -> List[str]:
+        self.buf += part
+        out = []
+        i = self.buf.find("\n\n")
+        while i >= 0:
+            out += self._para(self.buf[:i])
+            self.buf = self.buf[i + 2:]
+            i = self.buf.find("\n\n")
+        return out
+
+    def close(self) -> List[str]:
+        out = self._para(self.buf)
+        self.buf = ""
+        if self.cur.strip(): out.append(self.cur.strip())
+        self.cur = ""
+        return out
+
 async def mk_root(txt: str, ex: Dict, meta: Dict = None, user_id: str = None) -> str:
+    return put_root(str(uuid.uuid4()), txt, ex, meta, user_id)
+
+def put_root(mid: str, txt: str, ex: Dict, meta: Dict = None, user_id: str = None) -> str:
     summ = txt[:500] + "..." if len(txt) > 500 else txt
     ctype = ex["metadata"]["content_type"].upper()
     sec_count = int(len(txt) / SEC) + 1
     content = f"[Document: {ctype}]\n\n{summ}\n\n[Full content split across {sec_count} sections]"
-    
-    mid = str(uuid.uuid4())
     ts = int(time.time()*1000)
-    
-    try:
-        # db.execute("BEGIN") 
-        # Direct insert to bypass segmentation logic/embedding for root?
-        # TS uses `q.ins_mem.run`.
-        # Mirroring TS:
-        full_meta = meta or {}
-        full_meta.update(ex["metadata"])
-        full_meta.update({
-            "is_root": True,
-            "ingestion_strategy": "root-child",
-            "ingested_at": ts
-        })
-        
-        q.ins_mem(
-            id=mid,
-            content=content,
-            primary_sector="reflective",
-            tags=json.dumps([]),
-            meta=json.dumps(full_meta, default=str),
-            created_at=ts,
-            updated_at=ts,
-            last_seen_at=ts,
-            salience=1.0,
-            decay_lambda=0.1,
-            segment=1, # Default 1? HSG rotates. TS uses `q.ins_mem` manually.
-            user_id=user_id or "anonymous",
-            feedback_score=0 # TS passes null? I used default in py
-        )
-        # db.execute("COMMIT")
-        return mid
-    except Exception as e:
-        # db.execute("ROLLBACK")
-        raise e
+    full_meta = dict(meta or {})
+    full_meta.update(ex["metadata"])
+    full_meta.update({
+        "is_root": True,
+        "ingestion_strategy": "root-child",
+        "ingested_at": ts
+    })
+    q.ins_mem(
+        id=mid,
+        content=content,
+        primary_sector="reflective",
+        tags=json.dumps([]),
+        meta=json.dumps(full_meta, default=str),
+        created_at=ts,
+        updated_at=ts,
+        last_seen_at=ts,
+        salience=1.0,
+        decay_lambda=0.1,
+        segment=1, # Default 1? HSG rotates. TS uses `q.ins_mem` manually.
+        user_id=user_id or "anonymous",
+        feedback_score=0 # TS passes null? I used default in py
+    )
+    return mid
 
-async def mk_child(txt: str, idx: int, tot: int, rid: str, meta: Dict = None, user_id: str = None) -> str:
-    m = meta or {}
+def child_meta(idx: int, tot: Optional[int], rid: str, meta: Dict = None) -> Dict:
+    m = dict(meta or {})
     m.update({
         "is_child": True,
         "section_index": idx,
         "total_sections": tot,
         "parent_id": rid
     })
-    r = await add_hsg_memory(txt, json.dumps([]), m, user_id)
+    return m
+
+async def mk_child(txt: str, idx: int, tot: int, rid: str, meta: Dict = None, user_id: str = None, defer: bool = False) -> str:
+    r = await add_hsg_memory(txt, json.dumps([]), child_meta(idx, tot, rid, meta), user_id, defer=defer)
     return r["id"]
 
 async def link(rid: str, cid: str, idx: int, user_id: str = None):
+    link_many(rid, [cid], user_id)
+
+def link_many(rid: str, cids: List[str], user_id: str = None):
     ts = int(time.time()*1000)
-    # q.ins_waypoint
-    db.execute("INSERT INTO waypoints(src_id,dst_id,user_id,weight,created_at,updated_at) VALUES (?,?,?,?,?,?)",
-               (rid, cid, user_id or "anonymous", 1.0, ts, ts))
+    # a child may already be linked (deduplicated section)
+    db.conn.executemany("""INSERT INTO waypoints(src_id,dst_id,user_id,weight,created_at,updated_at) VALUES (?,?,?,?,?,?)
+                           ON CONFLICT(src_id, dst_id) DO UPDATE SET weight=excluded.weight, updated_at=excluded.updated_at""",
+                        [(rid, c, user_id or "anonymous", 1.0, ts, ts) for c in cids])
     db.commit()
+    def apply():
+        for c in cids:
+            waypoint_graph.add_edge(rid, c, user_id, 1.0)
+    db.after_commit(apply)
 
-async def ingest_document(t: str, data: Any, meta: Dict = None, cfg: Dict = None, user_id: str = None, tags: list = None) -> Dict[str, Any]:
+async def write_sections(rid: str, sections: "asyncio.Queue", meta: Dict = None, user_id: str = None,
+                         limit: int = None, batch: int = None, written: List[str] = None) -> List[str]:
+    """Drain the section queue, embedding up to `limit` children at a time and
+    storing them `batch` at a time, in section order.
+
+    Each batch is written, linked to the root and given its similarity pass in its
+    own synchronous transaction(), so at most `batch` prepared sections are held.
+    Ids of the children created (not deduplicated) are appended to `written`.
+    """
+    sem = asyncio.Semaphore(limit or env.ingest_concurrency)
+    batch = max(1, batch or env.ingest_batch)
+    pending: "collections.deque[asyncio.Task]" = collections.deque()
+    cids: List[str] = []
+    written = [] if written is None else written
+
+    async def flush():
+        plans = [await t for t in list(pending)]
+        pending.clear()
+        with transaction():
+            res = [write_hsg_memory(p) for p in plans]
+            ids = [r["id"] for r in res]
+            link_many(rid, ids, user_id)
+            link_similar(ids, int(time.time()*1000), user_id)
+        written.extend(r["id"] for r in res if not r.get("deduplicated"))
+        cids.extend(ids)
+        await store_prepared(plans)
+
+    try:
+        n = 0
+        while True:
+            txt = await sections.get()
+            if txt is None: break
+            await sem.acquire()
+            failed = next((t for t in pending if t.done() and not t.cancelled() and t.exception()), None)
+            if failed:
+                sem.release()
+                raise failed.exception()
+            t = asyncio.create_task(prepare_hsg_memory(txt, json.dumps([]), child_meta(n, None, rid, meta), user_id))
+            t.add_done_callback(lambda _: sem.release())
+            pending.append(t)
+            n += 1
+            if len(pending) >= batch: await flush()
+        if pending: await flush()
+    except BaseException:
+        for t in pending: t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        raise
+    return cids
+
+async def _ingest(parts: AsyncIterator[str], info: Dict[str, Any], meta: Dict = None, cfg: Dict = None,
+                  user_id: str = None, tags: list = None) -> Dict[str, Any]:
     th = cfg.get("lg_thresh", LG) if cfg else LG
     sz = cfg.get("sec_sz", SEC) if cfg else SEC
+    force = bool(cfg and cfg.get("force_root"))
     
-    ex = await extract_text(t, data)
-    text = ex["text"]
-    exMeta = ex["metadata"]
-    est_tok = exMeta["estimated_tokens"]
-    
-    use_rc = (cfg and cfg.get("force_root")) or est_tok > th
-    
+    # Buffer only until the document is known to be small or crosses the root-child threshold
+    it = parts.__aiter__()
+    head: List[str] = []
+    chars = 0
+    exhausted = False
+    while True:
+        try:
+            p = await it.__anext__()
+        except StopAsyncIteration:
+            exhausted = True
+            break
+        head.append(p)
+        chars += len(p)
+        if chars // 4 + 1 > th: break
+        
     # Ensure tags is JSON string if needed, or list. add_hsg_memory expects JSON string for tags usually? 
     # Let's check db definition. It expects string.
     tags_json = json.dumps(tags or [])
     
-    if not use_rc:
+    if exhausted and not force and chars // 4 + 1 <= th:
+        text = "".join(head)
+        exMeta = {**info, "char_count": len(text), "estimated_tokens": estimate_tokens(text)}
         m = meta or {}
         m.update(exMeta)
         m.update({"ingestion_strategy": "single", "ingested_at": int(time.time()*1000)})
@@ -115,77 +214,149 @@ async def ingest_document(t: str, data: Any, meta: Dict = None, cfg: Dict = None
         return {
             "root_memory_id": r["id"],
             "child_count": 0,
-            "total_tokens": est_tok,
+            "total_tokens": exMeta["estimated_tokens"],
             "strategy": "single",
-            "extraction": exMeta
+            "extraction": exMeta,
+            "memory_ids": [r["id"]]
         }
         
-    secs = split_text(text, sz)
-    print(f"[INGEST] Splitting into {len(secs)} sections")
-    
-    cids = []
+    # Root-child, streamed: extraction -> sectioner -> bounded queue -> concurrent embedding
+    # -> batches of children, each committed in a synchronous transaction no other task can
+    # join. The root is written first and finalized once the stream is drained; a failure
+    # removes it and every child written so far.
+    written: List[str] = []
     try:
-        rid_val = await mk_root(text, ex, meta, user_id)
-        for i, s in enumerate(secs):
-             cid = await mk_child(s, i, len(secs), rid_val, meta, user_id)
-             cids.append(cid)
-             await link(rid_val, cid, i, user_id)
-             
+        preview = "".join(head)[:501]
+        sections: asyncio.Queue = asyncio.Queue(maxsize=cfg.get("queue", env.ingest_queue) if cfg else env.ingest_queue)
+        
+        async def produce():
+            nonlocal chars
+            sec = Sectioner(sz)
+            try:
+                for p in head:
+                    for x in sec.feed(p): await sections.put(x)
+                head.clear()
+                async for p in it:
+                    chars += len(p)
+                    for x in sec.feed(p): await sections.put(x)
+                for x in sec.close(): await sections.put(x)
+            except asyncio.CancelledError:
+                raise
+            except BaseException:
+                await sections.put(None)
+                raise
+            await sections.put(None)
+                
+        rid_val = put_root(str(uuid.uuid4()), preview, {"metadata": info}, meta, user_id)
+        written.append(rid_val)
+        prod = asyncio.create_task(produce())
+        try:
+            cids = await write_sections(rid_val, sections, meta, user_id, cfg.get("concurrency") if cfg else None,
+                                        cfg.get("batch") if cfg else None, written)
+        except BaseException:
+            prod.cancel()
+            raise
+        await prod
+        
+        exMeta = {**info, "char_count": chars, "estimated_tokens": chars // 4 + 1}
+        with transaction():
+            finish_root(rid_val, preview, exMeta, cids)
+        if user_id: user_profiles.refresh(user_id)
+        print(f"[INGEST] Streamed {len(cids)} sections")
         return {
             "root_memory_id": rid_val,
-            "child_count": len(secs),
-            "total_tokens": est_tok,
+            "child_count": len(cids),
+            "total_tokens": exMeta["estimated_tokens"],
             "strategy": "root-child",
-            "extraction": exMeta
+            "extraction": exMeta,
+            "memory_ids": [rid_val] + cids
         }
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"[INGEST] Failed: {e}")
-        raise e
+    except BaseException as e:
+        if written: await delete_memories(written)
+        if isinstance(e, Exception):
+            import traceback
+            traceback.print_exc()
+            print(f"[INGEST] Failed: {e}")
+        raise
+
+def finish_root(rid: str, preview: str, exMeta: Dict[str, Any], cids: List[str]):
+    # section count and sizes are only known once the stream is drained
+    summ = preview[:500] + "..." if len(preview) > 500 else preview
+    content = f"[Document: {exMeta['content_type'].upper()}]\n\n{summ}\n\n[Full content split across {len(cids)} sections]"
+    db.execute("UPDATE memories SET content=?, meta=json_patch(meta, ?) WHERE id=?", (content, json.dumps(exMeta, default=str), rid))
+    for i in range(0, len(cids), 500):
+        part = cids[i:i+500]
+        ph = ",".join("?" * len(part))
+        db.execute(f"UPDATE memories SET meta=json_set(meta, '$.total_sections', ?) WHERE id IN ({ph})", (len(cids), *part))
+    db.commit()
+
+async def content_hash(t: str, data: Any) -> str:
+    buf = data if isinstance(data, bytes) else str(data).encode("utf-8")
+    h = await asyncio.to_thread(hashlib.sha256, buf) if len(buf) > 1 << 20 else hashlib.sha256(buf)
+    return hashlib.sha256(f"{t.lower()}\0{h.hexdigest()}".encode()).hexdigest()
+
+def ingest_key(h: str, cfg: Dict = None, meta: Dict = None, tags: list = None) -> str:
+    """Cache key: the same bytes sectioned differently or stored with other meta/tags are another result."""
+    cfg = cfg or {}
+    opts = {"lg_thresh": cfg.get("lg_thresh", LG), "sec_sz": cfg.get("sec_sz", SEC), "force_root": bool(cfg.get("force_root"))}
+    blob = json.dumps({"cfg": opts, "meta": meta or {}, "tags": tags or []}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{h}\0{blob}".encode()).hexdigest()
+
+def _all_exist(ids: List[str]) -> bool:
+    ids = list(dict.fromkeys(ids))
+    n = 0
+    for i in range(0, len(ids), 500):
+        part = ids[i:i+500]
+        n += db.fetchone(f"SELECT count(*) AS c FROM memories WHERE id IN ({','.join('?' * len(part))})", tuple(part))["c"]
+    return n == len(ids)
+
+def cached_ingest(h: str, user_id: str = None) -> Optional[Dict[str, Any]]:
+    uid = user_id or "anonymous"
+    r = db.fetchone("SELECT * FROM ingest_cache WHERE hash=? AND user_id=? AND extractor_version=?", (h, uid, EXTRACTOR_VERSION))
+    if not r: return None
+    ids = json.loads(r["memory_ids"])
+    # the root or any section may have been deleted since
+    if not _all_exist(ids): return None
+    db.execute("UPDATE ingest_cache SET last_seen_at=? WHERE hash=? AND user_id=?", (int(time.time()*1000), h, uid))
+    db.commit()
+    ex = json.loads(r["extraction"] or "{}")
+    return {
+        "root_memory_id": r["root_id"],
+        "child_count": len(ids) - 1 if r["strategy"] == "root-child" else 0,
+        "total_tokens": ex.get("estimated_tokens", 0),
+        "strategy": r["strategy"],
+        "extraction": ex,
+        "memory_ids": ids,
+        "cached": True
+    }
+
+def store_ingest(h: str, res: Dict[str, Any], user_id: str = None):
+    ts = int(time.time()*1000)
+    db.execute("""
+        INSERT OR REPLACE INTO ingest_cache(hash, user_id, extractor_version, root_id, memory_ids, strategy, extraction, created_at, last_seen_at)
+        VALUES (?,?,?,?,?,?,?,?,?)
+    """, (h, user_id or "anonymous", EXTRACTOR_VERSION, res["root_memory_id"], json.dumps(res["memory_ids"]),
+          res["strategy"], json.dumps(res["extraction"], default=str), ts, ts))
+    db.commit()
+
+async def ingest_document(t: str, data: Any, meta: Dict = None, cfg: Dict = None, user_id: str = None, tags: list = None) -> Dict[str, Any]:
+    # unchanged documents cost one hash: no parse, no embed
+    h = ingest_key(await content_hash(t, data), cfg, meta, tags) if env.ingest_cache else None
+    if h and not (cfg and cfg.get("force")):
+        hit = cached_ingest(h, user_id)
+        if hit: return hit
+    info: Dict[str, Any] = {}
+    res = await _ingest(stream_text(t, data, info), info, meta, cfg, user_id, tags)
+    if h: store_ingest(h, res, user_id)
+    return res
 
 async def ingest_url(url: str, meta: Dict = None, cfg: Dict = None, user_id: str = None) -> Dict[str, Any]:
-    from .extract import extract_url
-    ex = await extract_url(url)
-    
-    th = cfg.get("lg_thresh", LG) if cfg else LG
-    sz = cfg.get("sec_sz", SEC) if cfg else SEC
-    
-    use_rc = (cfg and cfg.get("force_root")) or ex["metadata"]["estimated_tokens"] > th
-    
-    if not use_rc:
-        m = meta or {}
-        m.update(ex["metadata"])
-        m.update({"ingestion_strategy": "single", "ingested_at": int(time.time()*1000)})
-        r = await add_hsg_memory(ex["text"], json.dumps([]), m, user_id)
-        return {
-            "root_memory_id": r["id"],
-            "child_count": 0,
-            "total_tokens": ex["metadata"]["estimated_tokens"],
-            "strategy": "single",
-            "extraction": ex["metadata"]
-        }
-        
-    secs = split_text(ex["text"], sz)
-    cids = []
-    
-    m_root = meta or {}
-    m_root["source_url"] = url
-    
+    html = await fetch_url(url)
+    m = meta or {}
+    m["source_url"] = url
+    info: Dict[str, Any] = {}
     try:
-        rid_val = await mk_root(ex["text"], ex, m_root, user_id)
-        for i, s in enumerate(secs):
-             cid = await mk_child(s, i, len(secs), rid_val, m_root, user_id)
-             cids.append(cid)
-             await link(rid_val, cid, i, user_id)
-             
-        return {
-            "root_memory_id": rid_val,
-            "child_count": len(secs),
-            "total_tokens": ex["metadata"]["estimated_tokens"],
-            "strategy": "root-child",
-            "extraction": ex["metadata"]
-        }
+        return await _ingest(stream_text("html", html, info), info, m, cfg, user_id)
     except Exception as e:
         print(f"[INGEST] URL Failed: {e}")
         raise e
@@ -6,3 +6,9 @@
 @router.get("/health")
 async def health_check():
     return {"status": "ok", "service": "openmemory-py"}
+
+@router.get("/health/ai")
+async def ai_health():
+    # adapters, request rate, window and queue depth per provider/model
+    from ...ai.registry import registry
+    return registry.stats()
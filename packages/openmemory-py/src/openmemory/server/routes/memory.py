@@ -3,6 +3,7 @@
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from ...main import Memory
+from ...ai.limiter import RateLimited
 
 # Global memory instance for server
 # In a real app, strict dependency injection might be used, 
@@ -36,6 +37,9 @@ async def add_memory(req: AddMemoryRequest):
         
         result = await mem.add(req.content, user_id=req.user_id, meta=meta)
         return {"success": True, "data": result}
+    except RateLimited as e:
+        # the provider is still refusing after our retries: let the client back off too
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(e.retry_after or 1))})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -46,6 +50,8 @@ async def search_memory(req: SearchMemoryRequest):
         filters = req.filters or {}
         results = await mem.search(req.query, user_id=req.user_id, limit=req.limit, **filters)
         return {"results": results}
+    except RateLimited as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(e.retry_after or 1))})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -2,7 +2,8 @@
 sources routes - ingest data from external sources via HTTP
 
 POST /sources/{source}/ingest
-  body: { creds: {...}, filters: {...}, user_id?: string }
+  body: { creds: {...}, filters: {...}, user_id?: string, incremental?: bool }
+  incremental: only ingest what changed since the last incremental run
 
 POST /sources/webhook/{source}
   generic webhook endpoint for source-specific payloads
@@ -17,13 +18,14 @@ class ingest_req(BaseModel):
     creds: Dict[str, Any] = {}
     filters: Dict[str, Any] = {}
     user_id: Optional[str] = None
+    incremental: bool = False
 
 @router.get("")
 async def list_sources():
     return {
         "sources": ["github", "notion", "google_drive", "google_sheets", "google_slides", "onedrive", "web_crawler"],
         "usage": {
-            "ingest": "POST /sources/{source}/ingest { creds: {}, filters: {}, user_id? }",
+            "ingest": "POST /sources/{source}/ingest { creds: {}, filters: {}, user_id?, incremental? }",
             "webhook": "POST /sources/webhook/{source} (source-specific payload)"
         }
     }
@@ -49,13 +51,22 @@ async def ingest_source(source: str, req: ingest_req):
     if source not in source_map:
         raise HTTPException(400, f"unknown source: {source}. available: {list(source_map.keys())}")
     
+    src = source_map[source](user_id=req.user_id)
     try:
-        src = source_map[source](user_id=req.user_id)
         await src.connect(**req.creds)
+        if req.incremental:
+            report = await src.sync(**req.filters)
+            return {"ok": not report["failed"], "ingested": report["ingested"], "memory_ids": report["memory_ids"],
+                    "total": report["total"], "failed": report["failed"],
+                    "skipped": report["skipped"], "deleted": report["deleted"]}
         ids = await src.ingest_all(**req.filters)
-        return {"ok": True, "ingested": len(ids), "memory_ids": ids}
+        report = src.last_report
+        return {"ok": not report["failed"], "ingested": len(ids), "memory_ids": ids,
+                "total": report["total"], "failed": report["failed"]}
     except Exception as e:
         raise HTTPException(500, str(e))
+    finally:
+        await src.aclose()
 
 @router.post("/webhook/github")
 async def github_webhook(request: Request):
@@ -2,6 +2,7 @@
 import uuid
 import json
 import logging
+import sqlite3
 from typing import List, Dict, Any, Optional
 
 from ..core.db import q, db, transaction
@@ -12,31 +13,85 @@
 
 async def insert_fact(subject: str, predicate: str, subject_object: str, valid_from: int = None, confidence: float = 1.0, metadata: Dict[str, Any] = None, user_id: Optional[str] = None) -> str:
     # subject_object -> "object" column (object is reserved word in python less dangerous but avoiding confusion)
-    fact_id = str(uuid.uuid4())
-    now = int(time.time() * 1000)
-    valid_from_ts = valid_from if valid_from is not None else now
-    
-    # Invalidate existing
-    existing = db.fetchall("SELECT id, valid_from FROM temporal_facts WHERE subject=? AND predicate=? AND valid_to IS NULL ORDER BY valid_from DESC", (subject, predicate))
-    
-    for old in existing:
-        if old["valid_from"] < valid_from_ts:
-            db.execute("UPDATE temporal_facts SET valid_to=? WHERE id=?", (valid_from_ts - 1, old["id"]))
-            # logger.info(f"[TEMPORAL] Closed fact {old['id']}")
-            
-    meta_json = json.dumps(metadata) if metadata else None
-    if user_id:
-        md = metadata or {}
-        md["user_id"] = user_id
-        meta_json = json.dumps(md)
-    
-    db.execute("INSERT INTO temporal_facts(id, subject, predicate, object, valid_from, valid_to, confidence, last_updated, metadata) VALUES (?,?,?,?,?,NULL,?,?,?)",
-               (fact_id, subject, predicate, subject_object, valid_from_ts, confidence, now, meta_json))
-    
-    db.commit()
+    fact = {"subject": subject, "predicate": predicate, "object": subject_object, "valid_from": valid_from,
+            "confidence": confidence, "metadata": metadata, "user_id": user_id}
+    with transaction():
+        fact_id = _load_facts([fact])[0]
     # logger.info(f"[TEMPORAL] Inserted fact: {subject} {predicate} {subject_object}")
     return fact_id
 
+# the loader uses UPDATE ... FROM (3.33) and window RANGE offsets (3.28)
+MIN_SQLITE = (3, 33, 0)
+
+def _check_sqlite():
+    if sqlite3.sqlite_version_info < MIN_SQLITE:
+        raise RuntimeError(f"temporal facts need SQLite >= {'.'.join(map(str, MIN_SQLITE))} "
+                           f"(UPDATE ... FROM, window RANGE frames); this Python links SQLite {sqlite3.sqlite_version}")
+
+# end of an interval: the smallest strictly later valid_from of its (subject, predicate)
+_NEXT_FROM = """MIN(valid_from) OVER (
+    PARTITION BY subject, predicate ORDER BY valid_from RANGE BETWEEN 1 FOLLOWING AND UNBOUNDED FOLLOWING
+)"""
+
+def _load_facts(facts: List[Dict[str, Any]]) -> List[str]:
+    """
+    Insert facts and close the open intervals they supersede, set-based.
+
+    Facts are staged in a temp table together with the open facts already stored
+    for their (subject, predicate). Within a key every staged interval ends 1ms
+    before the next later valid_from, whatever order the batch arrived in; facts
+    that share a valid_from stay open side by side. One UPDATE closes the
+    superseded stored facts and one INSERT ... SELECT moves the batch in.
+    Runs inside the caller's transaction.
+    """
+    _check_sqlite()
+    now = int(time.time() * 1000)
+    ids = []
+    rows = []
+    for f in facts:
+        fid = str(uuid.uuid4())
+        meta = f.get("metadata")
+        if f.get("user_id"):
+            meta = {**(meta or {}), "user_id": f["user_id"]}
+        vf = f.get("valid_from")
+        rows.append((fid, f["subject"], f["predicate"], f["object"], vf if vf is not None else now,
+                     f.get("confidence", 1.0), json.dumps(meta) if meta else None))
+        ids.append(fid)
+
+    c = db.conn
+    c.execute("DROP TABLE IF EXISTS temp.temporal_stage")
+    c.execute("""
+        CREATE TEMP TABLE temporal_stage (
+            seq INTEGER PRIMARY KEY, id TEXT, subject TEXT, predicate TEXT, object TEXT,
+            valid_from INTEGER, confidence REAL, metadata TEXT, fresh INTEGER
+        )
+    """)
+    c.executemany("INSERT INTO temporal_stage(id, subject, predicate, object, valid_from, confidence, metadata, fresh) VALUES (?,?,?,?,?,?,?,1)", rows)
+    # stored open facts of the same keys take part in the ordering
+    c.execute("""
+        INSERT INTO temporal_stage(id, subject, predicate, valid_from, fresh)
+        SELECT f.id, f.subject, f.predicate, f.valid_from, 0
+        FROM (SELECT DISTINCT subject, predicate FROM temporal_stage) k
+        JOIN temporal_facts f ON f.subject = k.subject AND f.predicate = k.predicate AND f.valid_to IS NULL
+    """)
+    c.execute(f"""
+        UPDATE temporal_facts SET valid_to = s.next_from - 1, last_updated = ?
+        FROM (
+            SELECT id, fresh, {_NEXT_FROM} AS next_from FROM temporal_stage
+            WHERE (subject, predicate) IN (SELECT subject, predicate FROM temporal_stage WHERE fresh = 0)
+        ) s
+        WHERE s.fresh = 0 AND s.next_from IS NOT NULL AND temporal_facts.id = s.id
+    """, (now,))
+    # in primary key order: appending to the id b-tree is far cheaper than random inserts
+    c.execute(f"""
+        INSERT INTO temporal_facts(id, subject, predicate, object, valid_from, valid_to, confidence, last_updated, metadata)
+        SELECT id, subject, predicate, object, valid_from, next_from - 1, confidence, ?, metadata
+        FROM (SELECT *, {_NEXT_FROM} AS next_from FROM temporal_stage)
+        WHERE fresh = 1 ORDER BY id
+    """, (now,))
+    c.execute("DROP TABLE temp.temporal_stage")
+    return ids
+
 async def update_fact(fact_id: str, confidence: Optional[float] = None, metadata: Optional[Dict[str, Any]] = None):
     updates = []
     params = []
@@ -85,56 +140,17 @@ async def invalidate_edge(edge_id: str, valid_to: int = None):
     db.commit()
 
 async def batch_insert_facts(facts: List[Dict[str, Any]]) -> List[str]:
-    ids = []
-    try:
-        db.execute("BEGIN")
-        # Reuse logic logic but inside TX? 
-        # `insert_fact` commits. I MUST NOT call `insert_fact` if I want atomic batch commit.
-        # But `insert_fact` logic is complex (invalidation).
-        # I should replicate logic here or change `insert_fact` to support `commit=False`.
-        # Given "chaotic genius", I'll reimplement loop here for safety/speed.
-        
-        # Or better: `insert_fact` using `db.execute` on shared conn. 
-        # If `insert_fact` calls `db.commit()`, it commits EVERYTHING in transaction so far.
-        # So calling `insert_fact` inside a `BEGIN`... `COMMIT` block works in SQLite (nested transactions unsupported, but commit commits all).
-        # Wait, if `insert_fact` commits, then the "Batch" atomicity is broken if one fails later.
-        # Proper way: refactor `insert_fact` to accept transaction handle or optional commit.
-        # But for 1:1 port, let's just loop and call `insert_fact`. The TS code sends `BEGIN` then calls `insert_fact`.
-        # TS `run_async` likely AUTO-COMMITS if not inside transaction or if connection is shared?
-        # `core/db.ts` uses `better-sqlite3` or similar pool. `run_async` is wrapper.
-        # `db.py` uses single `conn`.
-        # If I call `db.execute("BEGIN")`, then `commit()` inside `insert_fact` commits the transaction including the BEGIN.
-        # So subsequent inserts are NOT in the transaction anymore?
-        # Yes.
-        # I will modify `insert_fact` to NOT commit if I can.
-        # But `insert_fact` signatures shouldn't change if keeping 1:1 API.
-        # I'll just reimplement logic for batch.
-        
-        now = int(time.time()*1000)
-        
-        for f in facts:
-            fid = str(uuid.uuid4())
-            sub, pred, obj = f["subject"], f["predicate"], f["object"]
-            vf = f.get("valid_from", now)
-            conf = f.get("confidence", 1.0)
-            meta = f.get("metadata")
-            
-            # Invalidation
-            existing = db.conn.execute("SELECT id, valid_from FROM temporal_facts WHERE subject=? AND predicate=? AND valid_to IS NULL", (sub, pred)).fetchall()
-            for old in existing:
-                 # usage of dict factory assumed in db.py? db.py returns rows.
-                 if old["valid_from"] < vf:
-                     db.conn.execute("UPDATE temporal_facts SET valid_to=? WHERE id=?", (vf - 1, old["id"]))
-            
-            db.conn.execute("INSERT INTO temporal_facts(id, subject, predicate, object, valid_from, valid_to, confidence, last_updated, metadata) VALUES (?,?,?,?,?,NULL,?,?,?)",
-               (fid, sub, pred, obj, vf, conf, now, json.dumps(meta) if meta else None))
-            ids.append(fid)
-            
-        db.execute("COMMIT")
-        return ids
-    except Exception as e:
-        db.execute("ROLLBACK")
-        raise e
+    """
+    Insert many facts in one transaction; ids come back in input order.
+
+    Each fact is a dict with subject, predicate, object and optionally
+    valid_from, confidence, metadata and user_id. Facts of the same
+    (subject, predicate) are ordered by valid_from, not by list position.
+    """
+    if not facts:
+        return []
+    with transaction():
+        return _load_facts(facts)
 
 async def apply_confidence_decay(decay_rate: float = 0.01) -> int:
     now = int(time.time() * 1000)
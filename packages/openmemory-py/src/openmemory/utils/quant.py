@@ -0,0 +1,53 @@
+import numpy as np
+from typing import List, Tuple, Union, Optional
+
+# Scalar quantization of unit-normalised vectors for first-pass scans.
+# int8: symmetric per-vector scale, code = round(x / scale), scale = max|x| / 127
+# float16: plain half precision
+# Vectors are normalised before encoding, so a dot product against a unit query
+# approximates cosine similarity directly.
+
+MODES = ("none", "int8", "float16")
+
+def _unit(v: Union[List[float], np.ndarray]) -> np.ndarray:
+    a = np.asarray(v, dtype=np.float32)
+    n = float(np.linalg.norm(a))
+    return a / n if n > 0 else a
+
+def quantize(v: Union[List[float], np.ndarray], mode: str) -> Tuple[bytes, float]:
+    u = _unit(v)
+    if mode == "int8":
+        m = float(np.max(np.abs(u))) if u.size else 0.0
+        scale = m / 127.0 if m > 0 else 1.0
+        codes = np.clip(np.rint(u / scale), -127, 127).astype(np.int8)
+        return codes.tobytes(), scale
+    if mode == "float16":
+        return u.astype(np.float16).tobytes(), 1.0
+    raise ValueError(f"unknown quantization mode: {mode}")
+
+def code_size(dim: int, mode: str) -> int:
+    return dim if mode == "int8" else dim * 2
+
+def decode_matrix(blobs: List[bytes], mode: str, dim: int) -> np.ndarray:
+    dt = np.int8 if mode == "int8" else np.float16
+    return np.frombuffer(b"".join(blobs), dtype=dt).reshape(len(blobs), dim)
+
+def approx_scores(q: Union[List[float], np.ndarray], codes: np.ndarray, scales: Optional[np.ndarray], mode: str) -> np.ndarray:
+    qu = _unit(q)
+    s = codes.astype(np.float32) @ qu
+    if mode == "int8" and scales is not None:
+        s *= scales
+    return s
+
+def cosine_scores(q: Union[List[float], np.ndarray], mat: np.ndarray) -> np.ndarray:
+    qu = _unit(q)
+    norms = np.linalg.norm(mat, axis=1)
+    norms[norms == 0] = 1.0
+    return (mat @ qu) / norms
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    # indices of the k best scores, best first
+    if k >= scores.shape[0]:
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, k)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
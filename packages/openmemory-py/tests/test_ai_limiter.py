@@ -0,0 +1,101 @@
+import pytest
+import json
+import time
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from openmemory.core.config import env
+from openmemory.ai.limiter import Limiter, ProviderLimits, RateLimited, parse_retry_after
+from openmemory.ai.ollama import OllamaAdapter
+
+# ==================================================================================
+# PROVIDER RATE LIMITING
+# ==================================================================================
+# A token bucket holds the request rate, an AIMD window the requests in flight;
+# throttled calls back off (honouring Retry-After) and are retried.
+# ==================================================================================
+
+@pytest.mark.asyncio
+async def test_token_bucket_holds_the_rate():
+    lim = Limiter(rate=20, burst=1, concurrency=8)
+    t = time.monotonic()
+    for _ in range(10):
+        await lim.acquire()
+        lim.release()
+    assert time.monotonic() - t >= 0.4
+    assert lim.stats()["calls"] == 10
+
+@pytest.mark.asyncio
+async def test_window_shrinks_under_throttling(monkeypatch):
+    monkeypatch.setattr(env, "ai_concurrency", 16)
+    monkeypatch.setattr(env, "ai_rate", 0)
+    monkeypatch.setattr(env, "ai_max_retries", 20)
+    limits = ProviderLimits("fake")
+    inflight = 0
+
+    async def call(i):
+        nonlocal inflight
+        inflight += 1
+        try:
+            await asyncio.sleep(0.01)
+            # the provider accepts 4 concurrent requests
+            if inflight > 4: raise RateLimited("busy", retry_after=0.02)
+            return i
+        finally:
+            inflight -= 1
+
+    res = await asyncio.gather(*(limits.run("m", call, i) for i in range(40)))
+    assert res == list(range(40))
+    st = limits.stats()["m"]
+    assert st["throttled"] > 0 and st["window"] < 16 and st["queued"] == 0 and st["inflight"] == 0
+
+@pytest.mark.asyncio
+async def test_errors_other_than_throttling_are_not_retried():
+    limits = ProviderLimits("fake")
+    calls = 0
+    async def boom():
+        nonlocal calls
+        calls += 1
+        raise ValueError("bad request")
+    with pytest.raises(ValueError):
+        await limits.run(None, boom)
+    assert calls == 1 and limits.get(None).inflight == 0
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert 0 <= parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+class Throttling(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    refused = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if Throttling.refused < 2:
+            Throttling.refused += 1
+            code, out, extra = 429, b'{"error": "rate limited"}', {"Retry-After": "0"}
+        else:
+            code, out, extra = 200, json.dumps({"embeddings": [[1.0, 0.0] for _ in body["input"]]}).encode(), {}
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        for k, v in extra.items(): self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *a): pass
+
+@pytest.mark.asyncio
+async def test_adapter_retries_429():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Throttling)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        a = OllamaAdapter(base_url=f"http://127.0.0.1:{srv.server_port}")
+        a.limits = ProviderLimits("ollama")
+        assert await a.embed_batch(["a", "b"], "m") == [[1.0, 0.0], [1.0, 0.0]]
+        assert a.limits.stats()["m"]["throttled"] == 2
+        await a.aclose()
+    finally:
+        srv.shutdown()
@@ -0,0 +1,51 @@
+import pytest
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from openmemory.core.config import env
+from openmemory.ai.registry import registry
+from openmemory.memory.embed import emb_dispatch
+
+# ==================================================================================
+# AI ADAPTER REGISTRY
+# ==================================================================================
+# Embed calls must reuse one long-lived adapter and its keep-alive connections
+# instead of building a client (and a TCP connection) per call.
+# ==================================================================================
+
+class FakeOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    peers = set()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeOllama.peers.add(self.client_address)
+        out = json.dumps({"embeddings": [[float(len(t)), 1.0, 0.0] for t in body["input"]]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *a): pass
+
+@pytest.mark.asyncio
+async def test_pooled_adapter_reuses_connections(monkeypatch):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(env, "ollama_url", f"http://127.0.0.1:{srv.server_port}")
+    try:
+        a = registry.get("ollama")
+        assert registry.get("ollama") is a
+        for i in range(5):
+            assert await emb_dispatch("ollama", "x" * i, "semantic") == [float(i), 1.0, 0.0]
+        assert len(FakeOllama.peers) == 1  # one keep-alive connection for every call
+
+        # a config change builds a new adapter; shutdown closes what is left
+        monkeypatch.setattr(env, "ollama_url", f"http://localhost:{srv.server_port}")
+        assert registry.get("ollama") is not a
+        await registry.aclose()
+        assert registry.stats()["adapters"] == []
+    finally:
+        srv.shutdown()
@@ -0,0 +1,74 @@
+import pytest
+import io
+import json
+import time
+import asyncio
+import threading
+from openmemory.ai.aws import AwsAdapter
+
+# ==================================================================================
+# BEDROCK ADAPTER
+# ==================================================================================
+# boto3 blocks, so invocations must run off the event loop, a batch must fan out
+# over the pool, and throttling must be retried with backoff.
+# ==================================================================================
+
+class ClientError(Exception):
+    # the shape botocore's ClientError carries
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+class StubRuntime:
+    """bedrock-runtime stand-in: blocking calls with a fixed latency."""
+    def __init__(self, latency=0.2, throttle=0, error=None):
+        self.latency, self.throttle, self.error = latency, throttle, error
+        self.calls = 0
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def invoke_model(self, modelId, body, **kw):
+        with self.lock:
+            self.calls += 1
+            throttled = self.calls <= self.throttle
+        self.threads.add(threading.get_ident())
+        time.sleep(self.latency)
+        if self.error: raise ClientError(self.error)
+        if throttled: raise ClientError("ThrottlingException")
+        text = json.loads(body)["inputText"]
+        return {"body": io.BytesIO(json.dumps({"embedding": [float(len(text)), 1.0]}).encode())}
+
+@pytest.mark.asyncio
+async def test_batch_runs_off_loop_and_concurrently():
+    stub = StubRuntime(latency=0.2)
+    a = AwsAdapter(client=stub, max_workers=8)
+    ticks = 0
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+    tick = asyncio.create_task(ticker())
+    t = time.time()
+    res = await a.embed_batch(["x" * i for i in range(1, 9)])
+    dt = time.time() - t
+    tick.cancel()
+    assert [r[0] for r in res] == [float(i) for i in range(1, 9)]
+    # 8 calls of 200 ms in parallel, not 1.6 s in series, and the loop kept running
+    assert dt < 0.8 and ticks > 10
+    assert threading.get_ident() not in stub.threads
+    await a.aclose()
+
+@pytest.mark.asyncio
+async def test_throttling_is_retried():
+    stub = StubRuntime(latency=0.0, throttle=2)
+    a = AwsAdapter(client=stub, max_workers=2, max_retries=3)
+    assert await a.embed("abc") == [3.0, 1.0]
+    assert stub.calls == 3
+
+    bad = AwsAdapter(client=StubRuntime(latency=0.0, error="ValidationException"), max_retries=3)
+    with pytest.raises(Exception, match="ValidationException"):
+        await bad.embed("abc")
+    assert bad.client.calls == 1
+    await a.aclose()
+    await bad.aclose()
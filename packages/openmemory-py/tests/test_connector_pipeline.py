@@ -0,0 +1,72 @@
+import pytest
+import json
+import time
+import random
+import asyncio
+from openmemory.core.db import db, q
+from openmemory.core.config import env
+from openmemory.connectors.base import base_connector
+
+# ==================================================================================
+# CONNECTOR INGEST PIPELINE
+# ==================================================================================
+# ingest_all overlaps the network waits of many items, keeps listing order in
+# its result and reports failed items instead of aborting the sync.
+# ==================================================================================
+
+class fake_connector(base_connector):
+    name = "fake"
+
+    def __init__(self, user_id=None, n=40, latency=0.05):
+        super().__init__(user_id)
+        self.n, self.latency = n, latency
+        self.inflight = self.peak = 0
+
+    async def connect(self, **creds):
+        self._connected = True
+        return True
+
+    async def list_items(self, **filters):
+        return [{"id": f"item-{i}"} for i in range(self.n)]
+
+    async def fetch_item(self, item_id):
+        self.inflight += 1
+        self.peak = max(self.peak, self.inflight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.inflight -= 1
+        if item_id == "item-3": raise IOError("gone")
+        if item_id == "item-5": return {"type": "application/pdf", "data": b"not a pdf"}
+        rng = random.Random(item_id)
+        words = " ".join("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(7)) for _ in range(30))
+        return {"type": "text", "text": f"pipeline note {words}", "meta": {"item": item_id}}
+
+@pytest.mark.asyncio
+async def test_pipeline_overlaps_and_reports(monkeypatch):
+    monkeypatch.setattr(env, "connector_fetch_concurrency", 8)
+    monkeypatch.setattr(env, "extract_workers", 0)
+    db.connect()
+    uid = "connector_pipeline"
+    q.del_mem_by_user(uid)
+    c = fake_connector(uid)
+    seen = []
+    t = time.time()
+    ids = await c.ingest_all(on_progress=seen.append)
+    # 40 fetches of 50 ms, 8 at a time
+    assert time.time() - t < 1.5 and c.peak == 8
+
+    rep = c.last_report
+    assert rep["total"] == 40 and rep["ingested"] == 38 and len(ids) == 38
+    assert sorted((f["id"], f["stage"]) for f in rep["failed"]) == [("item-3", "fetch"), ("item-5", "ingest")]
+    assert len(seen) == 40 and seen[-1]["done"] == 40 and seen[-1]["failed"] == 2
+    # results follow the listing order
+    items = [json.loads(q.get_mem(i)["meta"])["item"] for i in ids]
+    assert items == [f"item-{i}" for i in range(40) if i not in (3, 5)]
+
+    # a connector can pin its own concurrency
+    c = fake_connector(uid, n=6)
+    c.fetch_concurrency = 2
+    await c.ingest_all()
+    assert c.peak == 2
+    q.del_mem_by_user(uid)
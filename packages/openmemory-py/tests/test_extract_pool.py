@@ -0,0 +1,82 @@
+import pytest
+import time
+from openmemory.core.config import env
+from openmemory.ops import extract
+from openmemory.ops.extract import extract_text, stream_text, run_extract, reset_extract_pool
+
+# ==================================================================================
+# EXTRACTION EXECUTOR
+# ==================================================================================
+# CPU-bound parsers run in a process pool, bounded by input size and a per-job
+# timeout; a hung job must not take later extractions down with it.
+# ==================================================================================
+
+def make_pdf(pages):
+    """Minimal text PDF: one Helvetica line per entry of each page."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        body = "BT /F1 10 Tf 50 750 Td 12 TL " + " ".join(f"({l}) Tj T*" for l in lines) + " ET"
+        objs.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offs = b"%PDF-1.4\n", []
+    for i, o in enumerate(objs, 1):
+        offs.append(len(out))
+        out += f"{i} 0 obj\n{o}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode() + b"".join(f"{o:010d} 00000 n \n".encode() for o in offs)
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+@pytest.mark.asyncio
+async def test_pdf_extraction_in_pool(monkeypatch):
+    monkeypatch.setattr(env, "extract_workers", 2)
+    monkeypatch.setattr(extract, "PDF_CHUNK", 2)
+    reset_extract_pool()
+    pdf = make_pdf([[f"page {i} line {j}" for j in range(3)] for i in range(5)])
+    res = await extract_text("application/pdf", pdf)
+    assert res["metadata"]["pages"] == 5
+    assert "page 4 line 2" in res["text"]
+    assert extract._pool is not None
+
+    info = {}
+    pages = [p async for p in stream_text("application/pdf", pdf, info)]
+    assert info["pages"] == 5 and "".join(pages) == res["text"]
+
+    html = await extract_text("text/html", "<h1>Title</h1><p>body</p>")
+    assert "# Title" in html["text"]
+    reset_extract_pool()
+
+@pytest.mark.asyncio
+async def test_extraction_limits(monkeypatch):
+    monkeypatch.setattr(env, "extract_workers", 1)
+    monkeypatch.setattr(env, "extract_max_bytes", 1000)
+    monkeypatch.setattr(env, "extract_timeout", 0.5)
+    reset_extract_pool()
+    with pytest.raises(ValueError):
+        await extract_text("application/pdf", b"x" * 2000)
+
+    t = time.time()
+    with pytest.raises(TimeoutError):
+        await run_extract(time.sleep, 30)
+    assert time.time() - t < 5
+    # the stuck worker is gone and the next job gets a fresh pool
+    monkeypatch.setattr(env, "extract_max_bytes", 0)
+    res = await extract_text("application/pdf", make_pdf([["after timeout"]]))
+    assert "after timeout" in res["text"]
+    reset_extract_pool()
+
+def test_reset_only_the_failed_pool(monkeypatch):
+    from openmemory.ops import extract
+    monkeypatch.setattr(env, "extract_workers", 1)
+    reset_extract_pool()
+    old = extract._get_pool()
+    reset_extract_pool()
+    new = extract._get_pool()
+    # a late timeout on the replaced pool leaves the current one alone
+    reset_extract_pool(old)
+    assert extract._pool is new
+    reset_extract_pool(new)
+    assert extract._pool is None
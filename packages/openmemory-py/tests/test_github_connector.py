@@ -0,0 +1,198 @@
+import pytest
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from openmemory.core.db import db, q
+from openmemory.connectors import github_connector
+
+# ==================================================================================
+# GITHUB CONNECTOR: GIT TREES + BLOBS
+# ==================================================================================
+# A repository is listed with one recursive git-trees call, filtered by glob and
+# size before anything is downloaded, and blobs are fetched concurrently; ETags
+# turn unchanged metadata into 304s and ingested shas are not downloaded again.
+# ==================================================================================
+
+REPO = "acme/platform"
+
+def words(seed):
+    rng = random.Random(seed)
+    return " ".join("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(7)) for _ in range(40))
+
+FILES = {
+    "README.md": "# platform\n\n" + words("readme"),
+    "docs/guide.md": "# guide\n\n" + words("guide"),
+    "docs/api/auth.md": "# auth\n\n" + words("auth"),
+    "docs/drafts/wip.md": "# wip\n\n" + words("wip"),
+    "docs/big.md": "# big\n\n" + words("big") * 200,
+    "src/app.py": "def main():\n    return '" + words("app") + "'\n",
+    "src/util.py": "def helper():\n    return '" + words("util") + "'\n",
+}
+
+def raw(text):
+    return text if isinstance(text, bytes) else text.encode()
+
+def sha(text):
+    return hashlib.sha1(raw(text)).hexdigest()
+
+def root_sha():
+    # any file change moves the root tree
+    return sha(b"".join(sorted(raw(t) for t in FILES.values())))
+
+class FakeGitHub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+    truncate = False
+    lock = threading.Lock()
+    hits = Counter()
+    inflight = peak = 0
+
+    def reply(self, status, body=None, raw=None, etag=None):
+        out = raw if raw is not None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream" if raw is not None else "application/json")
+        if etag: self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_GET(self):
+        cls = FakeGitHub
+        assert self.headers["Authorization"] == "Bearer t"
+        path = self.path
+        with cls.lock:
+            cls.hits[path] += 1
+            cls.inflight += 1
+            cls.peak = max(cls.peak, cls.inflight)
+        try:
+            time.sleep(cls.latency)
+            blobs = {sha(t): t for t in FILES.values()}
+            dirs = sorted({p.rsplit("/", 1)[0] for p in FILES if "/" in p} | {"docs"})
+            entries = [{"path": d, "type": "tree", "sha": "t-" + d} for d in dirs]
+            entries += [{"path": p, "type": "blob", "sha": sha(t), "size": len(t)} for p, t in FILES.items()]
+            root = root_sha()
+            if path == f"/repos/{REPO}":
+                body, etag = {"default_branch": "main"}, '"repo-1"'
+            elif path == f"/repos/{REPO}/branches/main":
+                body, etag = {"commit": {"commit": {"tree": {"sha": root}}}}, f'"{root}"'
+            elif path == f"/repos/{REPO}/git/trees/{root}?recursive=1":
+                body, etag = {"sha": root, "tree": [] if cls.truncate else entries, "truncated": cls.truncate}, f'"t{root}"'
+            elif path == f"/repos/{REPO}/git/trees/{root}":
+                top = [e for e in entries if "/" not in e["path"]]
+                body, etag = {"sha": root, "tree": top, "truncated": False}, None
+            elif path.startswith(f"/repos/{REPO}/git/trees/t-") and path.endswith("?recursive=1"):
+                d = path.split("/git/trees/t-")[1].split("?")[0]
+                sub = [{**e, "path": e["path"][len(d) + 1:]} for e in entries if e["path"].startswith(d + "/")]
+                body, etag = {"sha": "t-" + d, "tree": sub, "truncated": False}, None
+            elif path.startswith(f"/repos/{REPO}/git/blobs/"):
+                assert self.headers["Accept"] == "application/vnd.github.raw+json"
+                return self.reply(200, raw=raw(blobs[path.rsplit("/", 1)[1]]))
+            else:
+                return self.reply(404, {"message": "Not Found"})
+            if etag and self.headers.get("If-None-Match") == etag:
+                with cls.lock: cls.hits[path + " 304"] += 1
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.reply(200, body, etag=etag)
+        finally:
+            with cls.lock: cls.inflight -= 1
+
+    def log_message(self, *a): pass
+
+def blob_hits():
+    return sum(n for p, n in FakeGitHub.hits.items() if "/git/blobs/" in p)
+
+@pytest.mark.asyncio
+async def test_trees_globs_and_blob_skip():
+    db.connect()
+    uid = "github_trees_user"
+    q.del_mem_by_user(uid)
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHub)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    FakeGitHub.hits.clear()
+    FakeGitHub.peak, FakeGitHub.truncate = 0, False
+    conn = github_connector(user_id=uid)
+    await conn.connect(token="t", api_url=f"http://127.0.0.1:{srv.server_port}")
+    f = {"repo": REPO, "include": ["docs/*.md", "src/*.py"], "exclude": "docs/drafts/*", "max_size": 4096}
+    try:
+        items = await conn.list_items(**f)
+        assert sorted(i["path"] for i in items) == ["docs/api/auth.md", "docs/guide.md", "src/app.py", "src/util.py"]
+        assert [p for p in FakeGitHub.hits if "/git/trees/" in p] == [f"/repos/{REPO}/git/trees/{root_sha()}?recursive=1"]
+        assert blob_hits() == 0  # filtering happens on tree metadata
+
+        ids = await conn.ingest_all(**f)
+        assert len(ids) == 4 and not conn.last_report["failed"]
+        # one raw blob request per file, several in flight at once, no contents api
+        assert blob_hits() == 4 and FakeGitHub.peak > 1
+        assert not [p for p in FakeGitHub.hits if "/contents/" in p]
+        guide = next(q.get_mem(m) for m in ids if json.loads(q.get_mem(m)["meta"])["path"] == "docs/guide.md")
+        assert words("guide")[:40] in guide["content"]
+        assert json.loads(guide["meta"])["sha"] == sha(FILES["docs/guide.md"])
+
+        # second run: metadata answered with 304s, every sha already ingested
+        FILES["src/util.py"] += "\n# changed\n"
+        again = await conn.list_items(**f)
+        assert [i["path"] for i in again] == ["src/util.py"]
+        assert FakeGitHub.hits[f"/repos/{REPO} 304"] >= 1
+        await conn.ingest_all(**f)
+        assert blob_hits() == 5
+
+        # a tree over the recursive limit is listed per top-level subtree
+        FakeGitHub.truncate = True
+        items = await conn.list_items(repo=REPO, include="docs/*", max_size=None)
+        assert sorted(i["path"] for i in items) == ["docs/big.md", "docs/drafts/wip.md"]
+    finally:
+        FILES["src/util.py"] = FILES["src/util.py"].replace("\n# changed\n", "")
+        await conn.aclose()
+        srv.shutdown()
+        q.del_mem_by_user(uid)
+
+@pytest.mark.asyncio
+async def test_binary_blobs_are_not_fetched():
+    from openmemory.connectors import sync_state
+    db.connect()
+    uid = "github_binary_user"
+    q.del_mem_by_user(uid)
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHub)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    FakeGitHub.hits.clear()
+    FakeGitHub.truncate = False
+    extra = {
+        "assets/logo.png": b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR" + bytes(range(256)),
+        "assets/bundle.zip": b"PK\x03\x04" + bytes(range(255, -1, -1)),
+        # text that is not utf-8 still goes in as text
+        "notes/legacy.txt": ("caf\xe9 " + words("legacy")).encode("latin-1"),
+    }
+    FILES.update(extra)
+    conn = github_connector(user_id=uid)
+    await conn.connect(token="t", api_url=f"http://127.0.0.1:{srv.server_port}")
+    f = {"repo": REPO, "path": "/", "max_size": None}
+    try:
+        items = await conn.list_items(**f)
+        paths = {i["path"] for i in items}
+        assert "notes/legacy.txt" in paths and "README.md" in paths
+        assert not paths & {"assets/logo.png", "assets/bundle.zip"}
+
+        # every listed item ingests, so the tree-sha cursor advances
+        report = await conn.sync(**f)
+        assert not report["failed"] and report["ingested"] == len(items)
+        assert sync_state.get_cursor("github", uid, conn.sync_scope(**f)) == root_sha()
+        assert not [p for p in FakeGitHub.hits if "/git/blobs/" + sha(extra["assets/logo.png"]) in p]
+        legacy = next(q.get_mem(m) for m in report["items"][f"{REPO}:notes/legacy.txt"])
+        assert words("legacy")[:40] in legacy["content"]
+
+        again = await conn.sync(**f)
+        assert again["listed"] == 0 and not again["failed"]
+    finally:
+        for p in extra: FILES.pop(p)
+        await conn.aclose()
+        srv.shutdown()
+        q.del_mem_by_user(uid)
@@ -0,0 +1,98 @@
+import pytest
+import re
+import random
+from types import SimpleNamespace as ns
+from openmemory.core.db import db, q
+from openmemory.core.config import env
+from openmemory.connectors import google_sheets_connector
+
+# ==================================================================================
+# GOOGLE SHEETS ROW WINDOWS
+# ==================================================================================
+# Large sheets are ingested as row windows (header repeated) read through
+# values.batchGet; a re-sync only ingests the windows whose rows changed.
+# ==================================================================================
+
+def sheet(n, seed):
+    rng = random.Random(seed)
+    word = lambda: "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(6))
+    return [["sku", "name", "notes"]] + [[f"S{i:05d}", word(), " ".join(word() for _ in range(6))] for i in range(n)]
+
+class fake_sheets:
+    """spreadsheets() of the sheets v4 client over in-memory grids"""
+    def __init__(self, grids, row_count):
+        self.grids, self.row_count = grids, row_count
+        self.calls = []
+
+    def spreadsheets(self):
+        return ns(get=self.get, values=lambda: ns(batchGet=self.batch_get, get=self.values_get))
+
+    def get(self, spreadsheetId, fields=None):
+        self.calls.append(("get", None))
+        props = [{"properties": {"title": t, "index": i, "gridProperties": {"rowCount": self.row_count}}}
+                 for i, t in enumerate(self.grids)]
+        return ns(execute=lambda: {"sheets": props})
+
+    def read(self, rng):
+        m = re.fullmatch(r"'(.+)'!(\d+):(\d+)", rng)
+        rows = self.grids[m.group(1).replace("''", "'")][int(m.group(2)) - 1:int(m.group(3))]
+        return {"range": rng, "majorDimension": "ROWS", **({"values": rows} if rows else {})}
+
+    def batch_get(self, spreadsheetId, ranges, majorDimension="ROWS"):
+        self.calls.append(("batchGet", list(ranges)))
+        return ns(execute=lambda: {"spreadsheetId": spreadsheetId, "valueRanges": [self.read(r) for r in ranges]})
+
+    def values_get(self, spreadsheetId, range):
+        self.calls.append(("get_values", range))
+        return ns(execute=lambda: {"values": self.grids[range]})
+
+@pytest.mark.asyncio
+async def test_row_windows_and_resync(monkeypatch):
+    db.connect()
+    uid = "sheets_user"
+    q.del_mem_by_user(uid)
+    monkeypatch.setattr(env, "sheets_batch_ranges", 2)
+    grids = {"Orders": sheet(1203, "orders"), "Bob's": sheet(40, "bob")}
+    svc = fake_sheets(grids, row_count=1300)
+    conn = google_sheets_connector(user_id=uid)
+    conn.service, conn._connected = svc, True
+    f = {"spreadsheet_id": "ss1", "window_rows": 500}
+
+    r = await conn.sync(**f)
+    # Orders: 3 windows (2-501, 502-1001, 1002-1204) in 2 batchGets; Bob's: 1 window, rows 2-41
+    batches = [c[1] for c in svc.calls if c[0] == "batchGet"]
+    assert batches[0] == ["'Orders'!1:1", "'Orders'!2:501", "'Orders'!502:1001"]
+    assert len(batches) == 2 + 2 and r["ingested"] == 4 and not r["failed"]
+    assert not [c for c in svc.calls if c[0] == "get_values"]  # fetch_item served the listed windows
+    ids = {i["id"]: i for i in await conn.list_items(**f)}
+    assert sorted(ids) == ["ss1!'Bob''s'!2:501", "ss1!'Orders'!1002:1300", "ss1!'Orders'!2:501", "ss1!'Orders'!502:1001"]
+    assert ids["ss1!'Orders'!1002:1300"]["last_row"] == 1204
+
+    first = r["items"]
+    root = q.get_mem(first["ss1!'Orders'!502:1001"][0])
+    assert root["content"].startswith("sku | name | notes") and "S00500" in root["content"]
+    assert "S00499" not in root["content"]
+
+    # notes rewritten in the second window: only that window is ingested again
+    svc.calls.clear()
+    for i, row in enumerate(sheet(200, "restock")[1:]):
+        grids["Orders"][600 + i][2] = "restocked " + row[2]
+    r = await conn.sync(**f)
+    assert list(r["items"]) == ["ss1!'Orders'!502:1001"] and r["skipped"] == 3
+    new = r["items"]["ss1!'Orders'!502:1001"]
+    # sections that did not change dedupe to the same memories; the rest are dropped
+    assert all(q.get_mem(m) is None for m in first["ss1!'Orders'!502:1001"] if m not in new)
+    assert all(q.get_mem(m) for m in new) and new != first["ss1!'Orders'!502:1001"]
+    assert any("restocked" in q.get_mem(m)["content"] for m in new)
+    assert conn._windows == {}
+
+    # a window fetched without a listing reads header + rows in one batchGet
+    svc.calls.clear()
+    w = await conn.fetch_item("ss1!'Orders'!2:501")
+    assert svc.calls == [("batchGet", ["'Orders'!1:1", "'Orders'!2:501"])]
+    assert w["meta"]["first_row"] == 2 and w["meta"]["row_count"] == 500 and w["type"] == "text"
+
+    # window_rows=0 keeps one document per sheet
+    items = await conn.list_items(spreadsheet_id="ss1", window_rows=0)
+    assert [i["id"] for i in items] == ["ss1!Orders", "ss1!Bob's"]
+    q.del_mem_by_user(uid)
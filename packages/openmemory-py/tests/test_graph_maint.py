@@ -0,0 +1,61 @@
+import pytest
+import time
+from openmemory.core.db import db, q
+from openmemory.memory.graph_maint import run_graph_maintenance
+from openmemory.memory.waypoint_graph import waypoint_graph
+
+# ==================================================================================
+# WAYPOINT GRAPH MAINTENANCE
+# ==================================================================================
+# One pass must drop self-loops and dangling edges, decay and prune weak edges,
+# cap out-degree and leave the in-memory graph consistent with the table.
+# ==================================================================================
+
+@pytest.mark.asyncio
+async def test_graph_maintenance_pass():
+    db.connect()
+    uid = "graph_maint_user"
+    q.del_mem_by_user(uid)
+    now = int(time.time() * 1000)
+    day = 86400000
+    for i in range(8):
+        q.ins_mem(id=f"gm-{i}", user_id=uid, content=f"graph maint {i}", primary_sector="semantic",
+                  created_at=now, updated_at=now, last_seen_at=now)
+    edges = [("gm-0", f"gm-{i}", 0.9 - 0.05 * i, now) for i in range(1, 8)]  # out-degree 7
+    edges += [("gm-1", "gm-1", 1.0, now),                   # self-loop
+              ("gm-2", "gm-missing", 0.9, now),             # dangling
+              ("gm-3", "gm-4", 0.06, now - 200 * day)]      # decays under the threshold
+    db.conn.executemany("INSERT INTO waypoints(src_id,dst_id,user_id,weight,created_at,updated_at) VALUES (?,?,?,?,?,?)",
+                        [(s, d, uid, w, t, t) for s, d, w, t in edges])
+
+    res = await run_graph_maintenance(now=now, max_degree=4)
+    assert res["self_loops"] >= 1 and res["orphans"] >= 1 and res["pruned"] >= 1
+    left = db.fetchall("SELECT src_id, dst_id FROM waypoints WHERE user_id=? ORDER BY weight DESC", (uid,))
+    assert [(r["src_id"], r["dst_id"]) for r in left] == [("gm-0", f"gm-{i}") for i in range(1, 5)]
+    assert res["max_out_degree"] <= 4
+
+    # the in-memory graph reloads from the maintained table
+    assert [n["target_id"] for n in waypoint_graph.neighbors("gm-0", uid)] == [f"gm-{i}" for i in range(1, 5)]
+    assert waypoint_graph.neighbors("gm-1", uid) == []
+    assert db.fetchone("SELECT metrics FROM stats ORDER BY id DESC LIMIT 1")["metrics"].startswith('{"type": "waypoint_maint"')
+    q.del_mem_by_user(uid)
+
+@pytest.mark.asyncio
+async def test_root_links_are_exempt():
+    db.connect()
+    uid = "graph_maint_root"
+    q.del_mem_by_user(uid)
+    now = int(time.time() * 1000)
+    old = now - 400 * 86400000
+    q.ins_mem(id="gr-root", user_id=uid, content="doc", primary_sector="semantic", meta='{"is_root": true}',
+              created_at=old, updated_at=old, last_seen_at=old)
+    for i in range(6):
+        q.ins_mem(id=f"gr-{i}", user_id=uid, content=f"section {i}", primary_sector="semantic", meta="{}",
+                  created_at=old, updated_at=old, last_seen_at=old)
+    db.conn.executemany("INSERT INTO waypoints(src_id,dst_id,user_id,weight,created_at,updated_at) VALUES (?,?,?,?,?,?)",
+                        [("gr-root", f"gr-{i}", uid, 1.0, old, old) for i in range(6)])
+
+    await run_graph_maintenance(now=now, max_degree=2)
+    left = db.fetchall("SELECT dst_id, weight FROM waypoints WHERE src_id='gr-root'")
+    assert len(left) == 6 and all(r["weight"] == 1.0 for r in left)
+    q.del_mem_by_user(uid)
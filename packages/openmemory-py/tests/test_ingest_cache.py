@@ -0,0 +1,53 @@
+import pytest
+from openmemory.core.db import db, q
+from openmemory.ops import ingest
+from openmemory.ops.ingest import ingest_document
+
+# ==================================================================================
+# INGEST CACHE
+# ==================================================================================
+# Re-ingesting unchanged bytes must resolve to the same memories without a parse
+# or an embed; deleted results and forced syncs go through the full pipeline.
+# ==================================================================================
+
+def count(uid):
+    return db.fetchone("SELECT count(*) AS c FROM memories WHERE user_id=?", (uid,))["c"]
+
+@pytest.mark.asyncio
+async def test_unchanged_document_is_skipped(monkeypatch):
+    db.connect()
+    uid = "ingest_cache_user"
+    q.del_mem_by_user(uid)
+    text = "\n\n".join(f"cached section {i} " + " ".join(f"w{i}x{j}" for j in range(80)) for i in range(12))
+    cfg = {"lg_thresh": 100, "sec_sz": 800}
+    first = await ingest_document("text/markdown", text, cfg=cfg, user_id=uid)
+    n = count(uid)
+    assert first["strategy"] == "root-child" and not first.get("cached")
+
+    def no_parse(*a, **k): raise AssertionError("extractor called for an unchanged document")
+    monkeypatch.setattr(ingest, "stream_text", no_parse)
+    again = await ingest_document("text/markdown", text.encode("utf-8"), cfg=cfg, user_id=uid)
+    assert again["cached"] and again["root_memory_id"] == first["root_memory_id"]
+    assert again["memory_ids"] == first["memory_ids"] and again["child_count"] == first["child_count"]
+    assert count(uid) == n
+    monkeypatch.undo()
+
+    # another content type is another document
+    other = await ingest_document("text/plain", text, cfg={**cfg, "force_root": True}, user_id=uid)
+    assert not other.get("cached")
+    # so are other sectioning options, meta or tags
+    for kw in ({"cfg": {**cfg, "sec_sz": 400}}, {"cfg": cfg, "meta": {"source": "x"}}, {"cfg": cfg, "tags": ["t"]}):
+        assert not (await ingest_document("text/markdown", text, user_id=uid, **kw)).get("cached")
+    assert (await ingest_document("text/markdown", text, cfg=cfg, user_id=uid))["cached"]
+
+    # a deleted section invalidates the entry as well
+    q.del_mem(first["memory_ids"][-1])
+    assert not (await ingest_document("text/markdown", text, cfg=cfg, user_id=uid)).get("cached")
+
+    # once the root is gone the cache entry no longer resolves
+    q.del_mem(first["root_memory_id"])
+    redo = await ingest_document("text/markdown", text, cfg={**cfg, "force": True}, user_id=uid)
+    assert not redo.get("cached") and redo["root_memory_id"] != first["root_memory_id"]
+    assert (await ingest_document("text/markdown", text, cfg=cfg, user_id=uid))["root_memory_id"] == redo["root_memory_id"]
+    q.del_mem_by_user(uid)
+    assert not db.fetchall("SELECT 1 FROM ingest_cache WHERE user_id=?", (uid,))
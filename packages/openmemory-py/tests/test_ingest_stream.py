@@ -0,0 +1,137 @@
+import pytest
+import io
+import json
+import random
+from pypdf import PdfWriter
+from openmemory.core.db import db, q
+from openmemory.ops.ingest import ingest_document, split_text, Sectioner
+from openmemory.ops.extract import stream_text
+
+# ==================================================================================
+# STREAMING INGESTION
+# ==================================================================================
+# Sections cut from a stream must match split_text on the whole document, and a
+# large document must land as root + linked children without being held whole.
+# ==================================================================================
+
+def doc(n_paras: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(2000)]
+    return "\n\n".join(" ".join(rng.choice(words) for _ in range(rng.randint(3, 60))) for _ in range(n_paras))
+
+def test_sectioner_matches_split_text():
+    rng = random.Random(1)
+    for seed in range(5):
+        text = doc(120, seed) + "\n\n\n\ntrailing"
+        sec = Sectioner(400)
+        out, i = [], 0
+        while i < len(text):
+            j = i + rng.randint(1, 700)  # pieces cut anywhere, even inside "\n\n"
+            out += sec.feed(text[i:j])
+            i = j
+        out += sec.close()
+        assert out == split_text(text, 400)
+
+@pytest.mark.asyncio
+async def test_streamed_root_child_ingest():
+    db.connect()
+    uid = "stream_ingest_user"
+    q.del_mem_by_user(uid)
+    text = doc(60)
+    cfg = {"lg_thresh": 100, "sec_sz": 500, "queue": 2, "concurrency": 3}
+    res = await ingest_document("text/plain", text, meta={"source": "stream-test"}, cfg=cfg, user_id=uid)
+    secs = split_text(text, 500)
+    assert res["strategy"] == "root-child"
+    assert res["child_count"] == len(secs)
+    assert res["extraction"]["char_count"] == len(text)
+
+    root = q.get_mem(res["root_memory_id"])
+    assert f"split across {len(secs)} sections" in root["content"]
+    assert json.loads(root["meta"])["char_count"] == len(text)
+    kids = db.fetchall("SELECT dst_id FROM waypoints WHERE src_id=?", (res["root_memory_id"],))
+    assert len(kids) == len(secs)
+    idx = sorted(json.loads(q.get_mem(k["dst_id"])["meta"])["section_index"] for k in kids)
+    assert idx == list(range(len(secs)))
+    meta = json.loads(q.get_mem(kids[0]["dst_id"])["meta"])
+    assert meta["total_sections"] == len(secs) and meta["is_child"] and not meta.get("is_root")
+    # one post-batch similarity pass links every child to its nearest neighbour
+    sim = db.fetchone(f"SELECT count(DISTINCT src_id) AS c FROM waypoints WHERE src_id IN ({','.join('?' * len(kids))})",
+                      tuple(k["dst_id"] for k in kids))
+    assert sim["c"] == len(secs)
+
+    small = await ingest_document("text/plain", "short note", cfg=cfg, user_id=uid)
+    assert small["strategy"] == "single"
+    q.del_mem_by_user(uid)
+
+@pytest.mark.asyncio
+async def test_no_transaction_open_while_embedding(monkeypatch):
+    import openmemory.memory.hsg as hsg
+    db.connect()
+    uid = "stream_ingest_tx"
+    q.del_mem_by_user(uid)
+    real = hsg.embed_multi_sector
+    seen = []
+    async def spy(*a, **kw):
+        seen.append(db.conn.in_transaction)
+        return await real(*a, **kw)
+    monkeypatch.setattr(hsg, "embed_multi_sector", spy)
+    res = await ingest_document("text/plain", doc(30, seed=3), cfg={"lg_thresh": 100, "sec_sz": 500}, user_id=uid)
+    assert res["child_count"] == len(seen) and not any(seen)
+    q.del_mem_by_user(uid)
+
+@pytest.mark.asyncio
+async def test_sections_are_written_in_bounded_batches(monkeypatch):
+    import openmemory.ops.ingest as ingest
+    db.connect()
+    uid = "stream_ingest_batch"
+    q.del_mem_by_user(uid)
+    real_prep, real_write = ingest.prepare_hsg_memory, ingest.write_hsg_memory
+    held, peak, order = [0], [0], []
+    async def prep(*a, **kw):
+        p = await real_prep(*a, **kw)
+        held[0] += 1
+        peak[0] = max(peak[0], held[0])
+        order.append("prep")
+        return p
+    def write(p):
+        held[0] -= 1
+        order.append("write")
+        return real_write(p)
+    monkeypatch.setattr(ingest, "prepare_hsg_memory", prep)
+    monkeypatch.setattr(ingest, "write_hsg_memory", write)
+    text = doc(80, seed=4)
+    res = await ingest_document("text/plain", text, cfg={"lg_thresh": 100, "sec_sz": 300, "batch": 4, "concurrency": 3}, user_id=uid)
+    assert res["child_count"] == len(split_text(text, 300)) > 12
+    # children are stored while later sections are still being embedded
+    assert peak[0] <= 4 and order.index("write") < len(order) - order[::-1].index("prep")
+    root = q.get_mem(res["root_memory_id"])
+    assert f"split across {res['child_count']} sections" in root["content"]
+    assert len(db.fetchall("SELECT dst_id FROM waypoints WHERE src_id=?", (res["root_memory_id"],))) == res["child_count"]
+    q.del_mem_by_user(uid)
+
+@pytest.mark.asyncio
+async def test_failed_ingest_removes_written_batches(monkeypatch):
+    import openmemory.ops.ingest as ingest
+    db.connect()
+    uid = "stream_ingest_fail"
+    q.del_mem_by_user(uid)
+    real = ingest.prepare_hsg_memory
+    async def prep(txt, tags, meta, user_id):
+        if meta["section_index"] == 9: raise RuntimeError("embedder down")
+        return await real(txt, tags, meta, user_id)
+    monkeypatch.setattr(ingest, "prepare_hsg_memory", prep)
+    with pytest.raises(RuntimeError, match="embedder down"):
+        await ingest_document("text/plain", doc(80, seed=5), cfg={"lg_thresh": 100, "sec_sz": 300, "batch": 2, "concurrency": 1}, user_id=uid)
+    assert not db.fetchone("SELECT 1 FROM memories WHERE user_id=?", (uid,))
+    assert not db.fetchone("SELECT 1 FROM waypoints WHERE user_id=?", (uid,))
+    q.del_mem_by_user(uid)
+
+@pytest.mark.asyncio
+async def test_pdf_pages_stream():
+    w = PdfWriter()
+    for _ in range(3): w.add_blank_page(width=200, height=200)
+    buf = io.BytesIO()
+    w.write(buf)
+    info = {}
+    pages = [p async for p in stream_text("application/pdf", buf.getvalue(), info)]
+    assert len(pages) == 3 and info["pages"] == 3 and info["content_type"] == "pdf"
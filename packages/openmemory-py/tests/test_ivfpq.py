@@ -0,0 +1,97 @@
+import pytest
+import numpy as np
+from openmemory.core.db import db
+from openmemory.core.config import env
+from openmemory.core.vector_store import SQLiteVectorStore
+from openmemory.core.vector.ivfpq import IVFPQIndex
+
+# ==================================================================================
+# IVF-PQ INDEX
+# ==================================================================================
+
+def clustered(n, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((20, dim))
+    return (centers[rng.integers(0, 20, n)] + 0.3 * rng.standard_normal((n, dim))).astype(np.float32)
+
+def test_ivfpq_recall_and_tombstones():
+    x = clustered(3000, 32)
+    ids = [f"v{i}" for i in range(len(x))]
+    idx = IVFPQIndex(32, m=8, nprobe=8)
+    idx.train(x)
+    idx.add(ids, x)
+    xn = x / np.linalg.norm(x, axis=1, keepdims=True)
+
+    rec = 0.0
+    for qi in range(0, 3000, 150):
+        truth = {f"v{i}" for i in np.argsort(-(xn @ xn[qi]))[:10]}
+        cand = [i for i, _ in idx.search(x[qi], 40)]
+        top = sorted(cand, key=lambda c: -float(xn[int(c[1:])] @ xn[qi]))[:10]
+        rec += len(truth & set(top)) / 10
+    assert rec / 20 >= 0.8
+
+    assert idx.search(x[5], 1)[0][0] == "v5"
+    idx.remove("v5")
+    assert "v5" not in [i for i, _ in idx.search(x[5], 10)]
+    # re-adding supersedes, without duplicating the entry in results
+    idx.add(["v6"], x[6:7])
+    hits = [i for i, _ in idx.search(x[6], 10)]
+    assert hits.count("v6") == 1
+    assert idx.ntotal == 2999 and idx.stale == 2
+
+@pytest.mark.asyncio
+async def test_store_uses_ivf_index(monkeypatch):
+    monkeypatch.setattr(env, "ivf_min_train", 500)
+    db.connect()
+    sector = "ivf_test"
+    db.execute("DELETE FROM vectors WHERE sector=?", (sector,))
+    x = clustered(800, 32, seed=3)
+    st = SQLiteVectorStore(index="ivfpq", rerank=8)
+    for i, v in enumerate(x):
+        await st.storeVector(f"iv{i}", sector, v.tolist(), 32, "u_a" if i % 2 else "u_b")
+
+    # the first search is served by the flat scan while the index trains off the loop
+    res = await st.search(x[10].tolist(), sector, 5, {"user_id": "u_b", "nprobe": 16})
+    assert res[0]["id"] == "iv10"
+    assert (sector, 32) not in st._ivf
+    # a write made while the build is in flight still reaches the index
+    await st.storeVector("during", sector, (x[12] * 3).tolist(), 32, "u_b")
+    await st.wait_indexes()
+    assert (sector, 32) in st._ivf
+    res = await st.search(x[12].tolist(), sector, 3, {"user_id": "u_b", "nprobe": 16})
+    assert res[0]["id"] == "during"
+    # writes after the build go straight into the index
+    await st.storeVector("fresh", sector, (x[11] * 3).tolist(), 32, "u_a")
+    await st.deleteVectors("iv11")
+    res = await st.search(x[11].tolist(), sector, 3, {"user_id": "u_a", "nprobe": 16})
+    assert res[0]["id"] == "fresh"
+    assert "iv11" not in [r["id"] for r in res]
+
+    st._ivf[(sector, 32)].added_since_train = 10_000
+    assert await st.retrain_indexes() == 1
+    assert st.index_stats()[f"{sector}/32"]["ntotal"] == 801
+    db.execute("DELETE FROM vectors WHERE sector=?", (sector,))
+    db.commit()
+
+@pytest.mark.asyncio
+async def test_small_sector_is_counted_once(monkeypatch):
+    monkeypatch.setattr(env, "ivf_min_train", 50)
+    db.connect()
+    sector = "ivf_small"
+    db.execute("DELETE FROM vectors WHERE sector=?", (sector,))
+    st = SQLiteVectorStore(index="ivfpq")
+    x = clustered(60, 16, seed=4)
+    for i, v in enumerate(x[:40]):
+        await st.storeVector(f"is{i}", sector, v.tolist(), 16, "u")
+    # rows of another dim in the same sector do not count towards the 16-dim index
+    for i in range(20):
+        await st.storeVector(f"is-wide{i}", sector, np.ones(24).tolist(), 24, "u")
+    await st.search(x[0].tolist(), sector, 3)
+    assert st._ivf_small[(sector, 16)] == 40 and not st._ivf_builds
+    for i, v in enumerate(x[40:], 40):
+        await st.storeVector(f"is{i}", sector, v.tolist(), 16, "u")
+    await st.search(x[0].tolist(), sector, 3)
+    await st.wait_indexes()
+    assert (sector, 16) in st._ivf
+    db.execute("DELETE FROM vectors WHERE sector=?", (sector,))
+    db.commit()
@@ -0,0 +1,83 @@
+import pytest
+import json
+import time
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from openmemory.ai.ollama import OllamaAdapter
+
+# ==================================================================================
+# OLLAMA BATCH EMBEDDINGS
+# ==================================================================================
+# Texts go to /api/embed in batches with bounded requests in flight; concurrent
+# single embeds are coalesced; servers without /api/embed get the legacy endpoint.
+# ==================================================================================
+
+class FakeOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    legacy = False
+    latency = 0.05
+    lock = threading.Lock()
+    requests = []
+    inflight = peak = 0
+
+    def reply(self, code, obj=None, text=None):
+        out = json.dumps(obj).encode() if obj is not None else text.encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json" if obj is not None else "text/plain")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = FakeOllama
+        with cls.lock:
+            cls.requests.append((self.path, len(body.get("input", [None]))))
+            cls.inflight += 1
+            cls.peak = max(cls.peak, cls.inflight)
+        time.sleep(cls.latency)
+        with cls.lock: cls.inflight -= 1
+        if self.path == "/api/embed":
+            if cls.legacy: return self.reply(404, text="404 page not found")
+            return self.reply(200, {"embeddings": [[float(len(t)), 1.0] for t in body["input"]]})
+        self.reply(200, {"embedding": [float(len(body["prompt"])), 1.0]})
+
+    def log_message(self, *a): pass
+
+@pytest.fixture
+def server():
+    FakeOllama.requests, FakeOllama.peak, FakeOllama.legacy = [], 0, False
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+
+@pytest.mark.asyncio
+async def test_batches_with_bounded_concurrency(server):
+    a = OllamaAdapter(base_url=server, batch_size=10, concurrency=2)
+    texts = ["x" * i for i in range(1, 51)]
+    res = await a.embed_batch(texts)
+    assert [r[0] for r in res] == [float(i) for i in range(1, 51)]
+    assert FakeOllama.requests == [("/api/embed", 10)] * 5
+    assert FakeOllama.peak == 2
+
+    # concurrent single embeds share requests
+    FakeOllama.requests = []
+    res = await asyncio.gather(*(a.embed("y" * i) for i in range(1, 26)))
+    assert [r[0] for r in res] == [float(i) for i in range(1, 26)]
+    assert len(FakeOllama.requests) == 3
+    await a.aclose()
+
+@pytest.mark.asyncio
+async def test_falls_back_to_legacy_endpoint(server):
+    FakeOllama.legacy = True
+    a = OllamaAdapter(base_url=server, batch_size=4, concurrency=1)
+    res = await a.embed_batch(["a", "bb", "ccc"])
+    assert [r[0] for r in res] == [1.0, 2.0, 3.0]
+    assert a.legacy is True
+    # the missing endpoint is only probed once
+    await a.embed_batch(["dddd"])
+    assert [p for p, _ in FakeOllama.requests].count("/api/embed") == 1
+    await a.aclose()
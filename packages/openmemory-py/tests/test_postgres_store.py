@@ -0,0 +1,134 @@
+import pytest
+import numpy as np
+from openmemory.core.vector.postgres import PostgresVectorStore, encode_vector, decode_vector
+
+# ==================================================================================
+# POSTGRES VECTOR STORE (recorded fake)
+# ==================================================================================
+# No live Postgres here: a fake pool records every statement so we can check
+# the SQL the store issues (composite key, index expressions, COPY ingest).
+# ==================================================================================
+
+class FakeTx:
+    async def __aenter__(self): return self
+    async def __aexit__(self, *a): return False
+
+class FakeConn:
+    def __init__(self, log):
+        self.log = log
+
+    async def execute(self, sql, *args):
+        self.log.append(("execute", " ".join(sql.split()), args))
+
+    async def fetch(self, sql, *args):
+        self.log.append(("fetch", " ".join(sql.split()), args))
+        return [{"id": "m1", "similarity": 0.9}]
+
+    async def fetchrow(self, sql, *args):
+        self.log.append(("fetchrow", " ".join(sql.split()), args))
+        return None
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.log.append(("copy", table, (records, columns)))
+
+    def transaction(self):
+        return FakeTx()
+
+class FakePool:
+    def __init__(self):
+        self.log = []
+        self.conn = FakeConn(self.log)
+
+    def acquire(self):
+        conn = self.conn
+        class _Acq:
+            async def __aenter__(self): return conn
+            async def __aexit__(self, *a): return False
+        return _Acq()
+
+def mk_store(**kw):
+    st = PostgresVectorStore("postgresql://fake", **kw)
+    st.pool = FakePool()
+    return st
+
+def test_vector_codec_roundtrip():
+    v = [0.25, -1.5, 3.0, 0.0]
+    buf = encode_vector(v)
+    assert len(buf) == 4 + 4 * len(v)
+    assert buf[:4] == b"\x00\x04\x00\x00"
+    assert decode_vector(buf) == v
+    assert decode_vector(encode_vector(np.arange(8, dtype=np.float32))) == list(range(8))
+
+@pytest.mark.asyncio
+async def test_store_upserts_on_composite_key_and_builds_sector_index():
+    st = mk_store()
+    await st.storeVector("m1", "semantic", [0.1, 0.2], 2, "u1")
+    await st.storeVector("m1", "episodic", [0.3, 0.4], 2, "u1")
+    sqls = [e[1] for e in st.pool.log if e[0] == "execute"]
+    assert all("ON CONFLICT (id, sector)" in s for s in sqls if s.startswith("INSERT"))
+    idx = [s for s in sqls if s.startswith("CREATE INDEX")]
+    assert len(idx) == 2
+    assert "USING hnsw ((v::vector(2)) vector_cosine_ops)" in idx[0]
+    assert "WHERE sector = 'semantic' AND dim = 2" in idx[0]
+    # index creation is memoised per (sector, dim)
+    await st.storeVector("m2", "semantic", [0.5, 0.6], 2, "u1")
+    assert len([e for e in st.pool.log if e[1].startswith("CREATE INDEX")]) == 2
+
+@pytest.mark.asyncio
+async def test_sector_index_predicate_is_the_stored_value():
+    st = mk_store()
+    await st.ensure_index("Work-Notes", 2)
+    await st.ensure_index("o'brien", 2)
+    await st.ensure_index("work_notes", 2)
+    idx = [e[1] for e in st.pool.log if e[1].startswith("CREATE INDEX")]
+    assert "WHERE sector = 'Work-Notes' AND dim = 2" in idx[0]
+    assert "WHERE sector = 'o''brien' AND dim = 2" in idx[1]
+    # the sanitized name only feeds the index name, which stays unique
+    names = [s.split()[5] for s in idx]
+    assert names[2] == "vectors_work_notes_2_hnsw"
+    assert len(set(names)) == 3 and all(n.startswith("vectors_") for n in names)
+
+@pytest.mark.asyncio
+async def test_store_many_uses_copy_and_dedups():
+    st = mk_store(index="ivfflat", ivf_lists=7)
+    n = await st.store_many([
+        ("a", "semantic", [1.0, 0.0], 2, "u"),
+        ("a", "semantic", [0.0, 1.0], 2, "u"),
+        ("b", "semantic", [1.0, 1.0], 2, "u"),
+    ])
+    assert n == 2
+    copies = [e for e in st.pool.log if e[0] == "copy"]
+    assert len(copies) == 1
+    records, columns = copies[0][2]
+    assert columns == ["id", "sector", "user_id", "v", "dim"]
+    assert ("a", "semantic", "u", [0.0, 1.0], 2) in records
+    merge = [e[1] for e in st.pool.log if e[1].startswith("INSERT INTO vectors")]
+    assert merge and "SELECT id, sector, user_id, v, dim FROM vectors_stage" in merge[0]
+    assert any("USING ivfflat" in e[1] and "lists = 7" in e[1] for e in st.pool.log)
+
+@pytest.mark.asyncio
+async def test_search_matches_index_expression():
+    st = mk_store()
+    res = await st.search([0.1, 0.2, 0.3], "semantic", 5, {"user_id": "u1", "ef_search": 200})
+    assert res == [{"id": "m1", "similarity": 0.9}]
+    fetch = [e for e in st.pool.log if e[0] == "fetch"][0]
+    assert "ORDER BY (v::vector(3)) <=> $1::vector(3)" in fetch[1]
+    assert "user_id=$4" in fetch[1] and "LIMIT 5" in fetch[1]
+    assert fetch[2] == ([0.1, 0.2, 0.3], "semantic", 3, "u1")
+    assert any(e[1] == "SET LOCAL hnsw.ef_search = 200" for e in st.pool.log)
+
+@pytest.mark.asyncio
+async def test_pool_init_registers_binary_codec():
+    st = mk_store(ef_search=80)
+    calls = []
+    class InitConn(FakeConn):
+        async def set_type_codec(self, name, **kw):
+            calls.append((name, kw["format"]))
+    conn = InitConn(st.pool.log)
+    await st._init_conn(conn)
+    assert calls == [("vector", "binary")]
+    assert st.pool.log[-1][1] == "SET hnsw.ef_search = 80"
+
+def test_rejects_unknown_index():
+    with pytest.raises(ValueError):
+        PostgresVectorStore("postgresql://fake", index="lsh")
@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+import json
+import time
+import numpy as np
+from openmemory.core.db import db, q, transaction
+from openmemory.core.config import env
+from openmemory.memory import reflect
+from openmemory.memory.reflect import run_reflection
+from openmemory.memory.compact_index import compact_index
+from openmemory.memory.waypoint_graph import waypoint_graph
+from openmemory.memory.user_summary import user_profiles
+from openmemory.utils.vectors import vec_to_buf
+
+# ==================================================================================
+# INCREMENTAL REFLECTION
+# ==================================================================================
+# Memories are clustered on mean_vec once; later runs only assign new memories
+# and a cluster is reflected as soon as it has company.
+# ==================================================================================
+
+def put(uid, mid, vec, now):
+    q.ins_mem(id=mid, user_id=uid, content=f"reflect note {mid}", primary_sector="semantic", meta="{}",
+              created_at=now, updated_at=now, last_seen_at=now, salience=0.5,
+              mean_dim=len(vec), mean_vec=vec_to_buf(vec))
+
+@pytest.mark.asyncio
+async def test_incremental_reflection(monkeypatch):
+    monkeypatch.setattr(env, "reflect_min", 1)
+    db.connect()
+    uid = "reflect_user"
+    q.del_mem_by_user(uid)
+    rng = np.random.default_rng(0)
+    a, b = rng.standard_normal(1536), rng.standard_normal(1536)
+    now = int(time.time() * 1000)
+    put(uid, "rf-a1", (a + 0.05 * rng.standard_normal(1536)).tolist(), now)
+    put(uid, "rf-b1", (b + 0.05 * rng.standard_normal(1536)).tolist(), now)
+
+    await run_reflection()
+    assert not db.fetchall("SELECT 1 FROM reflect_clusters WHERE user_id=? AND status='reflected'", (uid,))
+    assert db.fetchone("SELECT count(*) AS c FROM reflect_clusters WHERE user_id=? AND status='open'", (uid,))["c"] == 2
+
+    # a second member for `a` only: the next run assigns just that one and reflects its cluster
+    put(uid, "rf-a2", (a + 0.05 * rng.standard_normal(1536)).tolist(), now + 1)
+    res = await run_reflection()
+    assert res["assigned"] >= 1
+    done = db.fetchall("SELECT reflection_id FROM reflect_clusters WHERE user_id=? AND status='reflected'", (uid,))
+    assert len(done) == 1
+    refl = q.get_mem(done[0]["reflection_id"])
+    meta = json.loads(refl["meta"])
+    assert sorted(meta["sources"]) == ["rf-a1", "rf-a2"]
+    assert refl["primary_sector"] == "reflective"
+    for mid, cons in (("rf-a1", 1), ("rf-a2", 1), ("rf-b1", 0)):
+        assert q.get_mem(mid)["consolidated"] == cons
+    links = db.fetchall("SELECT src_id FROM reflection_links WHERE reflection_id=? ORDER BY src_id", (refl["id"],))
+    assert [r["src_id"] for r in links] == ["rf-a1", "rf-a2"]
+
+    # the unconsolidated scan is an index range scan, not a meta parse per row
+    plan = " ".join(str(tuple(r)) for r in db.fetchall(
+        "EXPLAIN QUERY PLAN SELECT m.id FROM memories m WHERE m.user_id=? AND m.primary_sector=? AND m.consolidated = 0", (uid, "semantic")))
+    assert "idx_memories_unconsolidated" in plan
+
+    res = await run_reflection()
+    assert res["assigned"] == 0 and res["created"] == 0
+    q.del_mem_by_user(uid)
+
+@pytest.mark.asyncio
+async def test_failed_consolidation_removes_the_reflection(monkeypatch):
+    monkeypatch.setattr(env, "reflect_min", 1)
+    db.connect()
+    uid = "reflect_rollback_user"
+    q.del_mem_by_user(uid)
+    compact_index.load()
+    waypoint_graph.load()
+    rng = np.random.default_rng(1)
+    a = rng.standard_normal(1536)
+    now = int(time.time() * 1000)
+    put(uid, "rfr-1", (a + 0.05 * rng.standard_normal(1536)).tolist(), now)
+    put(uid, "rfr-2", (a + 0.05 * rng.standard_normal(1536)).tolist(), now + 1)
+
+    made = []
+    async def add(*args, **kw):
+        r = await add_hsg_memory(*args, **kw)
+        made.append(r["id"])
+        # the reflection is mirrored before its consolidation marks are written
+        assert r["id"] in compact_index._row and waypoint_graph.owner.get(r["id"]) == uid
+        return r
+    def fail(*args):
+        raise RuntimeError("consolidation failed")
+    add_hsg_memory = reflect.add_hsg_memory
+    monkeypatch.setattr(reflect, "add_hsg_memory", add)
+    monkeypatch.setattr(reflect, "mark_consolidated", fail)
+    try:
+        with transaction():
+            reflect.assign_new(uid, "semantic", now)
+        c = db.fetchone("SELECT id, user_id, sector, n FROM reflect_clusters WHERE user_id=? AND n=2", (uid,))
+        with pytest.raises(RuntimeError):
+            await reflect.reflect_cluster(c)
+        assert len(made) == 1
+        rid = made[0]
+        assert q.get_mem(rid) is None
+        assert rid not in compact_index._row and rid not in waypoint_graph.owner
+        assert uid not in user_profiles.profiles
+        assert user_profiles.get(uid).events == 2
+        assert q.get_mem("rfr-1")["consolidated"] == 0
+    finally:
+        q.del_mem_by_user(uid)
+        db.execute("DELETE FROM reflect_clusters WHERE user_id=?", (uid,))
+
+# ==================================================================================
+# TRANSACTIONS
+# ==================================================================================
+# The connection is shared, so a transaction must not span an await: another task
+# joining it would be rolled back with it. In-memory mirrors apply only on commit.
+# ==================================================================================
+
+@pytest.mark.asyncio
+async def test_transaction_is_task_owned():
+    db.connect()
+    seen = []
+    with pytest.raises(ValueError):
+        with transaction():
+            db.after_commit(lambda: seen.append("rolled back"))
+            raise ValueError()
+    assert db.tx_depth == 0 and seen == []
+
+    with transaction():
+        with transaction():
+            db.after_commit(lambda: seen.append("nested"))
+        assert seen == []
+    assert db.tx_depth == 0 and seen == ["nested"]
+    db.after_commit(lambda: seen.append("now"))
+    assert seen == ["nested", "now"]
+
+    async def other():
+        with transaction():
+            pass
+
+    with transaction():
+        with pytest.raises(RuntimeError):
+            await asyncio.create_task(other())
+    assert db.tx_depth == 0 and db.tx_owner is None
+    # the depth never goes negative, so later blocks still BEGIN/COMMIT
+    with transaction():
+        assert db.conn.in_transaction
+    assert not db.conn.in_transaction
@@ -0,0 +1,82 @@
+import pytest
+import sqlite3
+from openmemory.core.db import db
+from openmemory.temporal_graph import insert_fact, batch_insert_facts, get_current_fact, query_facts_at_time, get_subject_timeline
+
+# ==================================================================================
+# TEMPORAL FACT STORE: BULK INSERT
+# ==================================================================================
+# A batch is staged and ordered per (subject, predicate) by valid_from, closes the
+# open intervals it supersedes with one UPDATE and lands in one transaction.
+# ==================================================================================
+
+def clear(prefix):
+    db.connect()
+    db.execute("DELETE FROM temporal_facts WHERE subject LIKE ?", (prefix + "%",))
+
+def intervals(subject, predicate):
+    rows = db.fetchall("SELECT object, valid_from, valid_to FROM temporal_facts WHERE subject=? AND predicate=? ORDER BY valid_from, object",
+                       (subject, predicate))
+    return [(r["object"], r["valid_from"], r["valid_to"]) for r in rows]
+
+@pytest.mark.asyncio
+async def test_batch_orders_each_key_by_valid_from():
+    clear("tbulk:")
+    try:
+        facts = [
+            {"subject": "tbulk:alice", "predicate": "works_at", "object": "Initech", "valid_from": 3000},
+            {"subject": "tbulk:alice", "predicate": "works_at", "object": "Acme", "valid_from": 1000},
+            {"subject": "tbulk:bob", "predicate": "lives_in", "object": "Oslo", "valid_from": 500, "user_id": "u1"},
+            {"subject": "tbulk:alice", "predicate": "works_at", "object": "Globex", "valid_from": 2000},
+            {"subject": "tbulk:alice", "predicate": "works_at", "object": "Hooli", "valid_from": 3000},
+        ]
+        ids = await batch_insert_facts(facts)
+        assert len(ids) == 5 and len(set(ids)) == 5
+        # list position does not matter; equal valid_from stay open side by side
+        assert intervals("tbulk:alice", "works_at") == [
+            ("Acme", 1000, 1999), ("Globex", 2000, 2999), ("Hooli", 3000, None), ("Initech", 3000, None)]
+        bob = await get_current_fact("tbulk:bob", "lives_in")
+        assert bob["id"] == ids[2] and bob["metadata"] == {"user_id": "u1"} and bob["last_updated"]
+        assert [f["object"] for f in await query_facts_at_time("tbulk:alice", "works_at", at=2500)] == ["Globex"]
+
+        # stored open facts are closed by later facts, and close earlier ones
+        await batch_insert_facts([
+            {"subject": "tbulk:alice", "predicate": "works_at", "object": "Umbrella", "valid_from": 5000},
+            {"subject": "tbulk:bob", "predicate": "lives_in", "object": "Bergen", "valid_from": 100},
+        ])
+        assert intervals("tbulk:alice", "works_at")[2:] == [
+            ("Hooli", 3000, 4999), ("Initech", 3000, 4999), ("Umbrella", 5000, None)]
+        assert intervals("tbulk:bob", "lives_in") == [("Bergen", 100, 499), ("Oslo", 500, None)]
+        timeline = await get_subject_timeline("tbulk:bob")
+        assert [(e["object"], e["change_type"]) for e in timeline] == [("Bergen", "created"), ("Bergen", "invalidated"), ("Oslo", "created")]
+    finally:
+        clear("tbulk:")
+
+@pytest.mark.asyncio
+async def test_insert_fact_and_batch_atomicity():
+    clear("tsingle:")
+    try:
+        await insert_fact("tsingle:x", "status", "draft", valid_from=10)
+        await insert_fact("tsingle:x", "status", "review", valid_from=20)
+        await insert_fact("tsingle:x", "status", "done", valid_from=30, metadata={"by": "ci"}, user_id="u2")
+        assert intervals("tsingle:x", "status") == [("draft", 10, 19), ("review", 20, 29), ("done", 30, None)]
+        assert (await get_current_fact("tsingle:x", "status"))["metadata"] == {"by": "ci", "user_id": "u2"}
+
+        # a bad row rolls back the whole batch, closing update included
+        with pytest.raises(sqlite3.IntegrityError):
+            await batch_insert_facts([
+                {"subject": "tsingle:x", "predicate": "status", "object": "archived", "valid_from": 40},
+                {"subject": "tsingle:y", "predicate": "status", "object": None, "valid_from": 40},
+            ])
+        assert intervals("tsingle:x", "status")[-1] == ("done", 30, None)
+        assert not db.fetchone("SELECT 1 FROM temporal_facts WHERE subject='tsingle:y'")
+        assert await batch_insert_facts([]) == []
+    finally:
+        clear("tsingle:")
+
+@pytest.mark.asyncio
+async def test_old_sqlite_is_refused(monkeypatch):
+    monkeypatch.setattr(sqlite3, "sqlite_version_info", (3, 31, 1))
+    with pytest.raises(RuntimeError, match="SQLite >= 3.33"):
+        await insert_fact("tsqlite:x", "status", "draft", valid_from=10)
+    assert db.tx_depth == 0
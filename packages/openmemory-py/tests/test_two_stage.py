@@ -0,0 +1,44 @@
+import pytest
+import numpy as np
+from openmemory.client import Memory
+from openmemory.core.vector_store import vector_store as store
+from openmemory.memory.hsg import compress_vec_for_storage, embed_query_for_all_sectors, two_stage_search
+from openmemory.memory.compact_index import compact, compact_index
+
+# ==================================================================================
+# TWO-STAGE RETRIEVAL
+# ==================================================================================
+# The compact first stage must reproduce compressed_vec, and with a shortlist
+# covering every memory the second stage must rank exactly like the full scan.
+# ==================================================================================
+
+def test_compact_matches_storage_compression():
+    v = np.random.default_rng(0).standard_normal(1536).tolist()
+    assert np.allclose(compact(v), compress_vec_for_storage(v, 128), atol=1e-5)
+
+@pytest.mark.asyncio
+async def test_two_stage_matches_full_scan():
+    mem = Memory()
+    uid = "two_stage_user"
+    await mem.delete_all(user_id=uid)
+    topics = ["python asyncio event loop", "sourdough bread baking", "mountain hiking trail",
+              "sqlite write ahead log", "jazz piano chords", "garden tomato plants"]
+    for i in range(30):
+        await mem.add(f"{topics[i % len(topics)]} note {i}", user_id=uid)
+
+    sectors = ["semantic", "episodic"]
+    qe = await embed_query_for_all_sectors("baking sourdough bread at home", sectors)
+    got = await two_stage_search(qe, sectors, 5, uid, shortlist=1000)
+    for s in sectors:
+        want = await store.search(qe[s], s, 100, {"user_id": uid})
+        # synthetic embeddings tie a lot; equal scores may come back in any order
+        assert [r["similarity"] for r in got[s]] == pytest.approx([r["similarity"] for r in want[:5]])
+        sims = {r["id"]: r["similarity"] for r in want}
+        assert all(sims[r["id"]] == pytest.approx(r["similarity"]) for r in got[s])
+
+    hits = await mem.search("baking sourdough bread at home", user_id=uid, limit=3, two_stage=True)
+    assert hits and "sourdough" in hits[0]["content"]
+
+    await mem.delete_all(user_id=uid)
+    assert await two_stage_search(qe, sectors, 5, uid) == {s: [] for s in sectors}
+    assert compact_index.stats()["loaded"]
@@ -0,0 +1,59 @@
+import pytest
+import json
+import time
+from openmemory.core.db import db, q
+from openmemory.memory.user_summary import UserProfiles, Profile, gen_user_summary_async, _fold
+
+# ==================================================================================
+# INCREMENTAL USER SUMMARIES
+# ==================================================================================
+# The running profile fed one insert at a time must render exactly what a full
+# recompute over the user's memories renders, before and after a reload.
+# ==================================================================================
+
+@pytest.mark.asyncio
+async def test_incremental_profile_equals_recompute():
+    db.connect()
+    uid = "summary_user"
+    q.del_mem_by_user(uid)
+    db.execute("DELETE FROM users WHERE user_id=?", (uid,))
+    profiles = UserProfiles()
+    now = int(time.time() * 1000)
+    metas = [
+        {"ide_project_name": "alpha", "language": "python", "ide_file_path": "src\\app\\main.py", "ide_event_type": "save"},
+        {"ide_project_name": "beta", "language": "go", "ide_file_path": "/srv/cmd/server.go"},
+        {"ide_project_name": "alpha", "language": "python", "ide_file_path": "src/app/util.py", "ide_event_type": "save"},
+        {},
+        {"language": "rust", "ide_file_path": "lib.rs"},
+    ]
+    for i, meta in enumerate(metas):
+        mid = f"us-{i}"
+        q.ins_mem(id=mid, user_id=uid, content=f"summary note {i}", primary_sector="semantic",
+                  meta=json.dumps(meta), created_at=now + i, updated_at=now + i, last_seen_at=now + i)
+        profiles.observe(uid, mid, meta, now + i)
+        profiles.observe(uid, mid, meta, now + i)  # replays are ignored
+
+    full = _fold(Profile(), uid)
+    inc = profiles.get(uid)
+    assert inc.to_json() == full.to_json()
+    assert inc.render() == await gen_user_summary_async(uid)
+    assert "alpha, beta" in inc.render() and "(5 memories, 2 saves)" in inc.render()
+
+    # persisted aggregates plus catch-up on rows written behind the aggregator's back
+    assert await profiles.flush() == 1
+    q.ins_mem(id="us-late", user_id=uid, content="late", primary_sector="semantic",
+              meta=json.dumps({"ide_project_name": "gamma"}), created_at=now + 10, updated_at=now + 10, last_seen_at=now + 10)
+    reloaded = UserProfiles().get(uid)
+    assert reloaded.to_json() == _fold(Profile(), uid).to_json()
+    assert reloaded.events == 6
+
+    # deletes rebuild the profile from the table
+    q.del_mem("us-1")
+    profiles.invalidate(uid)
+    await profiles.flush()
+    row = db.fetchone("SELECT summary FROM users WHERE user_id=?", (uid,))
+    assert row["summary"] == await gen_user_summary_async(uid)
+    assert "beta" not in row["summary"]
+    q.del_mem_by_user(uid)
+    db.execute("DELETE FROM users WHERE user_id=?", (uid,))
+    db.commit()
@@ -0,0 +1,50 @@
+import pytest
+import numpy as np
+from openmemory.core.db import db
+from openmemory.core.vector_store import SQLiteVectorStore
+from openmemory.utils.quant import quantize, decode_matrix, approx_scores, cosine_scores
+
+# ==================================================================================
+# QUANTIZED VECTOR STORAGE
+# ==================================================================================
+# int8 / float16 first-pass codes must stay close to float32 cosine and the
+# re-ranked search must recover the exact top-k.
+# ==================================================================================
+
+def test_codes_approximate_cosine():
+    rng = np.random.default_rng(0)
+    q = rng.standard_normal(256)
+    vs = rng.standard_normal((64, 256)).astype(np.float32)
+    exact = cosine_scores(q, vs)
+    for mode in ("int8", "float16"):
+        enc = [quantize(v, mode) for v in vs]
+        codes = decode_matrix([e[0] for e in enc], mode, 256)
+        approx = approx_scores(q, codes, np.array([e[1] for e in enc], dtype=np.float32), mode)
+        assert np.max(np.abs(approx - exact)) < 0.02
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["int8", "float16"])
+async def test_quantized_search_matches_float32(mode):
+    db.connect()
+    uid = f"quant_user_{mode}"
+    db.execute("DELETE FROM vectors WHERE user_id=?", (uid,))
+    rng = np.random.default_rng(1)
+    st = SQLiteVectorStore(quant=mode, rerank=4)
+    base = SQLiteVectorStore(quant="none")
+    vecs = rng.standard_normal((300, 64)).astype(np.float32)
+    for i, v in enumerate(vecs):
+        await st.storeVector(f"{uid}-{i}", "semantic", v.tolist(), 64, uid)
+
+    for qi in range(5):
+        qv = rng.standard_normal(64).tolist()
+        got = await st.search(qv, "semantic", 10, {"user_id": uid})
+        want = await base.search(qv, "semantic", 10, {"user_id": uid})
+        assert [r["id"] for r in got] == [r["id"] for r in want]
+        assert got[0]["similarity"] == pytest.approx(want[0]["similarity"])
+
+    rep = await st.quant_report("semantic", k=10, sample=10, user_id=uid)
+    assert rep["vectors"] == 300
+    assert rep["savings"] >= (0.7 if mode == "int8" else 0.45)
+    assert rep["recall"] == 1.0
+    db.execute("DELETE FROM vectors WHERE user_id=?", (uid,))
+    db.commit()
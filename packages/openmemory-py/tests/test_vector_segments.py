@@ -0,0 +1,159 @@
+import pytest
+import numpy as np
+from openmemory.core.db import db
+from openmemory.core.vector_store import SQLiteVectorStore
+from openmemory.core.vector.segments import SegmentStore
+
+# ==================================================================================
+# MEMORY-MAPPED VECTOR SEGMENTS
+# ==================================================================================
+# The segment scan must rank exactly like the table scan, survive a reopen and
+# keep results stable across deletes, updates and compaction.
+# ==================================================================================
+
+@pytest.mark.asyncio
+async def test_segment_search_matches_table(tmp_path):
+    db.connect()
+    uid = "seg_user"
+    db.execute("DELETE FROM vectors WHERE user_id=?", (uid,))
+    rng = np.random.default_rng(7)
+    st = SQLiteVectorStore(storage="segments", segment_dir=str(tmp_path / "vec"))
+    base = SQLiteVectorStore(storage="sqlite")
+    vecs = rng.standard_normal((200, 48)).astype(np.float32)
+    for i, v in enumerate(vecs):
+        await st.storeVector(f"{uid}-{i}", "semantic", v.tolist(), 48, uid)
+
+    qv = rng.standard_normal(48).tolist()
+    got = await st.search(qv, "semantic", 10, {"user_id": uid})
+    want = await base.search(qv, "semantic", 10, {"user_id": uid})
+    assert [r["id"] for r in got] == [r["id"] for r in want]
+    assert got[0]["similarity"] == pytest.approx(want[0]["similarity"], abs=1e-5)
+
+    # update + delete tombstone the old rows
+    await st.storeVector(f"{uid}-0", "semantic", qv, 48, uid)
+    await st.deleteVectors(f"{uid}-1")
+    got = await st.search(qv, "semantic", 200, {"user_id": uid})
+    ids = [r["id"] for r in got]
+    assert ids[0] == f"{uid}-0" and ids.count(f"{uid}-0") == 1
+    assert f"{uid}-1" not in ids and len(ids) == 199
+
+    # reopening reads the files, not the table
+    reopened = SegmentStore(str(tmp_path / "vec"))
+    assert not reopened.fresh
+    assert [i for i, _ in reopened.search(qv, "semantic", 5, uid)] == ids[:5]
+
+    assert st.compact_segments(ratio=0.0) >= 1
+    assert all(s["rows"] == s["live"] for s in st.segment_stats().values())
+    after = await st.search(qv, "semantic", 200, {"user_id": uid})
+    assert [r["id"] for r in after] == ids
+    db.execute("DELETE FROM vectors WHERE user_id=?", (uid,))
+    db.commit()
+
+@pytest.mark.asyncio
+async def test_segments_backfill_from_table(tmp_path):
+    db.connect()
+    uid = "seg_backfill"
+    db.execute("DELETE FROM vectors WHERE user_id=?", (uid,))
+    plain = SQLiteVectorStore(storage="sqlite")
+    rng = np.random.default_rng(8)
+    for i in range(30):
+        await plain.storeVector(f"{uid}-{i}", "episodic", rng.standard_normal(16).tolist(), 16, uid)
+
+    st = SQLiteVectorStore(storage="segments", segment_dir=str(tmp_path / "vec"))
+    res = await st.search(rng.standard_normal(16).tolist(), "episodic", 30, {"user_id": uid})
+    assert len(res) == 30
+    db.execute("DELETE FROM vectors WHERE user_id=?", (uid,))
+    db.commit()
+
+@pytest.mark.asyncio
+async def test_memory_delete_tombstones_segments(tmp_path, monkeypatch):
+    import openmemory.main as main
+    import openmemory.memory.hsg as hsg
+    from openmemory.core.db import q
+    db.connect()
+    uid = "seg_delete"
+    q.del_mem_by_user(uid)
+    st = SQLiteVectorStore(storage="segments", segment_dir=str(tmp_path / "vec"))
+    monkeypatch.setattr(main, "vector_store", st)
+    # single deletes go through the shared helper's store
+    monkeypatch.setattr(hsg, "store", st)
+    rng = np.random.default_rng(9)
+    vecs = rng.standard_normal((5, 32)).astype(np.float32)
+    for i, v in enumerate(vecs):
+        q.ins_mem(id=f"{uid}-{i}", user_id=uid, content=f"note {i}", primary_sector="semantic", meta="{}",
+                  created_at=i, updated_at=i, last_seen_at=i, salience=0.5)
+        await st.storeVector(f"{uid}-{i}", "semantic", v.tolist(), 32, uid)
+
+    live = lambda: sum(s["live"] for s in st.segment_stats().values())
+    before = live()
+    mem = main.Memory()
+    await mem.delete(f"{uid}-0")
+    ids = [r["id"] for r in await st.search(vecs[0].tolist(), "semantic", 5, {"user_id": uid})]
+    assert f"{uid}-0" not in ids and len(ids) == 4
+
+    await mem.delete_all(uid)
+    assert await st.search(vecs[1].tolist(), "semantic", 5, {"user_id": uid}) == []
+    assert live() == before - 5
+
+# a child process that commits and is killed before it mirrors the write
+CRASH_CHILD = """
+import os, sys, asyncio, json
+from openmemory.core.db import db
+from openmemory.core.vector_store import SQLiteVectorStore
+db.connect()
+op, seg_dir, uid, vec = sys.argv[1], sys.argv[2], sys.argv[3], json.loads(sys.argv[4])
+st = SQLiteVectorStore(storage="segments", segment_dir=seg_dir)
+SQLiteVectorStore._mirror_add = SQLiteVectorStore._mirror_remove = lambda *a: os._exit(9)
+if op == "put": asyncio.run(st.storeVector(uid + "-new", "semantic", vec, 32, uid))
+else: asyncio.run(st.deleteVectors(uid + "-0"))
+"""
+
+@pytest.mark.asyncio
+async def test_segments_resync_after_crash_between_commit_and_mirror(tmp_path):
+    import sys, json, subprocess
+    db.connect()
+    uid = "seg_crash"
+    db.execute("DELETE FROM vectors WHERE user_id=?", (uid,))
+    db.commit()
+    seg_dir = str(tmp_path / "vec")
+    st = SQLiteVectorStore(storage="segments", segment_dir=seg_dir)
+    rng = np.random.default_rng(10)
+    for i in range(10):
+        await st.storeVector(f"{uid}-{i}", "semantic", rng.standard_normal(32).tolist(), 32, uid)
+    qv = rng.standard_normal(32).tolist()
+    ids = lambda res: {r["id"] for r in res}
+    assert len(await st.search(qv, "semantic", 20, {"user_id": uid})) == 10
+
+    try:
+        for op in ("put", "delete"):
+            child = subprocess.run([sys.executable, "-c", CRASH_CHILD, op, seg_dir, uid, json.dumps(qv)], capture_output=True, text=True)
+            assert child.returncode == 9, child.stderr
+        # the table has the new row and lost the deleted one; the files never heard of either
+        got = ids(await st.search(qv, "semantic", 20, {"user_id": uid}))
+        assert f"{uid}-new" in got and f"{uid}-0" not in got and len(got) == 10
+        reopened = SQLiteVectorStore(storage="segments", segment_dir=seg_dir)
+        assert ids(await reopened.search(qv, "semantic", 20, {"user_id": uid})) == got
+    finally:
+        db.execute("DELETE FROM vectors WHERE user_id=?", (uid,))
+        db.commit()
+
+@pytest.mark.asyncio
+async def test_segments_without_rowids_are_rebuilt(tmp_path):
+    db.connect()
+    uid = "seg_oldfmt"
+    db.execute("DELETE FROM vectors WHERE user_id=?", (uid,))
+    seg_dir = tmp_path / "vec"
+    st = SQLiteVectorStore(storage="segments", segment_dir=str(seg_dir))
+    rng = np.random.default_rng(11)
+    for i in range(5):
+        await st.storeVector(f"{uid}-{i}", "semantic", rng.standard_normal(8).tolist(), 8, uid)
+    # files from before the third .ids column
+    for p in seg_dir.glob("*/*.ids"):
+        p.write_text("".join(line.rsplit("\t", 1)[0] + "\n" for line in p.read_text().splitlines()))
+    reopened = SQLiteVectorStore(storage="segments", segment_dir=str(seg_dir))
+    try:
+        assert len(await reopened.search(rng.standard_normal(8).tolist(), "semantic", 10, {"user_id": uid})) == 5
+        assert reopened._seg.watermark() == reopened._table_watermark()
+    finally:
+        db.execute("DELETE FROM vectors WHERE user_id=?", (uid,))
+        db.commit()
@@ -0,0 +1,125 @@
+import pytest
+import time
+import numpy as np
+from openmemory.core.db import db, q
+from openmemory.memory.waypoint_graph import WaypointGraph
+
+# ==================================================================================
+# IN-MEMORY WAYPOINT GRAPH
+# ==================================================================================
+# The CSR graph must expand exactly like the SQL BFS it replaces and stay in
+# sync with edge writes and node deletes.
+# ==================================================================================
+
+def sql_expand(ids, max_exp):
+    # reference: the per-node SQL walk expand_via_waypoints used to do
+    exp, vis, frontier = [], set(ids), [{"id": i, "weight": 1.0, "path": [i]} for i in ids]
+    while frontier and len(exp) < max_exp:
+        cur = frontier.pop(0)
+        for n in db.fetchall("SELECT dst_id, weight FROM waypoints WHERE src_id=? ORDER BY weight DESC", (cur["id"],)):
+            if n["dst_id"] in vis: continue
+            w = cur["weight"] * min(1.0, max(0.0, float(n["weight"]))) * 0.8
+            if w < 0.1: continue
+            item = {"id": n["dst_id"], "weight": w, "path": cur["path"] + [n["dst_id"]]}
+            exp.append(item)
+            vis.add(n["dst_id"])
+            frontier.append(item)
+    return exp
+
+def test_csr_expand_matches_sql():
+    db.connect()
+    uid = "wp_graph_user"
+    db.execute("DELETE FROM waypoints WHERE user_id=?", (uid,))
+    ts = int(time.time() * 1000)
+    # a small tree with distinct weights so the visit order is unambiguous
+    edges = [("a", "b", 0.9), ("a", "c", 0.7), ("b", "d", 0.95), ("c", "e", 0.6), ("d", "f", 0.85), ("e", "a", 0.5)]
+    db.conn.executemany("INSERT INTO waypoints(src_id,dst_id,user_id,weight,created_at,updated_at) VALUES (?,?,?,?,?,?)",
+                        [(f"wp-{s}", f"wp-{d}", uid, w, ts, ts) for s, d, w in edges])
+    g = WaypointGraph()
+    got = g.expand(["wp-a"], 10, uid)
+    assert got == sql_expand(["wp-a"], 10)
+    assert [e["id"] for e in got] == ["wp-b", "wp-c", "wp-d", "wp-e", "wp-f"]
+
+    # writes after load land in the overlay and win over the CSR entry
+    g.add_edge("wp-a", "wp-c", uid, 0.99)
+    assert g.neighbors("wp-a", uid)[0] == {"target_id": "wp-c", "weight": pytest.approx(0.99)}
+    g.remove_node("wp-d")
+    assert "wp-d" not in [e["id"] for e in g.expand(["wp-a"], 10, uid)]
+    g.graph(uid).compact()
+    assert [n["target_id"] for n in g.neighbors("wp-b", uid)] == []
+    assert g.stats()["edges"] >= 4
+    db.execute("DELETE FROM waypoints WHERE user_id=?", (uid,))
+    db.commit()
+
+def test_ppr_activation():
+    g = WaypointGraph()
+    g.loaded = True  # build in memory only
+    rng = np.random.default_rng(0)
+    n = 40
+    for _ in range(150):
+        s, d = rng.integers(0, n, 2)
+        if s != d: g.add_edge(f"p{s}", f"p{d}", "ppr_user", float(rng.uniform(0.1, 1.0)))
+    sub = g.graph("ppr_user")
+    x = sub.ppr({sub.index["p0"]: 1.0}, alpha=0.15, tol=1e-12, max_iter=500)
+
+    # dense reference, dangling mass restarts at the seed
+    P = np.zeros((sub.nodes, sub.nodes))
+    for i in range(sub.nodes):
+        idx, w = sub.neighbors(i)
+        if w.sum() > 0: P[i, idx] = w / w.sum()
+    s = np.zeros(sub.nodes); s[sub.index["p0"]] = 1.0
+    ref = s.copy()
+    for _ in range(500):
+        ref = 0.15 * s + 0.85 * (P.T @ ref + ref[P.sum(1) == 0].sum() * s)
+    assert np.allclose(x, ref, atol=1e-8)
+    assert abs(x.sum() - 1.0) < 1e-9
+
+    exp = g.activate({"p0": 0.9}, 5, "ppr_user")
+    assert exp[0]["id"] == "p0" and len(exp) == 6
+    assert all(0 < e["weight"] <= 1.0 for e in exp)
+
+    # reached nodes carry the chain of heaviest-flow edges back to a seed
+    sub = g.graph("ppr_user")
+    for e in exp[1:]:
+        assert e["path"][0] == "p0" and e["path"][-1] == e["id"] and len(e["path"]) > 1
+        for a, b in zip(e["path"], e["path"][1:]):
+            assert b in [n["target_id"] for n in g.neighbors(a, "ppr_user")]
+
+@pytest.mark.asyncio
+async def test_ppr_expansion_reinforces_like_bfs(monkeypatch):
+    import openmemory.memory.hsg as hsg
+    db.connect()
+    uid = "ppr_reinforce_user"
+    q.del_mem_by_user(uid)
+    now = int(time.time() * 1000)
+    for m in ("a", "b", "c"):
+        q.ins_mem(id=f"pr-{m}", user_id=uid, content=f"reinforce note {m}", primary_sector="semantic", meta="{}",
+                  created_at=now, updated_at=now, last_seen_at=now, salience=0.3)
+    g = WaypointGraph()
+    g.loaded = True
+    g.add_edge("pr-a", "pr-b", uid, 0.9)
+    g.add_edge("pr-b", "pr-c", uid, 0.9)
+
+    class Hits:
+        # one weak vector hit, so the query expands over the graph
+        async def search(self, v, sector, k, f=None):
+            return [{"id": "pr-a", "similarity": 0.3}]
+        async def getVectorsById(self, id):
+            return []
+    propagated = {}
+    async def propagate(sid, ssal, wps):
+        propagated.setdefault(mode, set()).add(sid)
+        return []
+    monkeypatch.setattr(hsg, "store", Hits())
+    monkeypatch.setattr(hsg, "waypoint_graph", g)
+    monkeypatch.setattr(hsg, "propagateAssociativeReinforcementToLinkedNodes", propagate)
+    try:
+        res = {}
+        for mode in ("bfs", "ppr"):
+            top = await hsg.hsg_query(f"reinforce {mode}", 5, {"user_id": uid, "sectors": ["semantic"], "two_stage": False, "expansion": mode})
+            res[mode] = {r["id"]: r["path"] for r in top}
+        assert res["ppr"]["pr-b"] == res["bfs"]["pr-b"] == ["pr-a", "pr-b"]
+        assert res["ppr"]["pr-c"] == res["bfs"]["pr-c"] == ["pr-a", "pr-b", "pr-c"]
+        assert propagated["ppr"] == propagated["bfs"] == {"pr-b", "pr-c"}
+    finally:
+        q.del_mem_by_user(uid)
@@ -0,0 +1,131 @@
+import pytest
+import time
+import random
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from openmemory.core.db import db, q
+from openmemory.connectors.web_crawler import web_crawler_connector, normalize_url
+
+# ==================================================================================
+# WEB CRAWLER FRONTIER
+# ==================================================================================
+# The crawl fetches pages concurrently within per-host limits, visits every
+# normalized url once and hands its parsed pages to ingest without a second fetch.
+# ==================================================================================
+
+def words(seed):
+    rng = random.Random(seed)
+    return " ".join("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(7)) for _ in range(30))
+
+def page(title, links, body):
+    a = "".join(f'<a href="{h}">{h}</a>' for h in links)
+    return (f"<html><head><title>{title}</title><script>var secret = 1;</script></head>"
+            f"<body><nav>{a}</nav><main><p>{body}</p></main><footer>footer text</footer></body></html>")
+
+class FakeSite(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+    lock = threading.Lock()
+    hits = Counter()
+    starts = []
+    inflight = peak = 0
+    pages = {}
+
+    def do_GET(self):
+        cls = FakeSite
+        with cls.lock:
+            cls.hits[self.path] += 1
+            cls.starts.append(time.monotonic())
+            cls.inflight += 1
+            cls.peak = max(cls.peak, cls.inflight)
+        try:
+            time.sleep(cls.latency)
+            path = self.path.split("#")[0]
+            if path == "/doc.pdf":
+                status, ctype, out = 200, "application/pdf", b"%PDF-1.4"
+            elif path in cls.pages:
+                status, ctype, out = 200, "text/html; charset=utf-8", cls.pages[path].encode()
+            else:
+                status, ctype, out = 404, "text/html", b"not found"
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+        finally:
+            with cls.lock:
+                cls.inflight -= 1
+
+    def log_message(self, *a): pass
+
+def serve():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), FakeSite)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_port}"
+    FakeSite.pages = {
+        # the same page spelled six ways, an off-site link, a pdf, a 404 and a mailto
+        "/": page("Home", ["/a", "/a#top", "/a?utm_source=feed", "/b/../a", f"HTTP://127.0.0.1:{srv.server_port}/c",
+                           "/./b/", "http://example.invalid/x", "/doc.pdf", "/missing", "mailto:x@y.z"], words("home")),
+        "/a": page("Alpha", ["/", "/d", "/e?b=2&a=1", "/e?a=1&b=2"], "alpha " + words("a")),
+        "/b/": page("Beta", ["f"], words("b")),
+        "/c": page("Gamma", ["/"], words("c")),
+        "/d": page("Delta", [], words("d")),
+        "/e?a=1&b=2": page("Epsilon", [], words("e")),
+        "/b/f": page("Zeta", ["/g"], words("f")),
+        "/g": page("Eta", ["/too-deep"], words("g")),
+    }
+    FakeSite.hits.clear()
+    FakeSite.starts.clear()
+    FakeSite.peak = 0
+    return srv, base
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Example.COM:80/a/./b/../c#frag") == "http://example.com/a/c"
+    assert normalize_url("https://example.com:443") == "https://example.com/"
+    assert normalize_url("http://example.com:8080/x/?utm_medium=a&b=2&a=1") == "http://example.com:8080/x/?a=1&b=2"
+    assert normalize_url("mailto:someone@example.com") is None
+    assert normalize_url("javascript:void(0)") is None
+
+@pytest.mark.asyncio
+async def test_crawl_fetches_each_page_once():
+    db.connect()
+    uid = "crawler_user"
+    q.del_mem_by_user(uid)
+    srv, base = serve()
+    try:
+        c = web_crawler_connector(user_id=uid, max_pages=50, max_depth=3, concurrency=6, per_host=2, delay=0.02)
+        ids = await c.ingest_all(start_url=base + "/")
+        listed = [i["id"] for i in c.crawled]
+        assert listed[0] == base + "/"
+        assert set(listed) == {base + p for p in ["/", "/a", "/b/", "/c", "/d", "/e?a=1&b=2", "/b/f", "/g"]}
+        assert [i["depth"] for i in c.crawled] == sorted(i["depth"] for i in c.crawled)
+
+        # one request per page, the ingest stage included; depth 4 is never requested
+        assert all(n == 1 for n in FakeSite.hits.values()), FakeSite.hits
+        assert FakeSite.hits["/doc.pdf"] == 1 and FakeSite.hits["/missing"] == 1
+        assert "/too-deep" not in FakeSite.hits
+        # concurrent up to the per-host cap, with the politeness delay between starts
+        assert FakeSite.peak == 2
+        gaps = [b - a for a, b in zip(FakeSite.starts, FakeSite.starts[1:])]
+        assert min(gaps) >= 0.015
+
+        assert len(ids) == len(listed) and not c.last_report["failed"]
+        alpha = next(q.get_mem(m) for m in ids if "alpha" in q.get_mem(m)["content"])
+        assert "secret" not in alpha["content"] and "footer text" not in alpha["content"]
+        assert c.pages == {}
+    finally:
+        srv.shutdown()
+        q.del_mem_by_user(uid)
+
+@pytest.mark.asyncio
+async def test_crawl_stops_at_max_pages():
+    srv, base = serve()
+    try:
+        c = web_crawler_connector(max_pages=3, concurrency=4, per_host=4, delay=0)
+        items = await c.list_items(start_url=base)
+        assert len(items) == 3 and items[0]["id"] == base + "/"
+        assert sum(n for p, n in FakeSite.hits.items() if p not in ("/doc.pdf", "/missing")) == 3
+    finally:
+        srv.shutdown()
@@ -0,0 +1,122 @@
+import asyncio
+import time
+import uuid
+import argparse
+import numpy as np
+from openmemory.core.db import db, q
+from openmemory.core.config import env
+from openmemory.core.vector_store import vector_store as store
+from openmemory.ops import extract
+from openmemory.ops.extract import extract_text, reset_extract_pool
+from openmemory.utils.vectors import vec_to_buf
+
+# ==================================================================================
+# EXTRACTION STORM BENCHMARK
+# ==================================================================================
+# Search latency while PDFs are being extracted concurrently.
+# - idle: no extraction, the latency floor
+# - inline: the parser runs on the event loop (the behaviour before the executor)
+# - threads: OM_EXTRACT_WORKERS=0, parser in the default thread pool (GIL-bound)
+# - pool/N: parser in a ProcessPoolExecutor with N workers
+# ==================================================================================
+
+def make_pdf(pages):
+    """Minimal text PDF: one Helvetica line per entry of each page."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        body = "BT /F1 10 Tf 50 750 Td 12 TL " + " ".join(f"({l}) Tj T*" for l in lines) + " ET"
+        objs.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offs = b"%PDF-1.4\n", []
+    for i, o in enumerate(objs, 1):
+        offs.append(len(out))
+        out += f"{i} 0 obj\n{o}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode() + b"".join(f"{o:010d} 00000 n \n".encode() for o in offs)
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+async def populate(user: str, n: int, dim: int, rng):
+    print(f"-> Writing {n} memories ({dim}d) for {user}")
+    q.del_mem_by_user(user)
+    now = int(time.time() * 1000)
+    for i in range(n):
+        mid = str(uuid.uuid4())
+        v = rng.standard_normal(dim).astype(np.float32)
+        q.ins_mem(id=mid, user_id=user, content=f"bench {i}", primary_sector="semantic", meta="{}",
+                  created_at=now, updated_at=now, last_seen_at=now, mean_dim=dim, mean_vec=vec_to_buf(v.tolist()))
+        await store.storeVector(mid, "semantic", v.tolist(), dim, user)
+
+async def inline_pdf(data: bytes):
+    # what extract_pdf did before: parse synchronously inside the coroutine
+    n, pages = extract._pdf_range(data, 0, 10**9)
+    return "".join(pages)
+
+async def storm(mode: str, pdf: bytes, jobs: int, concurrency: int, user: str, dim: int, rng):
+    if mode.startswith("pool/"):
+        env.extract_workers = int(mode.split("/")[1])
+    else:
+        env.extract_workers = 0
+    reset_extract_pool()
+    lat, done = [], asyncio.Event()
+
+    async def searcher():
+        while not done.is_set():
+            qv = rng.standard_normal(dim).tolist()
+            t = time.time()
+            await store.search(qv, "semantic", 10, {"user_id": user})
+            lat.append(time.time() - t)
+            await asyncio.sleep(0.005)
+
+    async def extractor(n):
+        for _ in range(n):
+            if mode == "inline": await inline_pdf(pdf)
+            else: await extract_text("application/pdf", pdf)
+
+    if mode.startswith("pool/"):
+        await extract_text("text/html", "<p>warm up</p>")  # fork the workers before measuring
+    s = asyncio.create_task(searcher())
+    t = time.time()
+    if mode == "idle":
+        await asyncio.sleep(2)
+    else:
+        await asyncio.gather(*(extractor(jobs // concurrency) for _ in range(concurrency)))
+    wall = time.time() - t
+    done.set()
+    await s
+    reset_extract_pool()
+    return lat, wall
+
+def pct(xs, p):
+    return sorted(xs)[min(len(xs) - 1, int(p * len(xs)))] * 1000
+
+async def run_bench(memories: int, dim: int, pages: int, jobs: int, concurrency: int, modes):
+    db.connect()
+    rng = np.random.default_rng(0)
+    user = "extract_bench"
+    await populate(user, memories, dim, rng)
+    pdf = make_pdf([[f"page {p} line {i} " + "lorem ipsum dolor sit amet " * 3 for i in range(40)] for p in range(pages)])
+    print(f"-> {jobs} extractions of a {pages}-page PDF ({len(pdf) // 1024} KB), {concurrency} at a time")
+
+    print("\n[Results]")
+    print(f" {'mode':<12}{'searches':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'storm s':>10}")
+    for mode in modes:
+        lat, wall = await storm(mode, pdf, jobs, concurrency, user, dim, rng)
+        print(f" {mode:<12}{len(lat):>10}{pct(lat, 0.5):>10.2f}{pct(lat, 0.99):>10.2f}{max(lat) * 1000:>10.2f}{wall:>10.2f}")
+    print("------------------------------------------------")
+    q.del_mem_by_user(user)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--memories', type=int, default=2000)
+    parser.add_argument('--dim', type=int, default=256)
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--jobs', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--modes', nargs='+', default=["idle", "inline", "threads", "pool/2", "pool/4"])
+
+    args = parser.parse_args()
+    asyncio.run(run_bench(args.memories, args.dim, args.pages, args.jobs, args.concurrency, args.modes))
@@ -0,0 +1,69 @@
+
+import time
+import argparse
+import numpy as np
+from openmemory.memory.waypoint_graph import WaypointGraph, UserGraph
+
+# ==================================================================================
+# WAYPOINT EXPANSION BENCHMARK
+# ==================================================================================
+# Latency of the two query-time expansion modes over one user's graph:
+# - bfs: weighted breadth-first walk (expand_via_waypoints)
+# - ppr: personalized PageRank spreading activation (expansion="ppr")
+# The graph is built in memory; no database is touched.
+# ==================================================================================
+
+def build(nodes: int, edges: int, seed: int = 0) -> WaypointGraph:
+    rng = np.random.default_rng(seed)
+    g = WaypointGraph()
+    g.loaded = True
+    ug = g.users["bench"] = UserGraph()
+    for i in range(nodes): ug.node(f"n{i}")
+    # preferential-ish targets: a few hubs, a long tail
+    src = rng.integers(0, nodes, edges).astype(np.int32)
+    dst = (rng.pareto(1.5, edges) * nodes / 50).astype(np.int64) % nodes
+    keep = src != dst
+    key = np.unique(src[keep].astype(np.int64) * nodes + dst[keep])
+    ug.build((key // nodes).astype(np.int32), (key % nodes).astype(np.int32), rng.uniform(0.2, 1.0, key.shape[0]))
+    for i in np.unique(key // nodes): g.owner[f"n{i}"] = "bench"
+    return g
+
+def pct(xs, p):
+    return sorted(xs)[min(len(xs) - 1, int(p * len(xs)))] * 1000
+
+def run_bench(nodes: int, edges: int, queries: int, seeds: int, max_exp: int):
+    g = build(nodes, edges)
+    print(f"-> Graph: {g.stats()}")
+    rng = np.random.default_rng(1)
+    qs = [[f"n{i}" for i in rng.choice(nodes, seeds, replace=False)] for _ in range(queries)]
+
+    bfs_t, ppr_t, overlap = [], [], []
+    g.users["bench"].ppr({0: 1.0})  # warm the normalised weights
+    for ids in qs:
+        t = time.time()
+        b = g.expand(ids, max_exp, "bench")
+        bfs_t.append(time.time() - t)
+        t = time.time()
+        p = g.activate({i: 1.0 for i in ids}, max_exp, "bench")
+        ppr_t.append(time.time() - t)
+        bs = {e["id"] for e in b}
+        ps = {e["id"] for e in p if e["id"] not in ids}
+        overlap.append(len(bs & ps) / max(1, len(bs)))
+
+    print("\n[Results]")
+    print(f" {'mode':<8}{'p50 ms':>10}{'p95 ms':>10}")
+    print(f" {'bfs':<8}{pct(bfs_t, 0.5):>10.3f}{pct(bfs_t, 0.95):>10.3f}")
+    print(f" {'ppr':<8}{pct(ppr_t, 0.5):>10.3f}{pct(ppr_t, 0.95):>10.3f}")
+    print(f" Expanded-set overlap (ppr vs bfs): {np.mean(overlap):.2f}")
+    print("------------------------------------------------")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=20000)
+    parser.add_argument('--edges', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--seeds', type=int, default=30)
+    parser.add_argument('--max-exp', type=int, default=20)
+
+    args = parser.parse_args()
+    run_bench(args.nodes, args.edges, args.queries, args.seeds, args.max_exp)
@@ -0,0 +1,72 @@
+import asyncio
+import time
+import json
+import random
+import argparse
+from openmemory.core.db import db, q
+from openmemory.memory import embed
+from openmemory.ops.ingest import ingest_document, split_text, mk_root, mk_child, link
+
+# ==================================================================================
+# ROOT-CHILD INGEST BENCHMARK
+# ==================================================================================
+# Compares the old per-section loop (mk_child -> waypoint scan -> link, one at a
+# time) with the streamed concurrent ingest for a document of --sections sections.
+# --embed-ms adds provider latency per embedding call, as a remote API would.
+# ==================================================================================
+
+def make_doc(sections: int, sz: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(5000)]
+    paras = []
+    while sum(len(p) + 2 for p in paras) < sections * sz:
+        paras.append(" ".join(rng.choice(vocab) for _ in range(rng.randint(20, 80))))
+    return "\n\n".join(paras)
+
+async def sequential(text: str, sz: int, user: str):
+    secs = split_text(text, sz)
+    rid = await mk_root(text, {"metadata": {"content_type": "text"}}, {}, user)
+    for i, s in enumerate(secs):
+        cid = await mk_child(s, i, len(secs), rid, {}, user)
+        await link(rid, cid, i, user)
+    return len(secs)
+
+async def run_bench(sections: int, sz: int, embed_ms: float, concurrency):
+    db.connect()
+    user = "ingest_bench"
+    if embed_ms > 0:
+        dispatch = embed.emb_dispatch
+        async def slow(provider, t, s):
+            await asyncio.sleep(embed_ms / 1000.0)
+            return await dispatch(provider, t, s)
+        embed.emb_dispatch = slow
+
+    print(f"-> {sections} sections of ~{sz} chars, {embed_ms:.0f} ms per embedding call")
+    rows = []
+    for i, mode in enumerate(["sequential"] + [f"stream/{c}" for c in concurrency]):
+        q.del_mem_by_user(user)
+        text = make_doc(sections, sz, seed=i)  # fresh text per run, so nothing is deduplicated
+        t = time.time()
+        if mode == "sequential":
+            n = await sequential(text, sz, user)
+        else:
+            res = await ingest_document("text/plain", text, cfg={"sec_sz": sz, "concurrency": int(mode.split("/")[1])}, user_id=user)
+            n = res["child_count"]
+        rows.append((mode, n, time.time() - t))
+
+    print("\n[Results]")
+    print(f" {'mode':<16}{'sections':>10}{'wall s':>10}{'speedup':>10}")
+    for mode, n, dt in rows:
+        print(f" {mode:<16}{n:>10}{dt:>10.2f}{rows[0][2] / dt:>10.1f}x")
+    print("------------------------------------------------")
+    q.del_mem_by_user(user)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sections', type=int, default=100)
+    parser.add_argument('--sec-size', type=int, default=3000)
+    parser.add_argument('--embed-ms', type=float, default=250)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+
+    args = parser.parse_args()
+    asyncio.run(run_bench(args.sections, args.sec_size, args.embed_ms, args.concurrency))
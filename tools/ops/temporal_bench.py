@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import tempfile
+from openmemory.core.config import env
+
+# ==================================================================================
+# TEMPORAL FACT LOADER BENCHMARK
+# ==================================================================================
+# Loads --facts facts (about --versions versions per (subject, predicate), in
+# random valid_from order) into an empty temporal_facts table, then a second
+# batch of --update facts on top of it, with either:
+# - loop: the old per-fact SELECT / UPDATE / INSERT loop of batch_insert_facts
+# - bulk: the staged, set-based loader (temporal_graph.batch_insert_facts)
+# Each mode runs on its own scratch database file.
+# ==================================================================================
+
+def make_facts(n: int, keys: int, base: int, rng: random.Random):
+    return [{"subject": f"s{rng.randrange(keys)}", "predicate": "p", "object": f"o{base}-{i}",
+             "valid_from": base + rng.randrange(10**9)} for i in range(n)]
+
+async def per_fact_loop(facts):
+    # batch_insert_facts before the bulk loader, kept here for comparison
+    from openmemory.core.db import db, transaction
+    now = int(time.time() * 1000)
+    ids = []
+    with transaction():
+        for f in facts:
+            fid = str(uuid.uuid4())
+            vf = f.get("valid_from", now)
+            existing = db.conn.execute("SELECT id, valid_from FROM temporal_facts WHERE subject=? AND predicate=? AND valid_to IS NULL",
+                                       (f["subject"], f["predicate"])).fetchall()
+            for old in existing:
+                if old["valid_from"] < vf:
+                    db.conn.execute("UPDATE temporal_facts SET valid_to=? WHERE id=?", (vf - 1, old["id"]))
+            db.conn.execute("INSERT INTO temporal_facts(id, subject, predicate, object, valid_from, valid_to, confidence, last_updated, metadata) VALUES (?,?,?,?,?,NULL,?,?,?)",
+                            (fid, f["subject"], f["predicate"], f["object"], vf, f.get("confidence", 1.0), now,
+                             json.dumps(f["metadata"]) if f.get("metadata") else None))
+            ids.append(fid)
+    return ids
+
+async def run_mode(mode: str, facts: int, update: int, versions: int, path: str):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix): os.remove(path + suffix)
+    env.database_url = f"sqlite:///{path}"
+    from openmemory.core.db import db
+    from openmemory.temporal_graph import batch_insert_facts
+    db.conn = None
+    db.connect()
+    load = per_fact_loop if mode == "loop" else batch_insert_facts
+
+    rng = random.Random(7)  # the same facts for both modes
+    keys = max(1, facts // versions)
+    rows = []
+    for label, n, base in (("initial", facts, 0), ("update", update, 10**9)):
+        batch = make_facts(n, keys, base, rng)
+        t = time.time()
+        await load(batch)
+        rows.append((label, n, time.time() - t))
+    open_facts = db.fetchone("SELECT count(*) AS c FROM temporal_facts WHERE valid_to IS NULL")["c"]
+    open_keys = db.fetchone("SELECT count(*) AS c FROM (SELECT DISTINCT subject, predicate FROM temporal_facts)")["c"]
+    db.conn.close()
+    db.conn = None
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix): os.remove(path + suffix)
+    return rows, open_facts, open_keys
+
+async def run_bench(facts: int, update: int, versions: int, modes):
+    import sqlite3
+    print(f"-> {facts} facts (~{versions} versions per key, shuffled), then {update} more; SQLite {sqlite3.sqlite_version}")
+    tmp = tempfile.mkdtemp(prefix="temporal_bench_")
+    results = {m: await run_mode(m, facts, update, versions, os.path.join(tmp, f"{m}.db")) for m in modes}
+    os.rmdir(tmp)
+
+    print("\n[Results]")
+    print(f" {'mode':<8}{'batch':<10}{'facts':>10}{'wall s':>10}{'facts/s':>12}")
+    for m, (rows, _, _) in results.items():
+        for label, n, dt in rows:
+            print(f" {m:<8}{label:<10}{n:>10}{dt:>10.2f}{n / dt:>12,.0f}")
+    print("\n[Open intervals]")
+    for m, (_, open_facts, keys) in results.items():
+        print(f" {m:<8}{open_facts:>10} open facts for {keys} keys")
+    print("------------------------------------------------")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--facts', type=int, default=1_000_000)
+    parser.add_argument('--update', type=int, default=100_000)
+    parser.add_argument('--versions', type=int, default=4)
+    parser.add_argument('--modes', nargs='+', default=["loop", "bulk"], choices=["loop", "bulk"])
+
+    args = parser.parse_args()
+    asyncio.run(run_bench(args.facts, args.update, args.versions, args.modes))
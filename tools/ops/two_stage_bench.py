@@ -0,0 +1,90 @@
+
+import asyncio
+import time
+import uuid
+import argparse
+import numpy as np
+from openmemory.core.db import db, q
+from openmemory.core.vector_store import vector_store as store
+from openmemory.memory.hsg import two_stage_search, compress_vec_for_storage
+from openmemory.memory.compact_index import compact_index
+from openmemory.utils.vectors import vec_to_buf
+
+# ==================================================================================
+# TWO-STAGE RETRIEVAL BENCHMARK
+# ==================================================================================
+# Compares the per-sector full scan against the compressed_vec shortlist +
+# full-vector re-score used by OM_VEC_TWO_STAGE.
+# - Latency (p50 / p95) per query over all sectors
+# - Recall@k of the two-stage result against the full scan
+# ==================================================================================
+
+SECTORS = ["semantic", "episodic", "procedural"]
+
+def clustered(rng, n, dim, rank, centers=64):
+    # embeddings concentrate in a low-rank subspace; --rank sets its size (rank=dim is isotropic noise)
+    proj = rng.standard_normal((rank, dim)) / np.sqrt(rank)
+    c = rng.standard_normal((centers, rank))
+    z = c[rng.integers(0, centers, n)] + 0.5 * rng.standard_normal((n, rank))
+    return (z @ proj + 0.05 * rng.standard_normal((n, dim))).astype(np.float32)
+
+async def populate(user: str, base: np.ndarray, rng):
+    n, dim = base.shape
+    print(f"-> Writing {n} memories x {len(SECTORS)} sectors ({dim}d) for {user}")
+    q.del_mem_by_user(user)
+    now = int(time.time() * 1000)
+    for i in range(n):
+        mid = str(uuid.uuid4())
+        vecs = [base[i] + 0.1 * rng.standard_normal(dim).astype(np.float32) for _ in SECTORS]
+        mean = np.mean(vecs, axis=0).tolist()
+        q.ins_mem(id=mid, user_id=user, segment=0, content=f"bench {i}", primary_sector="semantic",
+                  tags="[]", meta="{}", created_at=now, updated_at=now, last_seen_at=now,
+                  mean_dim=dim, mean_vec=vec_to_buf(mean), compressed_vec=vec_to_buf(compress_vec_for_storage(mean, 128)))
+        for s, v in zip(SECTORS, vecs):
+            await store.storeVector(mid, s, v.tolist(), dim, user)
+    compact_index.load()
+
+def pct(xs, p):
+    return sorted(xs)[min(len(xs) - 1, int(p * len(xs)))] * 1000
+
+async def run_bench(n: int, dim: int, rank: int, queries: int, k: int, shortlists):
+    db.connect()
+    rng = np.random.default_rng(0)
+    user = "two_stage_bench"
+    # memories and queries share one subspace
+    data = clustered(rng, n + queries, dim, rank)
+    await populate(user, data[:n], rng)
+    qs = [{s: (v + 0.1 * rng.standard_normal(dim)).tolist() for s in SECTORS} for v in data[n:]]
+
+    full_t, truth = [], []
+    for qe in qs:
+        t = time.time()
+        res = {s: await store.search(qe[s], s, k, {"user_id": user}) for s in SECTORS}
+        full_t.append(time.time() - t)
+        truth.append({s: {r["id"] for r in res[s]} for s in SECTORS})
+
+    print("\n[Results]")
+    print(f" {'mode':<18}{'p50 ms':>10}{'p95 ms':>10}{'recall@' + str(k):>12}")
+    print(f" {'full scan':<18}{pct(full_t, 0.5):>10.2f}{pct(full_t, 0.95):>10.2f}{1.0:>12.3f}")
+    for sl in shortlists:
+        ts, rec = [], []
+        for qe, tr in zip(qs, truth):
+            t = time.time()
+            res = await two_stage_search(qe, SECTORS, k, user, shortlist=sl)
+            ts.append(time.time() - t)
+            rec.append(np.mean([len({r["id"] for r in res[s]} & tr[s]) / max(1, len(tr[s])) for s in SECTORS]))
+        print(f" {'two-stage/' + str(sl):<18}{pct(ts, 0.5):>10.2f}{pct(ts, 0.95):>10.2f}{float(np.mean(rec)):>12.3f}")
+    print("------------------------------------------------")
+    q.del_mem_by_user(user)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--memories', type=int, default=5000)
+    parser.add_argument('--dim', type=int, default=768)
+    parser.add_argument('--rank', type=int, default=64)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--shortlist', type=int, nargs='+', default=[50, 100, 200, 500, 1000])
+
+    args = parser.parse_args()
+    asyncio.run(run_bench(args.memories, args.dim, args.rank, args.queries, args.k, args.shortlist))